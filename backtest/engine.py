@@ -1,14 +1,38 @@
+import heapq
+import bisect
+
 import pandas as pd
 import numpy as np
-from core.indicators import calculate_rsi, calculate_adx, calculate_atr
+from core.features import AI_PIPELINE, AI_FEATURE_COLS
+from core import instrumentation
+
+
+# اندازه اولیه پنجره جستجوی خروج؛ در صورت پیدا نشدن دو برابر می‌شود
+EXIT_SCAN_CHUNK = 64
+
+# ستون احتمال کش‌شده مدل (کلاس 1)
+AI_PROB_COL = "ai_prob"
+
+# نوع رویداد در حالت زمانی؛ در یک timestamp خروج‌ها قبل از ورودها پردازش می‌شوند
+EVENT_EXIT = 0
+EVENT_ENTRY = 1
 
 
 class BacktestEngine:
-    def __init__(self, portfolio, strategy, risk_manager, ai_model=None):
+    def __init__(self, portfolio, strategy, risk_manager, ai_model=None, ai_threshold=0.5,
+                 chronological=False, intrabar=None):
         self.portfolio = portfolio
         self.strategy = strategy
         self.risk_manager = risk_manager
         self.ai_model = ai_model
+        # ورود فقط با احتمال بیشتر از آستانه تایید می‌شود (مقایسه اکید مثل model.predict؛ 0.5 معادل آن است)
+        self.ai_threshold = ai_threshold
+        # False: هر نماد جدا و پشت سر هم (رفتار قبلی)
+        # True: همه نمادها در یک جریان رویداد مرتب بر اساس زمان (سرمایه مشترک واقعی)
+        self.chronological = chronological
+        # IntrabarResolver (backtest/intrabar): ترتیب SL/TP کندل‌های مبهم از داده تایم فریم پایین‌تر
+        # None: فرض بدبینانه «اول SL» (رفتار قبلی)
+        self.intrabar = intrabar
 
     def run(self, data_dict):
         results = {}
@@ -21,100 +45,270 @@ class BacktestEngine:
             print(f"Backtesting {symbol}...")
 
             # پیش‌محاسبه اندیکاتورهای استراتژی
-            df = self.strategy.generate_signals(df)
+            with instrumentation.timer("engine.signals"):
+                df = self.strategy.generate_signals(df)
+
+            if self.chronological:
+                results[symbol] = self._prepare_ai(df)
+            else:
+                results[symbol] = self._simulate(symbol, df)
+
+        if self.chronological:
+            with instrumentation.timer("engine.merged_loop"):
+                self._run_merged_loop(results, start=200)
+
+        return results
 
-            # پیش‌محاسبه اندیکاتورهای مورد نیاز AI (برای سرعت بیشتر)
-            if self.ai_model:
-                df = self._precalculate_ai_features(df)
+    def run_signals(self, signals_dict):
+        """
+        اجرای بک‌تست روی داده‌ای که ستون‌های signal و atr آن از قبل ساخته شده
+        (مثلاً در بهینه‌ساز پارامترها)؛ generate_signals دوباره صدا زده نمی‌شود.
+        """
+        results = {}
+        for symbol, df in signals_dict.items():
+            if len(df) < 200:
+                continue
+            if self.chronological:
+                results[symbol] = self._prepare_ai(df)
+            else:
+                results[symbol] = self._simulate(symbol, df)
 
-            # حلقه روی کندل‌ها
-            for i in range(200, len(df)):
-                current_row = df.iloc[i]
+        if self.chronological:
+            with instrumentation.timer("engine.merged_loop"):
+                self._run_merged_loop(results, start=200)
+        return results
 
-                # مدیریت خروج (TP/SL)
-                if symbol in self.portfolio.positions:
-                    self._check_exits(symbol, current_row, i, df)
+    def _prepare_ai(self, df):
+        # پیش‌محاسبه اندیکاتورهای مورد نیاز AI و امتیازدهی یکجا به همه کندل‌های کاندید
+        # اگر ستون احتمال از اجرای قبلی موجود باشد، مدل دوباره صدا زده نمی‌شود
+        # ستون‌های ویژگی از قبل ساخته شده (مثلاً در walk-forward) دوباره محاسبه نمی‌شوند
+        if self.ai_model and AI_PROB_COL not in df.columns:
+            with instrumentation.timer("engine.ai_features"):
+                if not all(col in df.columns for col in AI_FEATURE_COLS):
+                    df = self._precalculate_ai_features(df)
+                else:
+                    df = df.copy()
+            with instrumentation.timer("engine.ai_scoring"):
+                df[AI_PROB_COL] = self._score_candidates(df, start=200)
+        return df
 
-                # مدیریت ورود
-                if current_row['signal'] == 1:
-                    # اگر پوزیشن باز نداریم وارد شو
-                    if symbol not in self.portfolio.positions:
-                        can_enter = True
+    def _simulate(self, symbol, df):
+        df = self._prepare_ai(df)
 
-                        # اگر AI فعال است، از آن تاییدیه بگیر
-                        if self.ai_model:
-                            features = self._extract_features(df, i)
-                            # مدل انتظار آرایه 2 بعدی دارد
-                            features_array = features.values.reshape(1, -1)
-                            # کلاس 1 یعنی سیگنال تایید است
-                            prediction = self.ai_model.predict(features_array)[0]
+        # حلقه روی کندل‌ها (نسخه آرایه‌ای)
+        with instrumentation.timer("engine.bar_loop"):
+            self._run_bar_loop(symbol, df, start=200)
 
-                            if prediction == 0:
-                                can_enter = False
+        return df
 
-                        if can_enter:
-                            self._enter_trade(symbol, current_row, i, df)
+    def _bar_arrays(self, df):
+        """ستون‌های مورد نیاز حلقه به صورت آرایه و اندیس کندل‌های قابل ورود"""
+        arrays = {
+            col: np.ascontiguousarray(df[col].to_numpy(dtype=np.float64))
+            for col in ('high', 'low', 'close', 'atr')
+        }
 
-            results[symbol] = df
+        # اندیس کندل‌هایی که سیگنال خرید دارند
+        entry_mask = df['signal'].to_numpy() == 1
 
-        return results
+        # فیلتر AI: کندل‌هایی که احتمالشان به آستانه نمی‌رسد اصلاً کاندید ورود نیستند
+        if self.ai_model:
+            entry_mask &= df[AI_PROB_COL].to_numpy() > self.ai_threshold
 
-    def _check_exits(self, symbol, current_row, idx, df):
+        arrays['signal_idx'] = np.flatnonzero(entry_mask)
+        return arrays
+
+    def _run_bar_loop(self, symbol, df, start=200):
+        """
+        ماشین حالت ورود/خروج روی آرایه‌های NumPy.
+        به جای df.iloc در هر کندل، ستون‌ها یک‌بار به آرایه تبدیل می‌شوند و
+        حلقه فقط روی کندل‌های دارای سیگنال و کندل‌های خروج پرش می‌کند.
+        خروجی (portfolio.trades) دقیقاً مشابه حلقه سطر به سطر قبلی است.
+        """
+        n = len(df)
+        if start >= n:
+            return
+
+        arrays = self._bar_arrays(df)
+        high, low, close, atr = arrays['high'], arrays['low'], arrays['close'], arrays['atr']
+        signal_idx = arrays['signal_idx']
+        index = df.index
+        self._register_prices(symbol, index, close)
+        instrumentation.count("engine.bars", n - start)
+        # فقط مراحل زمان‌سنجی می‌شوند (engine.bar_loop / engine.merged_loop)، نه هر رویداد
+        find_exit_bar, check_exits, enter_trade = self._find_exit_bar, self._check_exits, self._enter_trade
+
+        i = start
+        while i < n:
+            # مدیریت خروج (TP/SL)
+            if symbol in self.portfolio.positions:
+                position = self.portfolio.positions[symbol]
+                j = find_exit_bar(low, high, position.stop_loss, position.take_profit, i)
+                if j < 0:
+                    break
+                check_exits(symbol, high[j], low[j], index[j], j)
+                # در همان کندل خروج، امکان ورود مجدد بررسی می‌شود
+                i = j
+
+            # مدیریت ورود: پرش به اولین سیگنال بعدی
+            k = np.searchsorted(signal_idx, i)
+            if k >= len(signal_idx):
+                break
+            i = int(signal_idx[k])
+
+            enter_trade(symbol, close[i], atr[i], index[i])
+            i += 1
+
+    def _run_merged_loop(self, frames, start=200):
+        """
+        حلقه زمانی چند نمادی: ادغام k-راهه (heap) جریان رویدادهای همه نمادها.
+        هر نماد در هر لحظه فقط یک رویداد بعدی دارد: کندل خروج پوزیشن باز
+        (فقط به قیمت‌های خود نماد بستگی دارد و با _find_exit_bar پیدا می‌شود) یا کندل سیگنال بعدی.
+        کندل‌های بدون رویداد لمس نمی‌شوند، پس هزینه هر رویداد O(log تعداد نمادها) است.
+        ترتیب در یک timestamp: خروج‌ها، سپس ورودها، و در هر گروه ترتیب data_dict.
+        """
+        streams = {}
+        heap = []
+        find_exit_bar, check_exits, enter_trade = self._find_exit_bar, self._check_exits, self._enter_trade
+
+        def push_next(symbol, i):
+            s = streams[symbol]
+            if symbol in self.portfolio.positions:
+                position = self.portfolio.positions[symbol]
+                j = find_exit_bar(s['low'], s['high'], position.stop_loss, position.take_profit, i)
+                if j >= 0:
+                    heapq.heappush(heap, (s['time'][j], EVENT_EXIT, s['order'], j, symbol))
+            else:
+                k = bisect.bisect_left(s['signals'], i)
+                if k < len(s['signals']):
+                    j = s['signals'][k]
+                    heapq.heappush(heap, (s['time'][j], EVENT_ENTRY, s['order'], j, symbol))
+
+        for order, (symbol, df) in enumerate(frames.items()):
+            if start >= len(df):
+                continue
+            s = self._bar_arrays(df)
+            # لیست‌های پایتونی برای bisect/heap (سریع‌تر از فراخوانی‌های تکی NumPy)
+            s['signals'] = s['signal_idx'].tolist()
+            s['index'] = df.index.array
+            s['time'] = df.index.values.astype('datetime64[ns]').view(np.int64).tolist()
+            s['order'] = order
+            streams[symbol] = s
+            self._register_prices(symbol, df.index, s['close'])
+            instrumentation.count("engine.bars", len(df) - start)
+            push_next(symbol, start)
+
+        while heap:
+            _, kind, _, i, symbol = heapq.heappop(heap)
+            s = streams[symbol]
+            if kind == EVENT_EXIT:
+                check_exits(symbol, s['high'][i], s['low'][i], s['index'][i], i)
+                # در همان کندل خروج، امکان ورود مجدد بررسی می‌شود
+                push_next(symbol, i)
+            else:
+                enter_trade(symbol, s['close'][i], s['atr'][i], s['index'][i])
+                push_next(symbol, i + 1)
+
+    def _register_prices(self, symbol, index, close):
+        # منحنی سرمایه کندلی (پرتفوی‌هایی که این قابلیت را ندارند نادیده گرفته می‌شوند)
+        if hasattr(self.portfolio, "register_prices"):
+            self.portfolio.register_prices(symbol, index, close)
+        # ایندکس بازه داده ریز هر کندل (فقط open_time؛ high/low تنها برای کندل‌های مبهم خوانده می‌شوند)
+        if self.intrabar is not None:
+            self.intrabar.attach(symbol, index)
+
+    @staticmethod
+    def _find_exit_bar(low, high, stop_loss, take_profit, start):
+        """اولین کندل از start به بعد که SL یا TP را لمس کند (یا -1)"""
+        n = len(low)
+        chunk = EXIT_SCAN_CHUNK
+        i = start
+        while i < n:
+            end = min(i + chunk, n)
+            hit = (low[i:end] <= stop_loss) | (high[i:end] >= take_profit)
+            pos = int(np.argmax(hit))
+            if hit[pos]:
+                return i + pos
+            i = end
+            chunk *= 2
+        return -1
+
+    def _check_exits(self, symbol, high, low, timestamp, bar=None):
         position = self.portfolio.positions[symbol]
+        sl_hit = low <= position.stop_loss
+
+        # کندلی که هر دو سطح را لمس کرده: ترتیب از داده ریز (در صورت وجود)
+        if sl_hit and high >= position.take_profit and self.intrabar is not None and bar is not None:
+            sl_hit = self.intrabar.resolve(symbol, bar, position.stop_loss, position.take_profit) == "SL"
 
         # چک کردن Stop Loss
-        if current_row['low'] <= position['stop_loss']:
-            exit_price = position['stop_loss']
+        if sl_hit:
+            exit_price = position.stop_loss
             # شبیه‌سازی اسلیپیج در بدترین حالت (Open کندل بعدی شاید پایین‌تر باشد)
             # اما اینجا برای سادگی همان قیمت استاپ را می‌گیریم
-            self.portfolio.close_position(symbol, exit_price, current_row.name, reason="SL")
+            self.portfolio.close_position(symbol, exit_price, timestamp, reason="SL")
 
         # چک کردن Take Profit
-        elif current_row['high'] >= position['take_profit']:
-            self.portfolio.close_position(symbol, position['take_profit'], current_row.name, reason="TP")
+        elif high >= position.take_profit:
+            self.portfolio.close_position(symbol, position.take_profit, timestamp, reason="TP")
 
-    def _enter_trade(self, symbol, current_row, idx, df):
-        stop_loss = self.risk_manager.calculate_stop_loss(df, idx)
+    def _enter_trade(self, symbol, close, atr, timestamp):
+        stop_loss = self.risk_manager.stop_loss_price(close, atr)
 
         # اگر استاپ لاس نامعتبر بود (مثلا بالاتر از قیمت فعلی برای خرید)
-        if stop_loss >= current_row['close']:
+        if stop_loss >= close:
             return
 
-        position_size = self.risk_manager.calculate_position_size(
-            current_row['close'], stop_loss
-        )
+        position_size = self.risk_manager.calculate_position_size(close, stop_loss)
 
         if position_size > 0:
-            take_profit = self.risk_manager.calculate_take_profit(df, idx)
+            take_profit = self.risk_manager.take_profit_price(close, atr)
             self.portfolio.open_position(
-                symbol, current_row['close'], position_size, stop_loss, take_profit, current_row.name
+                symbol, close, position_size, stop_loss, take_profit, timestamp
             )
 
-    def _precalculate_ai_features(self, df):
-        """محاسبه ستون‌های مورد نیاز AI قبل از شروع حلقه"""
+    @staticmethod
+    def _precalculate_ai_features(df):
+        """محاسبه ستون‌های مورد نیاز AI قبل از شروع حلقه (همان pipeline آموزش)"""
         df = df.copy()
-        # باید دقیقاً همان منطق train_ai_model باشد
-        df["returns"] = df["close"].pct_change()
-        # atr, rsi, adx قبلاً در استراتژی یا اینجا باید باشند
-        # فرض می‌کنیم استراتژی ATR را حساب کرده، اگر نه:
-        if 'atr' not in df.columns:
-            df['atr'] = calculate_atr(df)
+        features = AI_PIPELINE.compute(df)
+        for col in AI_FEATURE_COLS:
+            df[col] = features[col]
+        return df
 
-        df["rsi"] = calculate_rsi(df["close"])
-        df["adx"] = calculate_adx(df)
+    def _score_candidates(self, df, start=200):
+        """
+        احتمال کلاس 1 برای همه کندل‌های دارای سیگنال با یک فراخوانی predict_proba.
+        سایر کندل‌ها NaN می‌گیرند (و در نتیجه هیچ‌وقت تایید نمی‌شوند).
+        """
+        proba = np.full(len(df), np.nan)
 
-        df["atr_pct"] = df["atr"] / df["close"]
-        df["return_std"] = df["returns"].rolling(20).std()
+        candidates = np.flatnonzero(df['signal'].to_numpy() == 1)
+        candidates = candidates[candidates >= start]
+        if len(candidates) == 0:
+            return proba
 
-        # Volume Z-Score
-        vol_mean = df["volume"].rolling(20).mean()
-        vol_std = df["volume"].rolling(20).std()
-        df["volume_z"] = (df["volume"] - vol_mean) / (vol_std + 1e-9)  # جلوگیری از تقسیم بر صفر
+        features = df[AI_FEATURE_COLS].to_numpy(dtype=np.float64)[candidates]
+
+        if hasattr(self.ai_model, "predict_proba"):
+            proba[candidates] = self.ai_model.predict_proba(features)[:, 1]
+        else:
+            # مدل‌های بدون predict_proba: خروجی کلاس به عنوان احتمال 0/1
+            proba[candidates] = self.ai_model.predict(features)
+
+        return proba
 
-        return df
 
-    def _extract_features(self, df, i):
-        """استخراج ویژگی‌های یک ردیف خاص برای پیش‌بینی"""
-        # ترتیب ستون‌ها باید دقیقاً مثل زمان آموزش باشد
-        feature_cols = ["atr_pct", "return_std", "rsi", "adx", "volume_z"]
-        return df.iloc[i][feature_cols]
+def sweep_ai_thresholds(scored_data, thresholds, make_engine):
+    """
+    اجرای بک‌تست برای چند آستانه AI بدون فراخوانی مجدد مدل.
+    scored_data خروجی engine.run قبلی است (دارای ستون‌های signal، atr و ai_prob)
+    و make_engine(threshold) یک BacktestEngine با پرتفوی تازه می‌سازد.
+    سیگنال‌ها و احتمال‌ها دوباره ساخته نمی‌شوند (run_signals).
+    """
+    portfolios = {}
+    for threshold in thresholds:
+        engine = make_engine(threshold)
+        engine.run_signals(scored_data)
+        portfolios[threshold] = engine.portfolio
+    return portfolios
@@ -0,0 +1,88 @@
+### backtest/intrabar.py ###
+# حل ابهام کندل‌هایی که هم SL و هم TP را لمس می‌کنند با داده تایم فریم پایین‌تر (1m/5m) همان نماد.
+# بدون داده ریز، موتور فرض بدبینانه «اول SL» را می‌گیرد؛ با این resolver ترتیب واقعی از اولین
+# کندل ریزی که یکی از دو سطح را لمس کرده خوانده می‌شود.
+# برای هر کندل اصلی بازه ردیف‌های داده ریز یک بار و برداری (searchsorted روی open_time
+# memory-map شده) پیش‌محاسبه می‌شود؛ high/low داده ریز فقط برای کندل‌های مبهم از دیسک خوانده می‌شوند.
+import numpy as np
+
+from data.store import TIME_COL, has_dataset, load_ohlcv_arrays
+from data.resample import bar_duration
+
+
+# ترتیب ترجیح تایم فریم‌ها: اولین دیتاست موجود استفاده می‌شود
+DEFAULT_TIMEFRAMES = ("1m", "5m")
+
+OUTCOMES = ("ambiguous", "tp_first", "sl_first", "same_bar", "no_data")
+
+
+class IntrabarResolver:
+    """
+    attach(symbol, index) قبل از حلقه هر نماد؛ resolve(symbol, bar, stop_loss, take_profit)
+    فقط برای کندل‌های مبهم. خروجی "SL" یا "TP"؛ اگر داده ریز نباشد یا هر دو سطح در
+    یک کندل ریز لمس شوند، همان قاعده قبلی (SL) برمی‌گردد.
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, root=None):
+        self.timeframes = tuple(timeframes)
+        self.root = root
+        self._fine = {}     # symbol -> (timeframe, آرایه‌های memory-map high/low)
+        self._bounds = {}   # symbol -> (starts, ends) ردیف‌های داده ریز هر کندل اصلی
+        self.stats = dict.fromkeys(OUTCOMES, 0)
+
+    def _open(self, symbol):
+        for timeframe in self.timeframes:
+            if has_dataset(symbol, timeframe, self.root):
+                arrays = load_ohlcv_arrays(symbol, timeframe, columns=["high", "low"], root=self.root)
+                return timeframe, arrays
+        return None
+
+    def attach(self, symbol, index):
+        """پیش‌محاسبه ایندکس زمانی کندل‌های یک نماد؛ False اگر داده ریز موجود نباشد"""
+        self._bounds.pop(symbol, None)
+        fine = self._fine.get(symbol) or self._open(symbol)
+        times = np.asarray(index.values, dtype="datetime64[ns]")
+        duration = bar_duration(times)
+        if fine is None or duration is None:
+            return False
+        self._fine[symbol] = fine
+
+        fine_times = fine[1][TIME_COL]
+        # کندل اصلی t شامل کندل‌های ریز با open_time در بازه [t, t + duration) است
+        starts = np.searchsorted(fine_times, times, side="left")
+        ends = np.searchsorted(fine_times, times + duration, side="left")
+        self._bounds[symbol] = (starts, ends)
+        return True
+
+    def timeframe(self, symbol):
+        fine = self._fine.get(symbol)
+        return fine[0] if fine else None
+
+    def resolve(self, symbol, bar, stop_loss, take_profit):
+        self.stats["ambiguous"] += 1
+        bounds = self._bounds.get(symbol)
+        if bounds is None or bounds[0][bar] == bounds[1][bar]:
+            self.stats["no_data"] += 1
+            return "SL"
+
+        lo, hi = int(bounds[0][bar]), int(bounds[1][bar])
+        arrays = self._fine[symbol][1]
+        sl_hit = arrays["low"][lo:hi] <= stop_loss
+        tp_hit = arrays["high"][lo:hi] >= take_profit
+        first_sl = int(np.argmax(sl_hit)) if sl_hit.any() else hi - lo
+        first_tp = int(np.argmax(tp_hit)) if tp_hit.any() else hi - lo
+
+        if first_tp < first_sl:
+            self.stats["tp_first"] += 1
+            return "TP"
+        if first_sl < first_tp:
+            self.stats["sl_first"] += 1
+            return "SL"
+        # هر دو در یک کندل ریز (یا داده ریز با کندل اصلی ناسازگار): قاعده بدبینانه
+        self.stats["same_bar"] += 1
+        return "SL"
+
+    @property
+    def resolved(self):
+        """تعداد کندل‌های مبهمی که ترتیبشان از داده ریز تعیین شد"""
+        return self.stats["tp_first"] + self.stats["sl_first"]
@@ -1,13 +1,163 @@
 ### backtest/metrics.py ###
+import math
+
 import numpy as np
 import pandas as pd
 
+from core.equity import EquityCurve, annual_periods
+from core.ledger import TradeLedger
+
+
+# فرض قدیمی برای منحنی سرمایه بدون زمان (لیست بعد از هر ترید): کندل ساعتی
+HOURLY_PERIODS_PER_YEAR = 24 * 365
+
+
+# =========================================
+# Array Metrics
+# =========================================
+
+def running_drawdown(values):
+    """افت از سقف قبلی در هر نقطه (کسری از سقف)"""
+    values = np.asarray(values, dtype=np.float64)
+    peak = np.maximum.accumulate(values)
+    return (peak - values) / peak
+
+
+def max_drawdown(values):
+    if len(values) == 0:
+        return 0.0
+    return float(np.max(running_drawdown(values)))
+
+
+def longest_drawdown(values, times=None):
+    """
+    طولانی‌ترین دوره زیر سقف: (تعداد کندل، مدت زمان).
+    مدت از کندل سقف تا کندل بازگشت به سقف (یا آخرین کندل اگر هنوز برنگشته) است.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    underwater = values < np.maximum.accumulate(values)
+    if not underwater.any():
+        return 0, (pd.Timedelta(0) if times is not None else None)
+
+    edges = np.diff(np.concatenate(([0], underwater.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    bars = int(np.max(ends - starts))
+
+    if times is None:
+        return bars, None
+    times = np.asarray(times).astype("datetime64[ns]").view(np.int64)
+    # کندل اول همیشه سقف خودش است، پس starts >= 1
+    recovered = np.minimum(ends, len(times) - 1)
+    duration = int(np.max(times[recovered] - times[starts - 1]))
+    return bars, pd.Timedelta(duration, unit="ns")
+
+
+def sharpe_ratio(returns, periods_per_year):
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) > 1 and periods_per_year and np.std(returns) > 0:
+        return float((np.mean(returns) / np.std(returns)) * np.sqrt(periods_per_year))
+    return 0.0
+
+
+def sortino_ratio(returns, periods_per_year):
+    """مثل Sharpe ولی فقط با انحراف بازده‌های منفی (downside deviation، هدف صفر)"""
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < 2 or not periods_per_year:
+        return 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    if downside == 0:
+        return 0.0
+    return float((np.mean(returns) / downside) * np.sqrt(periods_per_year))
+
+
+def annualized_return(initial, final, years):
+    """نرخ رشد سالانه مرکب (CAGR)"""
+    if not years or years <= 0 or initial <= 0 or final <= 0:
+        return 0.0
+    return (final / initial) ** (1 / years) - 1
+
+
+def calmar_ratio(cagr, max_dd):
+    return cagr / max_dd if max_dd > 0 else 0.0
+
+
+def profit_factor(pnl):
+    """مجموع سودها تقسیم بر مجموع زیان‌ها (inf اگر زیانی نباشد)"""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    if gross_loss == 0:
+        return math.inf if gross_profit > 0 else 0.0
+    return float(gross_profit / gross_loss)
+
+
+def expectancy(pnl):
+    """میانگین سود/زیان هر ترید"""
+    return float(np.mean(pnl)) if len(pnl) else 0.0
+
+
+def win_rate(pnl):
+    return np.count_nonzero(np.asarray(pnl) > 0) / len(pnl) * 100 if len(pnl) else 0.0
+
+
+def trade_arrays(trades):
+    """ستون‌های pnl و symbol تریدها به صورت آرایه (از TradeLedger بدون ساخت dict)"""
+    if isinstance(trades, TradeLedger):
+        return trades.column("pnl"), trades.column("symbol")
+    pnl = np.fromiter((t["pnl"] for t in trades), dtype=np.float64, count=len(trades))
+    symbols = np.array([t["symbol"] for t in trades], dtype=object)
+    return pnl, symbols
+
+
+def symbol_breakdown(trades):
+    """جدول آمار تریدها به تفکیک نماد (بدون حلقه روی گروه‌ها)"""
+    columns = ["Trades", "Net Profit ($)", "Win Rate (%)", "Profit Factor", "Expectancy ($)"]
+    if not len(trades):
+        return pd.DataFrame(columns=columns)
+
+    pnl, symbols = trade_arrays(trades)
+    names, inverse = np.unique(symbols.astype(str), return_inverse=True)
+    k = len(names)
+
+    count = np.bincount(inverse, minlength=k)
+    net = np.bincount(inverse, weights=pnl, minlength=k)
+    wins = np.bincount(inverse, weights=pnl > 0, minlength=k)
+    gross_profit = np.bincount(inverse, weights=np.maximum(pnl, 0.0), minlength=k)
+    gross_loss = -np.bincount(inverse, weights=np.minimum(pnl, 0.0), minlength=k)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pf = np.where(gross_loss > 0, gross_profit / gross_loss, np.where(gross_profit > 0, np.inf, 0.0))
+
+    return pd.DataFrame({
+        "Trades": count,
+        "Net Profit ($)": net.round(2),
+        "Win Rate (%)": (wins / count * 100).round(2),
+        "Profit Factor": pf.round(2),
+        "Expectancy ($)": (net / count).round(2),
+    }, index=pd.Index(names, name="symbol"))
+
+
+# =========================================
+# Report Metrics
+# =========================================
+
 def calculate_metrics(trades, equity_curve, initial_capital, start_date=None, end_date=None):
     """
     محاسبه شاخص‌های عملکرد با پشتیبانی از تاریخ و زمان
+    equity_curve: لیست سرمایه بعد از هر ترید (portfolio.equity_curve) یا EquityCurve
+    کندلی (portfolio.equity)؛ در حالت دوم Drawdown و Sharpe از سری mark-to-market
+    و با تعداد واقعی کندل در سال محاسبه می‌شوند.
     """
+    if isinstance(equity_curve, EquityCurve):
+        values, times = equity_curve.values, equity_curve.times
+        periods = equity_curve.periods_per_year()
+    else:
+        values, times = np.asarray(equity_curve, dtype=np.float64), None
+        periods = HOURLY_PERIODS_PER_YEAR
+
     # مدیریت حالت بدون ترید یا داده ناقص
-    if not trades or len(equity_curve) < 2:
+    if not len(trades) or len(values) < 2:
         return {
             "Start Date": str(start_date) if start_date else "N/A",
             "End Date": str(end_date) if end_date else "N/A",
@@ -17,45 +167,43 @@ def calculate_metrics(trades, equity_curve, initial_capital, start_date=None, en
             "Net Profit ($)": 0.0,
             "Total Return (%)": 0.0,
             "Max Drawdown (%)": 0.0,
+            "Max Drawdown Duration": "N/A",
             "Win Rate (%)": 0.0,
             "Sharpe Ratio": 0.0,
+            "Sortino Ratio": 0.0,
+            "Calmar Ratio": 0.0,
+            "Profit Factor": 0.0,
+            "Expectancy ($)": 0.0,
             "Total Trades": 0,
         }
 
     # 1. محاسبات سرمایه
-    final_capital = equity_curve[-1]
+    final_capital = float(values[-1])
     net_profit = final_capital - initial_capital
     total_return_pct = (net_profit / initial_capital) * 100
 
-    # 2. محاسبات Drawdown
-    peak = equity_curve[0]
-    max_dd = 0
-    for value in equity_curve:
-        if value > peak:
-            peak = value
-        dd = (peak - value) / peak
-        if dd > max_dd:
-            max_dd = dd
+    # 2. محاسبات Drawdown (سقف جاری با maximum.accumulate)
+    max_dd = max_drawdown(values)
+    dd_bars, dd_duration = longest_drawdown(values, times)
 
     # 3. آمار تریدها
-    winning_trades = [t for t in trades if t["pnl"] > 0]
-    win_rate = (len(winning_trades) / len(trades) * 100)
-
-    # 4. نسبت شارپ (سالانه شده)
-    returns = np.diff(equity_curve) / equity_curve[:-1]
-    if len(returns) > 1 and np.std(returns) > 0:
-        # فرض بر کندل‌های ساعتی (24 * 365)
-        sharpe = (np.mean(returns) / np.std(returns)) * np.sqrt(24 * 365)
-    else:
-        sharpe = 0.0
+    pnl, _ = trade_arrays(trades)
+
+    # 4. نسبت‌های ریسک به بازده (سالانه شده)
+    returns = np.diff(values) / values[:-1]
+    sharpe = sharpe_ratio(returns, periods)
+    sortino = sortino_ratio(returns, periods)
 
     # 5. مدت زمان
     duration_str = "N/A"
+    years = None
     if start_date and end_date:
         try:
             duration_str = str(end_date - start_date).split('.')[0] # حذف میلی‌ثانیه
+            years = (end_date - start_date) / pd.Timedelta(days=365.25)
         except:
             pass
+    calmar = calmar_ratio(annualized_return(initial_capital, final_capital, years), max_dd)
 
     return {
         "Start Date": str(start_date),
@@ -66,7 +214,237 @@ def calculate_metrics(trades, equity_curve, initial_capital, start_date=None, en
         "Net Profit ($)": round(net_profit, 2),
         "Total Return (%)": round(total_return_pct, 2),
         "Max Drawdown (%)": round(max_dd * 100, 2),
-        "Win Rate (%)": round(win_rate, 2),
+        "Max Drawdown Duration": str(dd_duration).split('.')[0] if dd_duration is not None else f"{dd_bars} points",
+        "Win Rate (%)": round(win_rate(pnl), 2),
         "Sharpe Ratio": round(sharpe, 2),
+        "Sortino Ratio": round(sortino, 2),
+        "Calmar Ratio": round(calmar, 2),
+        "Profit Factor": round(profit_factor(pnl), 2),
+        "Expectancy ($)": round(expectancy(pnl), 2),
         "Total Trades": len(trades),
     }
+
+
+# =========================================
+# Streaming Metrics
+# =========================================
+
+class MetricsAccumulator:
+    """
+    شاخص‌ها به صورت آنلاین (حافظه O(تعداد نمادها + تعداد فاصله‌های زمانی متمایز)): سرمایه هر
+    کندل با update و نتیجه هر ترید با add_trade داده می‌شود. میانگین/واریانس بازده با الگوریتم Welford.
+    update_many یک تکه از سری را به صورت برداری اضافه می‌کند (نتیجه برابر update تکی).
+    بدون periods_per_year، سالانه‌سازی مثل calculate_metrics از فاصله میانه کندل‌هاست.
+    """
+
+    def __init__(self, periods_per_year=None):
+        self.periods_per_year = periods_per_year
+
+        # سری سرمایه
+        self.count = 0
+        self.first_value = self.last_value = None
+        self.first_time = self.last_time = None
+        self.peak = -math.inf
+        self.peak_index = 0
+        self.peak_time = None
+        self.max_dd = 0.0
+        self.underwater_start = None  # اندیس اولین کندل زیر سقف در دوره جاری
+        self.longest_dd_bars = 0
+        self.longest_dd_ns = 0
+        self.steps = {}  # فاصله زمانی دو کندل متوالی (ns) -> تعداد (فقط بدون periods_per_year)
+
+        # بازده‌ها
+        self.n_returns = 0
+        self.mean_return = 0.0
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+
+        # تریدها
+        self.trades = 0
+        self.by_symbol = {}  # symbol -> [trades, wins, gross_profit, gross_loss]
+
+    # --- سری سرمایه ---
+
+    def update(self, value, time=None):
+        value = float(value)
+        time_ns = None if time is None else pd.Timestamp(time).value
+        index = self.count
+
+        if self.count:
+            if time_ns is not None and self.last_time is not None and not self.periods_per_year:
+                step = time_ns - self.last_time
+                self.steps[step] = self.steps.get(step, 0) + 1
+            r = value / self.last_value - 1
+            self.n_returns += 1
+            delta = r - self.mean_return
+            self.mean_return += delta / self.n_returns
+            self.m2 += delta * (r - self.mean_return)
+            if r < 0:
+                self.downside_sq += r * r
+        else:
+            self.first_value, self.first_time = value, time_ns
+
+        if value >= self.peak:
+            if self.underwater_start is not None:
+                self._close_drawdown(index, time_ns)
+            self.peak, self.peak_index, self.peak_time = value, index, time_ns
+        else:
+            if self.underwater_start is None:
+                self.underwater_start = index
+            dd = (self.peak - value) / self.peak
+            if dd > self.max_dd:
+                self.max_dd = dd
+
+        self.last_value, self.last_time = value, time_ns
+        self.count += 1
+
+    def _close_drawdown(self, end_index, end_time):
+        self.longest_dd_bars = max(self.longest_dd_bars, end_index - self.underwater_start)
+        if end_time is not None and self.peak_time is not None:
+            self.longest_dd_ns = max(self.longest_dd_ns, end_time - self.peak_time)
+        self.underwater_start = None
+
+    def update_many(self, values, times=None):
+        """افزودن برداری یک تکه از سری (مثلاً هر N کندل در حلقه بک‌تست)"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        times_ns = None if times is None else np.asarray(times).astype("datetime64[ns]").view(np.int64)
+
+        # بازده‌ها: ترکیب آمار تکه با آمار قبلی (Chan et al.)
+        prev = np.concatenate(([self.last_value], values[:-1])) if self.count else values[:-1]
+        returns = (values if self.count else values[1:]) / prev - 1
+        if len(returns):
+            n_b = len(returns)
+            mean_b = float(np.mean(returns))
+            m2_b = float(np.sum((returns - mean_b) ** 2))
+            n = self.n_returns + n_b
+            delta = mean_b - self.mean_return
+            self.m2 += m2_b + delta * delta * self.n_returns * n_b / n
+            self.mean_return += delta * n_b / n
+            self.n_returns = n
+            self.downside_sq += float(np.sum(np.minimum(returns, 0.0) ** 2))
+
+        if times_ns is not None and not self.periods_per_year:
+            steps = np.diff(times_ns)
+            if self.count and self.last_time is not None:
+                steps = np.concatenate(([times_ns[0] - self.last_time], steps))
+            for step, n in zip(*np.unique(steps, return_counts=True)):
+                self.steps[int(step)] = self.steps.get(int(step), 0) + int(n)
+
+        if not self.count:
+            self.first_value = float(values[0])
+            self.first_time = None if times_ns is None else int(times_ns[0])
+
+        # سقف جاری با احتساب سقف قبلی
+        peak = np.maximum.accumulate(np.concatenate(([self.peak], values)))[1:]
+        dd = (peak - values) / peak
+        if len(dd) and dd.max() > self.max_dd:
+            self.max_dd = float(dd.max())
+
+        # دوره‌های زیر سقف؛ دوره باز از تکه قبلی (underwater_start) ادامه پیدا می‌کند
+        underwater = values < peak
+        carried = self.underwater_start is not None
+        flags = np.concatenate(([carried], underwater))
+        starts = np.flatnonzero(~flags[:-1] & flags[1:])
+        ends = np.flatnonzero(flags[:-1] & ~flags[1:])
+
+        run_starts = self.count + starts
+        if times_ns is not None:
+            # سقف هر دوره کندل قبل از شروع آن است (برای i=0 همان سقف تکه قبلی)
+            run_peaks = np.where(starts > 0, times_ns[np.maximum(starts - 1, 0)], self.peak_time or 0)
+        if carried:
+            run_starts = np.concatenate(([self.underwater_start], run_starts))
+            if times_ns is not None:
+                run_peaks = np.concatenate(([self.peak_time or 0], run_peaks))
+
+        if len(ends):
+            closed = slice(0, len(ends))
+            bars = self.count + ends - run_starts[closed]
+            self.longest_dd_bars = max(self.longest_dd_bars, int(bars.max()))
+            if times_ns is not None and (self.peak_time is not None or not carried):
+                self.longest_dd_ns = max(self.longest_dd_ns, int((times_ns[ends] - run_peaks[closed]).max()))
+
+        self.underwater_start = int(run_starts[-1]) if underwater[-1] else None
+        at_peak = np.flatnonzero(~underwater)
+        if len(at_peak):
+            self.peak_index = self.count + int(at_peak[-1])
+            self.peak_time = None if times_ns is None else int(times_ns[at_peak[-1]])
+        self.peak = float(peak[-1])
+
+        self.last_value = float(values[-1])
+        self.last_time = None if times_ns is None else int(times_ns[-1])
+        self.count += len(values)
+
+    # --- تریدها ---
+
+    def add_trade(self, pnl, symbol=None):
+        self.trades += 1
+        stats = self.by_symbol.setdefault(symbol, [0, 0, 0.0, 0.0])
+        stats[0] += 1
+        if pnl > 0:
+            stats[1] += 1
+            stats[2] += pnl
+        elif pnl < 0:
+            stats[3] -= pnl
+
+    # --- نتیجه ---
+
+    def _median_step(self):
+        """میانه فاصله کندل‌ها از جدول تکرار (مثل np.median روی همه فاصله‌ها)"""
+        steps = sorted(self.steps)
+        counts = np.cumsum([self.steps[step] for step in steps])
+        total = int(counts[-1])
+        lower = steps[int(np.searchsorted(counts, (total - 1) // 2, side="right"))]
+        upper = steps[int(np.searchsorted(counts, total // 2, side="right"))]
+        return (lower + upper) / 2
+
+    def _periods(self):
+        if self.periods_per_year:
+            return self.periods_per_year
+        if self.steps:
+            return annual_periods(self._median_step())
+        return None
+
+    def result(self):
+        periods = self._periods()
+        std = math.sqrt(self.m2 / self.n_returns) if self.n_returns else 0.0
+        downside = math.sqrt(self.downside_sq / self.n_returns) if self.n_returns else 0.0
+        scale = math.sqrt(periods) if periods else 0.0
+
+        # دوره زیر سقفی که هنوز تمام نشده
+        dd_bars, dd_ns = self.longest_dd_bars, self.longest_dd_ns
+        if self.underwater_start is not None:
+            dd_bars = max(dd_bars, self.count - self.underwater_start)
+            if self.last_time is not None and self.peak_time is not None:
+                dd_ns = max(dd_ns, self.last_time - self.peak_time)
+
+        years = None
+        if self.first_time is not None and self.last_time is not None:
+            years = (self.last_time - self.first_time) / pd.Timedelta(days=365.25).value
+
+        trades, wins, gross_profit, gross_loss = (
+            sum(stats[i] for stats in self.by_symbol.values()) for i in range(4)
+        )
+        net = gross_profit - gross_loss
+        if gross_loss > 0:
+            pf = gross_profit / gross_loss
+        else:
+            pf = math.inf if gross_profit > 0 else 0.0
+
+        return {
+            "Final Capital ($)": self.last_value,
+            "Total Return (%)": (self.last_value / self.first_value - 1) * 100 if self.count else 0.0,
+            "Max Drawdown (%)": self.max_dd * 100,
+            "Max Drawdown Bars": dd_bars,
+            "Max Drawdown Duration": pd.Timedelta(dd_ns, unit="ns") if self.first_time is not None else None,
+            "Sharpe Ratio": self.mean_return / std * scale if std > 0 else 0.0,
+            "Sortino Ratio": self.mean_return / downside * scale if downside > 0 else 0.0,
+            "Calmar Ratio": calmar_ratio(
+                annualized_return(self.first_value or 0, self.last_value or 0, years), self.max_dd
+            ),
+            "Win Rate (%)": wins / trades * 100 if trades else 0.0,
+            "Profit Factor": pf,
+            "Expectancy ($)": net / trades if trades else 0.0,
+            "Total Trades": trades,
+        }
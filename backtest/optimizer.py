@@ -0,0 +1,268 @@
+### backtest/optimizer.py ###
+import os
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from core.indicators import calculate_atr, ema, supertrend_batch
+from core.strategy import DualSupertrendStrategy
+from data.resample import resample_ohlcv, align_to, align_values
+from core.risk_manager import RiskManager
+from core.portfolio import MultiAssetPortfolio
+from backtest.engine import BacktestEngine
+from backtest.metrics import calculate_metrics
+
+
+# پارامترهایی که روی ورودی اندیکاتورها اثر دارند
+SWEEP_KEYS = ["ema_period", "st_period", "st_multiplier", "st_fast_period", "st_fast_multiplier", "atr_period"]
+
+# وضعیت هر پروسه کارگر (یک بار در initializer پر می‌شود)
+_WORKER = {}
+
+
+# =========================================
+# Search Space
+# =========================================
+
+def grid_search_space(param_grid, base_params):
+    """همه ترکیب‌های param_grid (دیکشنری نام -> لیست مقادیر) روی پارامترهای پایه"""
+    keys = list(param_grid)
+    combos = []
+    for values in itertools.product(*(param_grid[k] for k in keys)):
+        params = dict(base_params)
+        params.update(zip(keys, values))
+        combos.append(params)
+    return combos
+
+
+def random_search_space(param_grid, n_samples, base_params, seed=42):
+    """نمونه‌گیری تصادفی (بدون تکرار) از ترکیب‌های param_grid"""
+    keys = list(param_grid)
+    total = int(np.prod([len(param_grid[k]) for k in keys])) if keys else 1
+    if n_samples >= total:
+        return grid_search_space(param_grid, base_params)
+
+    rng = random.Random(seed)
+    seen = set()
+    combos = []
+    while len(combos) < n_samples:
+        values = tuple(rng.choice(param_grid[k]) for k in keys)
+        if values in seen:
+            continue
+        seen.add(values)
+        params = dict(base_params)
+        params.update(zip(keys, values))
+        combos.append(params)
+    return combos
+
+
+# =========================================
+# Shared Market Data
+# =========================================
+
+class SharedArrays:
+    """
+    نگهداری آرایه‌ها در shared memory تا کارگرها بدون pickle و کپی به آن‌ها دسترسی داشته باشند.
+    spec فقط نام و شکل بلوک‌هاست و یک بار به هر کارگر فرستاده می‌شود.
+    """
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        for key, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+            view[...] = arr
+            self.blocks.append(shm)
+            self.spec[key] = (shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+
+def attach_arrays(spec):
+    """اتصال به بلوک‌های shared memory؛ خروجی: (آرایه‌ها، هندل‌ها)"""
+    arrays = {}
+    handles = []
+    for key, (name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return arrays, handles
+
+
+def precompute_indicators(data_dict, combos):
+    """
+    اندیکاتورها برای هر ورودی یکتا فقط یک بار محاسبه می‌شوند:
+    ATR و EMA برای هر period و سوپرترند برای هر جفت (period, multiplier)
+    (همه جفت‌ها در یک فراخوانی supertrend_batch).
+    با trend_timeframe، EMA و سوپرترند اصلی روی کندل‌های بالاتر (یک بار resample برای هر
+    تایم فریم) ساخته و مثل DualSupertrendStrategy.higher_timeframe_trend هم‌تراز می‌شوند.
+    trend_rows: (trend_timeframe یا None، period، multiplier) -> ردیف آرایه trend همان تایم فریم
+    """
+    atr_periods = sorted({p["atr_period"] for p in combos})
+    ema_periods = {}
+    st_pairs = {}
+    for p in combos:
+        timeframe = p.get("trend_timeframe") or None
+        ema_periods.setdefault(timeframe, set()).add(p["ema_period"])
+        st_pairs.setdefault(timeframe, set()).add((p["st_period"], float(p["st_multiplier"])))
+        st_pairs.setdefault(None, set()).add((p["st_fast_period"], float(p["st_fast_multiplier"])))
+    st_pairs = {timeframe: sorted(pairs) for timeframe, pairs in st_pairs.items()}
+    trend_rows = {
+        (timeframe, *pair): row
+        for timeframe, pairs in st_pairs.items() for row, pair in enumerate(pairs)
+    }
+
+    arrays = {}
+    for symbol, df in data_dict.items():
+        arrays[f"{symbol}/time"] = df.index.values.astype("datetime64[ns]").view(np.int64)
+        for col in ("high", "low", "close"):
+            arrays[f"{symbol}/{col}"] = df[col].to_numpy(dtype=np.float64)
+        for period in atr_periods:
+            arrays[f"{symbol}/atr/{period}"] = calculate_atr(df, period=period).to_numpy(dtype=np.float64)
+        for period in sorted(ema_periods.get(None, ())):
+            arrays[f"{symbol}/ema/{period}"] = ema(df["close"], period=period).to_numpy(dtype=np.float64)
+        arrays[f"{symbol}/trend"] = supertrend_batch(df, st_pairs[None])
+
+        for timeframe in sorted(t for t in st_pairs if t):
+            higher = resample_ohlcv(df, timeframe)
+            positions = align_to(higher.index.values, timeframe, df.index.values)
+            for period in sorted(ema_periods[timeframe]):
+                arrays[f"{symbol}/ema/{timeframe}/{period}"] = align_values(
+                    ema(higher["close"], period=period).to_numpy(dtype=np.float64), positions
+                )
+            trends = supertrend_batch(higher, st_pairs[timeframe])
+            arrays[f"{symbol}/trend/{timeframe}"] = np.vstack([align_values(row, positions, fill=0) for row in trends])
+
+    return arrays, trend_rows
+
+
+def entry_signals(arrays, trend_rows, symbol, params):
+    """سیگنال ورود یک نماد برای params از آرایه‌های precompute_indicators"""
+    timeframe = params.get("trend_timeframe") or None
+    higher = f"/{timeframe}" if timeframe else ""
+    trend_main = arrays[f"{symbol}/trend{higher}"][
+        trend_rows[(timeframe, params["st_period"], float(params["st_multiplier"]))]
+    ]
+    trend_fast = arrays[f"{symbol}/trend"][
+        trend_rows[(None, params["st_fast_period"], float(params["st_fast_multiplier"]))]
+    ]
+    return DualSupertrendStrategy.entry_signal(
+        arrays[f"{symbol}/close"], arrays[f"{symbol}/ema{higher}/{params['ema_period']}"], trend_main, trend_fast
+    )
+
+
+# =========================================
+# Workers
+# =========================================
+
+def _init_worker(spec, trend_rows, symbols, assets_config, settings_dict):
+    arrays, handles = attach_arrays(spec)
+    _WORKER.update(
+        arrays=arrays,
+        handles=handles,  # باید زنده بمانند تا view ها معتبر باشند
+        trend_rows=trend_rows,
+        symbols=symbols,
+        assets_config=assets_config,
+        settings=settings_dict,
+    )
+
+
+def _evaluate(params):
+    arrays = _WORKER["arrays"]
+    trend_rows = _WORKER["trend_rows"]
+    settings = _WORKER["settings"]
+    initial_capital = settings["initial_capital"]
+
+    signals_dict = {}
+    start_date = end_date = None
+    for symbol in _WORKER["symbols"]:
+        close = arrays[f"{symbol}/close"]
+        signal = entry_signals(arrays, trend_rows, symbol, params)
+        index = pd.DatetimeIndex(arrays[f"{symbol}/time"].view("datetime64[ns]"))
+        signals_dict[symbol] = pd.DataFrame({
+            "high": arrays[f"{symbol}/high"],
+            "low": arrays[f"{symbol}/low"],
+            "close": close,
+            "atr": arrays[f"{symbol}/atr/{params['atr_period']}"],
+            "signal": signal,
+        }, index=index, copy=False)
+
+        if len(index):
+            start_date = index[0] if start_date is None else min(start_date, index[0])
+            end_date = index[-1] if end_date is None else max(end_date, index[-1])
+
+    portfolio = MultiAssetPortfolio(initial_capital, _WORKER["assets_config"])
+    risk_manager = RiskManager(initial_capital, settings["risk_per_trade"])
+    engine = BacktestEngine(
+        portfolio, DualSupertrendStrategy(params), risk_manager,
+        chronological=settings.get("chronological", False)
+    )
+    engine.run_signals(signals_dict)
+
+    # رتبه‌بندی با Drawdown/Sharpe منحنی mark-to-market کندلی (سالانه‌سازی با فاصله واقعی کندل‌ها)
+    metrics = calculate_metrics(
+        portfolio.trades, portfolio.equity, initial_capital,
+        start_date=start_date, end_date=end_date
+    )
+
+    row = {key: params[key] for key in SWEEP_KEYS}
+    if params.get("trend_timeframe"):
+        row["trend_timeframe"] = params["trend_timeframe"]
+    row.update(metrics)
+    return row
+
+
+# =========================================
+# Optimizer
+# =========================================
+
+def run_optimization(data_dict, assets_config, combos, initial_capital, risk_per_trade,
+                     metric="Sharpe Ratio", workers=None, chunksize=None, chronological=False):
+    """
+    اجرای موازی بک‌تست برای همه ترکیب‌ها و برگرداندن جدول مرتب شده بر اساس metric.
+    داده‌ها و اندیکاتورها یک بار در shared memory قرار می‌گیرند.
+    """
+    arrays, trend_rows = precompute_indicators(data_dict, combos)
+    settings_dict = {
+        "initial_capital": initial_capital,
+        "risk_per_trade": risk_per_trade,
+        "chronological": chronological,
+    }
+    symbols = list(data_dict)
+
+    shared = SharedArrays(arrays)
+    del arrays
+    try:
+        initargs = (shared.spec, trend_rows, symbols, assets_config, settings_dict)
+        if workers == 1:
+            _init_worker(*initargs)
+            rows = [_evaluate(params) for params in combos]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=initargs) as pool:
+                if chunksize is None:
+                    n_workers = workers or os.cpu_count() or 1
+                    chunksize = max(1, len(combos) // (n_workers * 4))
+                rows = list(pool.map(_evaluate, combos, chunksize=chunksize))
+    finally:
+        if workers == 1:
+            handles = _WORKER.pop("handles", [])
+            _WORKER.clear()
+            for shm in handles:
+                shm.close()
+        shared.close()
+
+    results = pd.DataFrame(rows)
+    if metric in results.columns:
+        results = results.sort_values(metric, ascending=False, kind="stable")
+    return results.reset_index(drop=True)
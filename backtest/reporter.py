@@ -1,4 +1,6 @@
 ### backtest/reporter.py ###
+import os
+
 import pandas as pd
 
 
@@ -32,6 +34,7 @@ def generate_report(metrics, trades, output_path="outputs/final_report.txt"):
 
     # ذخیره در فایل
     try:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(report_content)
 
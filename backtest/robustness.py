@@ -0,0 +1,232 @@
+### backtest/robustness.py ###
+# تحلیل استحکام نتایج بک‌تست با Monte Carlo / bootstrap: به جای یک مسیر سرمایه،
+# ده‌ها هزار مسیر بازسازی شده به صورت ماتریس (مسیر × زمان) NumPy ساخته و توزیع
+# Max Drawdown، سرمایه نهایی و Sharpe با بازه اطمینان گزارش می‌شود.
+#   shuffle  : جایگشت تصادفی ترتیب تریدها (سرمایه نهایی ثابت، ریسک ترتیب)
+#   bootstrap: bootstrap بلوکی (حلقوی) بازده‌های کندلی منحنی mark-to-market
+#   skip     : حذف تصادفی هر ورود با احتمال skip_prob (از دست دادن سیگنال/پر نشدن سفارش)
+# مسیرها تکه به تکه (chunk) ساخته می‌شوند تا حافظه مستقل از تعداد مسیرها و محدود به max_bytes بماند.
+import math
+
+import numpy as np
+import pandas as pd
+
+from core.equity import EquityCurve
+from backtest.metrics import trade_arrays, running_drawdown, sharpe_ratio, HOURLY_PERIODS_PER_YEAR
+
+
+METHODS = ("shuffle", "bootstrap", "skip")
+
+METRICS = ["Max Drawdown (%)", "Final Equity ($)", "Sharpe Ratio"]
+
+# تعداد ماتریس‌های هم‌اندازه یک تکه که همزمان در حافظه هستند (مسیر، اندیس، سقف/بازده‌ها، موقت‌ها)
+WORK_ARRAYS = 5
+
+
+def chunk_sizes(n_paths, length, max_bytes):
+    """اندازه تکه‌ها طوری که WORK_ARRAYS ماتریس (rows, length) از max_bytes بیشتر نشوند"""
+    rows = max(1, int(max_bytes // (max(length, 1) * 8 * WORK_ARRAYS)))
+    for start in range(0, n_paths, rows):
+        yield min(rows, n_paths - start)
+
+
+# =========================================
+# Path Generators
+# =========================================
+
+def _cumulative_paths(pnl_rows, initial_capital):
+    """ماتریس سرمایه (rows, n+1) از pnl دلاری تریدها؛ ستون اول سرمایه اولیه"""
+    rows, n = pnl_rows.shape
+    paths = np.empty((rows, n + 1))
+    paths[:, 0] = initial_capital
+    np.cumsum(pnl_rows, axis=1, out=paths[:, 1:])
+    paths[:, 1:] += initial_capital
+    return paths
+
+
+def trade_shuffle_paths(pnl, initial_capital, n_paths, rng, max_bytes):
+    """جایگشت‌های تصادفی مستقل ترتیب تریدها برای هر مسیر"""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    for rows in chunk_sizes(n_paths, len(pnl) + 1, max_bytes):
+        shuffled = rng.permuted(np.broadcast_to(pnl, (rows, len(pnl))), axis=1)
+        yield _cumulative_paths(shuffled, initial_capital)
+
+
+def entry_skip_paths(pnl, initial_capital, n_paths, rng, max_bytes, skip_prob=0.1):
+    """
+    هر ترید با احتمال skip_prob حذف می‌شود (pnl بقیه بدون تغییر؛ اثر ترکیب سرمایه روی
+    اندازه پوزیشن‌ها نادیده گرفته می‌شود).
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    for rows in chunk_sizes(n_paths, len(pnl) + 1, max_bytes):
+        kept = rng.random((rows, len(pnl))) >= skip_prob
+        yield _cumulative_paths(np.multiply(kept, pnl), initial_capital)
+
+
+def default_block_length(n_returns):
+    """طول بلوک پیش‌فرض bootstrap: n^(1/3) (حداقل 1)"""
+    return max(1, int(round(n_returns ** (1 / 3))))
+
+
+def block_bootstrap_paths(returns, initial_capital, n_paths, rng, max_bytes, block_length=None):
+    """
+    bootstrap بلوکی حلقوی: هر مسیر از بلوک‌های پشت سر هم با شروع تصادفی ساخته می‌شود
+    تا خودهمبستگی کوتاه‌مدت بازده‌ها (و خوشه‌های نوسان) حفظ شود.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n = len(returns)
+    if n == 0:
+        return
+    block_length = block_length or default_block_length(n)
+    n_blocks = math.ceil(n / block_length)
+    offsets = np.arange(block_length)
+
+    for rows in chunk_sizes(n_paths, n + 1, max_bytes):
+        starts = rng.integers(0, n, size=(rows, n_blocks, 1))
+        index = (starts + offsets).reshape(rows, -1)[:, :n]
+
+        paths = np.empty((rows, n + 1))
+        paths[:, 0] = initial_capital
+        growth = paths[:, 1:]
+        # mode="wrap": بلوک‌هایی که از انتهای سری رد می‌شوند از ابتدا ادامه می‌یابند
+        np.take(returns, index, out=growth, mode="wrap")
+        del index
+        growth += 1.0
+        np.cumprod(growth, axis=1, out=growth)
+        growth *= initial_capital
+        yield paths
+
+
+# =========================================
+# Path Statistics
+# =========================================
+
+def path_stats(paths, periods_per_year):
+    """
+    شاخص‌های هر ردیف ماتریس سرمایه: (max drawdown کسری، سرمایه نهایی، Sharpe).
+    Sharpe مسیرهایی که سرمایه‌شان به صفر یا کمتر رسیده NaN است.
+    """
+    peak = np.maximum.accumulate(paths, axis=1)
+    # (peak - v) / peak == 1 - v / peak؛ نتیجه درجا در بافر peak
+    np.divide(paths, peak, out=peak)
+    max_dd = 1.0 - peak.min(axis=1)
+    del peak
+
+    final = paths[:, -1].copy()
+    ruined = paths.min(axis=1) <= 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = paths[:, 1:] / paths[:, :-1]
+        returns -= 1.0
+        mean = returns.mean(axis=1)
+        std = returns.std(axis=1)
+        sharpe = np.where(std > 0, mean / std, 0.0) * math.sqrt(periods_per_year or 0)
+    if returns.shape[1] < 2 or not periods_per_year:
+        sharpe[:] = 0.0
+    sharpe[ruined] = np.nan
+    return max_dd, final, sharpe
+
+
+def simulate(paths, periods_per_year):
+    """اجرای مولد مسیرها و جمع کردن فقط شاخص‌های هر مسیر (نه خود مسیرها)"""
+    parts = [path_stats(chunk, periods_per_year) for chunk in paths]
+    if not parts:
+        return {"max_drawdown": np.empty(0), "final_equity": np.empty(0), "sharpe": np.empty(0)}
+    max_dd, final, sharpe = (np.concatenate(column) for column in zip(*parts))
+    return {"max_drawdown": max_dd, "final_equity": final, "sharpe": sharpe}
+
+
+def _trades_per_year(trades):
+    """تعداد ترید در سال (برای سالانه کردن Sharpe مسیرهای تریدی)"""
+    if not len(trades):
+        return None
+    if hasattr(trades, "column"):
+        entry, exit_ = trades.column("entry_time"), trades.column("exit_time")
+    else:
+        entry = np.array([pd.Timestamp(t["entry_time"]).value for t in trades]).view("datetime64[ns]")
+        exit_ = np.array([pd.Timestamp(t["exit_time"]).value for t in trades]).view("datetime64[ns]")
+    span = (exit_.max() - entry.min()) / np.timedelta64(1, "D") / 365.25
+    return len(trades) / span if span > 0 else None
+
+
+# =========================================
+# Report
+# =========================================
+
+def summarize_samples(samples, actual, initial_capital, confidence=0.95):
+    """جدول توزیع شاخص‌ها: مقدار واقعی، میانگین، میانه و بازه اطمینان صدکی"""
+    lo, hi = (1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100
+    columns = {
+        "Max Drawdown (%)": samples["max_drawdown"] * 100,
+        "Final Equity ($)": samples["final_equity"],
+        "Sharpe Ratio": samples["sharpe"],
+    }
+    rows = {}
+    for name, values in columns.items():
+        values = values[~np.isnan(values)]
+        if not len(values):
+            rows[name] = {"Actual": actual[name]}
+            continue
+        ci_low, median, ci_high = np.percentile(values, [lo, 50, hi])
+        rows[name] = {
+            "Actual": actual[name],
+            "Mean": float(values.mean()),
+            "Std": float(values.std()),
+            f"CI {confidence:.0%} Low": ci_low,
+            "Median": median,
+            f"CI {confidence:.0%} High": ci_high,
+        }
+
+    summary = pd.DataFrame(rows).T.loc[METRICS]
+    n_paths = len(samples["final_equity"])
+    summary.attrs["paths"] = n_paths
+    summary.attrs["loss_probability"] = float(np.mean(samples["final_equity"] < initial_capital)) if n_paths else 0.0
+    summary.attrs["ruin_probability"] = float(np.mean(np.isnan(samples["sharpe"]))) if n_paths else 0.0
+    return summary
+
+
+def _actual(values, periods_per_year):
+    values = np.asarray(values, dtype=np.float64)
+    returns = np.diff(values) / values[:-1]
+    return {
+        "Max Drawdown (%)": float(running_drawdown(values).max() * 100) if len(values) else 0.0,
+        "Final Equity ($)": float(values[-1]) if len(values) else 0.0,
+        "Sharpe Ratio": sharpe_ratio(returns, periods_per_year),
+    }
+
+
+def robustness_analysis(trades, equity, initial_capital, n_paths=10_000, methods=METHODS,
+                        block_length=None, skip_prob=0.1, confidence=0.95, seed=42,
+                        max_bytes=64 * 1024 ** 2):
+    """
+    trades: portfolio.trades (TradeLedger یا لیست dict)
+    equity: portfolio.equity (EquityCurve کندلی) یا لیست سرمایه بعد از هر ترید
+    خروجی: dict روش -> DataFrame خلاصه (attrs: paths, loss_probability, ruin_probability)
+    """
+    rng = np.random.default_rng(seed)
+    pnl, _ = trade_arrays(trades)
+    trade_periods = _trades_per_year(trades)
+    trade_actual = _actual(np.concatenate(([initial_capital], initial_capital + np.cumsum(pnl))), trade_periods)
+
+    if isinstance(equity, EquityCurve):
+        values, bar_periods = equity.values, equity.periods_per_year()
+    else:
+        values, bar_periods = np.asarray(equity, dtype=np.float64), HOURLY_PERIODS_PER_YEAR
+
+    results = {}
+    for method in methods:
+        if method == "shuffle":
+            paths = trade_shuffle_paths(pnl, initial_capital, n_paths, rng, max_bytes)
+            samples, actual = simulate(paths, trade_periods), trade_actual
+        elif method == "skip":
+            paths = entry_skip_paths(pnl, initial_capital, n_paths, rng, max_bytes, skip_prob)
+            samples, actual = simulate(paths, trade_periods), trade_actual
+        elif method == "bootstrap":
+            returns = np.diff(values) / values[:-1]
+            start = values[0] if len(values) else initial_capital
+            paths = block_bootstrap_paths(returns, start, n_paths, rng, max_bytes, block_length)
+            samples, actual = simulate(paths, bar_periods), _actual(values, bar_periods)
+        else:
+            raise ValueError(f"Unknown robustness method: {method}")
+        results[method] = summarize_samples(samples, actual, initial_capital, confidence)
+    return results
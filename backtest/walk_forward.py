@@ -0,0 +1,299 @@
+### backtest/walk_forward.py ###
+# اعتبارسنجی walk-forward فیلتر AI: مدل روی هر پنجره زمانی آموزش می‌بیند و روی پنجره
+# بعدی (خارج از نمونه) هم به عنوان طبقه‌بند و هم با بک‌تست کامل (BacktestEngine) ارزیابی می‌شود.
+# ویژگی‌ها و سیگنال‌ها برای هر ارز فقط یک بار ساخته می‌شوند و در shared memory بین
+# foldها (که موازی در پروسه‌های جدا اجرا می‌شوند) مشترک هستند.
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.strategy import DualSupertrendStrategy
+from core.risk_manager import RiskManager
+from core.portfolio import MultiAssetPortfolio
+from core.features import AI_FEATURE_COLS
+from core.equity import EquityCurve
+from backtest.engine import BacktestEngine
+from backtest.metrics import calculate_metrics
+from backtest.optimizer import SharedArrays, attach_arrays
+
+
+# برچسب (همان scripts/train_ai_model.py): بازده بیش از 1% در 8 کندل بعد
+TARGET_HORIZON = 8
+TARGET_RETURN = 0.01
+
+# کندل‌های قبل از پنجره آزمون که برای گرم شدن اندیکاتورها به موتور داده می‌شوند
+# (موتور از کندل 200 شروع می‌کند، پس معاملات دقیقاً از ابتدای پنجره آزمون است)
+WARMUP_BARS = 200
+
+BAR_COLUMNS = ("high", "low", "close", "atr", "signal")
+
+# وضعیت هر پروسه کارگر (یک بار در initializer پر می‌شود)
+_WORKER = {}
+
+
+# =========================================
+# Folds
+# =========================================
+
+def make_folds(start, end, train_period, test_period, step=None, expanding=False):
+    """
+    پنجره‌های زمانی پشت سر هم: آموزش [train_start, test_start) و آزمون [test_start, test_end).
+    expanding=True: آموزش همیشه از start (پنجره رو به رشد)، در غیر این صورت طول ثابت train_period.
+    پنجره آزمون ناقص انتهایی فقط اگر حداقل نصف test_period باشد نگه داشته می‌شود.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    train_period, test_period = pd.Timedelta(train_period), pd.Timedelta(test_period)
+    step = pd.Timedelta(step) if step is not None else test_period
+
+    folds = []
+    test_start = start + train_period
+    while test_start < end:
+        if end - test_start < test_period / 2:
+            break
+        folds.append({
+            "fold": len(folds),
+            "train_start": start if expanding else test_start - train_period,
+            "train_end": test_start,
+            "test_start": test_start,
+            "test_end": min(test_start + test_period, end),
+        })
+        test_start += step
+    return folds
+
+
+# =========================================
+# Features (once per asset)
+# =========================================
+
+def build_target(close, horizon=TARGET_HORIZON, threshold=TARGET_RETURN):
+    """1 اگر بازده horizon کندل بعد از threshold بیشتر باشد؛ NaN برای کندل‌های بدون آینده"""
+    close = np.asarray(close, dtype=np.float64)
+    target = np.full(len(close), np.nan)
+    if len(close) > horizon:
+        target[:-horizon] = (close[horizon:] / close[:-horizon] - 1 > threshold).astype(np.float64)
+    return target
+
+
+def prepare_assets(data_dict, strategy):
+    """
+    سیگنال‌های استراتژی، ویژگی‌های AI (همان ستون‌های BacktestEngine) و برچسب هر ارز
+    به صورت آرایه‌های مسطح برای shared memory.
+    """
+    arrays = {}
+    for symbol, df in data_dict.items():
+        df = BacktestEngine._precalculate_ai_features(strategy.generate_signals(df))
+        arrays[f"{symbol}/time"] = df.index.values.astype("datetime64[ns]").view(np.int64)
+        for col in BAR_COLUMNS:
+            arrays[f"{symbol}/{col}"] = df[col].to_numpy(dtype=np.float64)
+        arrays[f"{symbol}/features"] = df[AI_FEATURE_COLS].to_numpy(dtype=np.float64)
+        arrays[f"{symbol}/target"] = build_target(df["close"])
+    return arrays
+
+
+# =========================================
+# Workers
+# =========================================
+
+def _init_worker(spec, symbols, assets_config, settings_dict):
+    arrays, handles = attach_arrays(spec)
+    _WORKER.update(
+        arrays=arrays,
+        handles=handles,  # باید زنده بمانند تا view ها معتبر باشند
+        symbols=symbols,
+        assets_config=assets_config,
+        settings=settings_dict,
+    )
+
+
+def _fold_rows(times, fold):
+    """محدوده ردیف‌های آموزش و آزمون یک ارز؛ ردیف‌هایی که برچسبشان به آزمون می‌رسد حذف می‌شوند"""
+    train_lo, train_hi, test_lo, test_hi = np.searchsorted(times, [
+        fold["train_start"].value, fold["train_end"].value,
+        fold["test_start"].value, fold["test_end"].value,
+    ])
+    return train_lo, min(train_hi, test_lo - TARGET_HORIZON), test_lo, test_hi
+
+
+def _valid(features, target):
+    return ~(np.isnan(features).any(axis=1) | np.isnan(target))
+
+
+def _backtest(frames, model, settings, fold):
+    """بک‌تست پنجره آزمون با یک پرتفوی تازه؛ model=None یعنی بدون فیلتر AI"""
+    initial_capital = settings["initial_capital"]
+    portfolio = MultiAssetPortfolio(initial_capital, _WORKER["assets_config"])
+    engine = BacktestEngine(
+        portfolio, DualSupertrendStrategy(settings["strategy_params"]),
+        RiskManager(initial_capital, settings["risk_per_trade"]),
+        ai_model=model, ai_threshold=settings["threshold"],
+        chronological=settings["chronological"],
+    )
+    engine.run_signals(frames)
+
+    # پوزیشن‌های باز در انتهای پنجره با آخرین قیمت بسته می‌شوند تا بازده پنجره‌ها مستقل باشد
+    for symbol in list(portfolio.positions):
+        df = frames[symbol]
+        portfolio.close_position(symbol, df["close"].iloc[-1], df.index[-1], reason="End")
+
+    # منحنی mark-to-market کندلی فقط روی پنجره آزمون (کندل‌های گرم شدن بدون معامله و بازده صفر هستند)
+    equity = portfolio.equity
+    keep = equity.times >= pd.Timestamp(fold["test_start"]).to_datetime64()
+    return calculate_metrics(
+        portfolio.trades, EquityCurve(equity.times[keep], equity.values[keep]), initial_capital,
+        start_date=fold["test_start"], end_date=fold["test_end"]
+    )
+
+
+def _run_fold(fold):
+    # xgboost و sklearn فقط در پروسه‌های کارگر (import سنگین برای شروع دستور لازم نیست)
+    from sklearn.metrics import accuracy_score, precision_score, roc_auc_score
+    from xgboost import XGBClassifier
+
+    arrays = _WORKER["arrays"]
+    settings = _WORKER["settings"]
+
+    X_train, y_train, X_test, y_test, test_signal = [], [], [], [], []
+    frames = {}
+    for symbol in _WORKER["symbols"]:
+        times = arrays[f"{symbol}/time"]
+        features, target = arrays[f"{symbol}/features"], arrays[f"{symbol}/target"]
+        train_lo, train_hi, test_lo, test_hi = _fold_rows(times, fold)
+
+        if train_hi > train_lo:
+            keep = _valid(features[train_lo:train_hi], target[train_lo:train_hi])
+            X_train.append(features[train_lo:train_hi][keep])
+            y_train.append(target[train_lo:train_hi][keep])
+        if test_hi > test_lo:
+            keep = _valid(features[test_lo:test_hi], target[test_lo:test_hi])
+            X_test.append(features[test_lo:test_hi][keep])
+            y_test.append(target[test_lo:test_hi][keep])
+            test_signal.append(arrays[f"{symbol}/signal"][test_lo:test_hi][keep] == 1)
+
+            # پنجره آزمون + کندل‌های گرم شدن؛ ویژگی‌های آماده باعث می‌شوند موتور آن‌ها را دوباره نسازد
+            lo = max(0, test_lo - WARMUP_BARS)
+            frame = {col: arrays[f"{symbol}/{col}"][lo:test_hi] for col in BAR_COLUMNS}
+            frame.update(zip(AI_FEATURE_COLS, features[lo:test_hi].T))
+            frames[symbol] = pd.DataFrame(
+                frame, index=pd.DatetimeIndex(times[lo:test_hi].view("datetime64[ns]")), copy=False
+            )
+
+    row = {key: fold[key] for key in ("fold", "train_start", "train_end", "test_start", "test_end")}
+    X_train = np.concatenate(X_train) if X_train else np.empty((0, len(AI_FEATURE_COLS)))
+    y_train = np.concatenate(y_train) if y_train else np.empty(0)
+    row["Train Rows"] = len(y_train)
+    if not X_test:
+        # هیچ ارزی در پنجره آزمون کندل ندارد (مثلاً وقفه در داده)؛ مدلی آموزش داده نمی‌شود
+        row["Test Rows"] = 0
+        return row
+    if len(np.unique(y_train)) < 2:
+        # بدون هر دو کلاس مدلی ساخته نمی‌شود
+        return row
+
+    model = XGBClassifier(**settings["model_params"])
+    model.fit(X_train, y_train.astype(int))
+
+    # ارزیابی طبقه‌بند روی کندل‌های خارج از نمونه
+    X_test, y_test = np.concatenate(X_test), np.concatenate(y_test).astype(int)
+    test_signal = np.concatenate(test_signal)
+    row["Test Rows"] = len(y_test)
+    if len(y_test):
+        proba = model.predict_proba(X_test)[:, 1]
+        approved = proba > settings["threshold"]
+        row["Accuracy"] = accuracy_score(y_test, approved)
+        row["Precision"] = precision_score(y_test, approved, zero_division=0)
+        row["AUC"] = roc_auc_score(y_test, proba) if len(np.unique(y_test)) == 2 else np.nan
+        # کیفیت فیلتر روی کندل‌های سیگنال: نرخ موفقیت تایید شده‌ها در برابر همه سیگنال‌ها
+        gated = approved & test_signal
+        row["Signal Base Rate"] = y_test[test_signal].mean() if test_signal.any() else np.nan
+        row["Gate Precision"] = y_test[gated].mean() if gated.any() else np.nan
+        row["Gate Pass (%)"] = gated.sum() / test_signal.sum() * 100 if test_signal.any() else np.nan
+
+    # بک‌تست پنجره آزمون با و بدون فیلتر AI
+    if frames:
+        metrics = _backtest(frames, model, settings, fold)
+        baseline = _backtest(frames, None, settings, fold)
+        for key in ("Total Return (%)", "Max Drawdown (%)", "Win Rate (%)", "Sharpe Ratio", "Total Trades"):
+            row[key] = metrics[key]
+        row["Baseline Return (%)"] = baseline["Total Return (%)"]
+        row["Baseline Trades"] = baseline["Total Trades"]
+    return row
+
+
+# =========================================
+# Walk-Forward
+# =========================================
+
+def run_walk_forward(data_dict, assets_config, strategy_params, model_params,
+                     train_period, test_period, step=None, expanding=False,
+                     initial_capital=1000.0, risk_per_trade=0.01, threshold=0.5,
+                     workers=None, chronological=False):
+    """
+    آموزش و ارزیابی همه foldها (موازی، هر fold در یک پروسه).
+    خروجی: DataFrame با یک ردیف برای هر fold.
+    """
+    starts = [df.index[0] for df in data_dict.values() if len(df)]
+    ends = [df.index[-1] for df in data_dict.values() if len(df)]
+    if not starts:
+        return pd.DataFrame()
+    # مرز انتهایی باز است؛ آخرین کندل هم داخل آخرین پنجره آزمون باشد
+    folds = make_folds(min(starts), max(ends) + pd.Timedelta(1, "ns"),
+                       train_period, test_period, step=step, expanding=expanding)
+    if not folds:
+        return pd.DataFrame()
+
+    arrays = prepare_assets(data_dict, DualSupertrendStrategy(strategy_params))
+    model_params = dict(model_params)
+    if workers != 1:
+        # موازی‌سازی در سطح fold است؛ هر مدل تک نخی تا هسته‌ها اشباع نشوند
+        model_params.setdefault("n_jobs", 1)
+    settings_dict = {
+        "strategy_params": strategy_params,
+        "model_params": model_params,
+        "initial_capital": initial_capital,
+        "risk_per_trade": risk_per_trade,
+        "threshold": threshold,
+        "chronological": chronological,
+    }
+    symbols = list(data_dict)
+
+    shared = SharedArrays(arrays)
+    del arrays
+    try:
+        initargs = (shared.spec, symbols, assets_config, settings_dict)
+        if workers == 1:
+            _init_worker(*initargs)
+            rows = [_run_fold(fold) for fold in folds]
+        else:
+            n_workers = min(workers or os.cpu_count() or 1, len(folds))
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=initargs) as pool:
+                rows = list(pool.map(_run_fold, folds))
+    finally:
+        if workers == 1:
+            handles = _WORKER.pop("handles", [])
+            _WORKER.clear()
+            for shm in handles:
+                shm.close()
+        shared.close()
+
+    return pd.DataFrame(rows)
+
+
+def summarize_walk_forward(results):
+    """خلاصه همه foldها: میانگین شاخص‌ها و بازده مرکب پنجره‌های آزمون پشت سر هم"""
+    if results.empty or "Total Return (%)" not in results:
+        return {}
+    returns = results["Total Return (%)"].dropna() / 100
+    baseline = results["Baseline Return (%)"].dropna() / 100
+    return {
+        "Folds": len(results),
+        "Mean AUC": results["AUC"].mean(),
+        "Mean Gate Precision": results["Gate Precision"].mean(),
+        "Mean Signal Base Rate": results["Signal Base Rate"].mean(),
+        "Compounded Return (%)": (np.prod(1 + returns) - 1) * 100,
+        "Baseline Compounded Return (%)": (np.prod(1 + baseline) - 1) * 100,
+        "Worst Fold Return (%)": returns.min() * 100,
+        "Total Trades": int(results["Total Trades"].sum()),
+    }
@@ -12,9 +12,7 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
 MODEL_DIR = os.path.join(BASE_DIR, "outputs", "model_checkpoints")
 
-# اطمینان از وجود پوشه‌های خروجی
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(MODEL_DIR, exist_ok=True)
+# پوشه‌های خروجی هنگام import ساخته نمی‌شوند؛ هر نویسنده (گزارش، CSV، مدل) پوشه خودش را می‌سازد
 
 # --- پارامترهای استراتژی ---
 STRATEGY_PARAMS = {
@@ -23,9 +21,82 @@ STRATEGY_PARAMS = {
     "st_multiplier": 3.0,
     "st_fast_period": 7,
     "st_fast_multiplier": 2.0,
-    "atr_period": 14
+    "atr_period": 14,
+    # فیلتر روند (EMA و سوپرترند اصلی) روی تایم فریم بالاتر، مثلاً "1d"؛ None: همان تایم فریم داده
+    "trend_timeframe": None,
 }
 
 # --- مدیریت ریسک و سرمایه ---
 INITIAL_CAPITAL = 1000.0
 RISK_PER_TRADE = 0.01
+
+# --- موتور بک‌تست ---
+# True: همه نمادها در یک جریان رویداد به ترتیب زمان (سرمایه مشترک به ترتیب واقعی)
+# False: هر نماد جدا و پشت سر هم (رفتار قبلی، مبنای گزارش‌های موجود)
+BACKTEST_CHRONOLOGICAL = False
+# کندل‌هایی که هم SL و هم TP را لمس می‌کنند: True ترتیب واقعی را از داده تایم فریم پایین‌تر
+# انبار (backtest/intrabar) می‌خواند؛ False فرض «اول SL». دانلود: download_data.py --timeframes 1m
+INTRABAR_RESOLUTION = False
+# ترتیب ترجیح؛ اولین تایم فریم موجود در انبار برای هر نماد استفاده می‌شود
+INTRABAR_TIMEFRAMES = ["1m", "5m"]
+
+# --- فیلتر هوش مصنوعی ---
+# حداقل احتمال کلاس 1 برای تایید ورود در معاملات کاغذی
+AI_PROBA_THRESHOLD = 0.6
+
+# پارامترهای XGBoost (scripts/train_ai_model.py و walk-forward)
+AI_MODEL_PARAMS = {
+    "n_estimators": 200,
+    "max_depth": 5,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "eval_metric": "logloss",
+    "random_state": 42,
+}
+
+# --- اعتبارسنجی walk-forward فیلتر AI (scripts/run_walk_forward.py) ---
+# "rolling": پنجره آموزش با طول ثابت جلو می‌رود | "expanding": آموزش از ابتدای داده
+WALK_FORWARD_MODE = "rolling"
+WALK_FORWARD_TRAIN_DAYS = 365
+WALK_FORWARD_TEST_DAYS = 90
+
+# --- تحلیل استحکام Monte Carlo / bootstrap (scripts/run_robustness.py) ---
+MONTE_CARLO_PATHS = 10_000
+# احتمال حذف هر ورود در روش skip
+MONTE_CARLO_SKIP_PROB = 0.1
+# سقف حافظه هر تکه از مسیرها
+MONTE_CARLO_CHUNK_MB = 64
+
+# --- حساب معاملات کاغذی (core/paper_account) ---
+# "json": بازنویسی کامل فایل با هر معامله | "journal": ژورنال JSONL + اسنپ‌شات | "sqlite": SQLite (WAL)
+PAPER_STATE_BACKEND = "journal"
+
+# --- فضای جستجوی بهینه‌ساز پارامترها (scripts/run_optimizer.py) ---
+PARAM_GRID = {
+    "ema_period": [100, 200],
+    "st_period": [7, 10, 14],
+    "st_multiplier": [2.0, 3.0, 4.0],
+    "st_fast_period": [5, 7],
+    "st_fast_multiplier": [1.5, 2.0],
+    "atr_period": [14, 21],
+    # تایم فریم فیلتر روند؛ برای مقایسه: --param trend_timeframe=none,4h,1d (هر مقدار تعداد ترکیب‌ها را چند برابر می‌کند)
+    "trend_timeframe": [None],
+}
+OPTIMIZER_METRIC = "Sharpe Ratio"
+
+# --- کش اندیکاتورها (core/indicators) ---
+INDICATOR_CACHE_MB = 256
+# لایه دیسک اختیاری (پیش‌فرض خاموش: فقط حافظه)؛ برای فعال کردن مثلاً:
+# INDICATOR_CACHE_DIR = os.path.join(DATA_DIR, "cache", "indicators")
+INDICATOR_CACHE_DIR = None
+
+# --- اندازه‌گیری عملکرد مراحل (core/instrumentation) ---
+# فقط مراحل (نه هر رویداد حلقه) زمان‌سنجی می‌شوند؛ خاموش: timer ها بی‌اثر هستند.
+# برای یک اجرا بدون تغییر این مقدار: --profile در run_backtest / run_paper_trading
+INSTRUMENTATION_ENABLED = False
+# خلاصه JSON زمان مراحل در پایان scripts/run_backtest.py
+BACKTEST_PROFILE_FILE = os.path.join(OUTPUT_DIR, "backtest_profile.json")
+# فایل متنی Prometheus حلقه لایو (برای node_exporter textfile collector) و فاصله به‌روزرسانی (ثانیه)
+LIVE_METRICS_FILE = os.path.join(OUTPUT_DIR, "live_metrics.prom")
+LIVE_METRICS_REFRESH = 15
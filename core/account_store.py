@@ -0,0 +1,346 @@
+### core/account_store.py ###
+# ذخیره‌سازی وضعیت PaperAccount:
+#   json    : کل کیف پول در یک فایل JSON (رفتار قبلی؛ بازنویسی کامل با هر تغییر)
+#   journal : هر رویداد یک خط در فایل JSONL فقط-افزودنی + اسنپ‌شات فشرده دوره‌ای
+#   sqlite  : همان ژورنال/اسنپ‌شات داخل SQLite در حالت WAL
+# اسنپ‌شات فشرده فقط capital، پوزیشن‌های باز و تعداد تریدهای بسته را دارد. با هر اسنپ‌شات
+# تریدهای بسته جدید به تاریخچه فقط-افزودنی منتقل و رویدادهای ژورنال تا آن لحظه حذف می‌شوند؛
+# پس هزینه هر معامله، هر اسنپ‌شات و بارگذاری مستقل از طول تاریخچه رویدادهاست.
+import os
+import json
+import sqlite3
+from pathlib import Path
+
+
+SNAPSHOT_EVERY = 100  # هر چند رویداد یک اسنپ‌شات گرفته شود
+
+
+def empty_state(initial_capital):
+    return {"capital": initial_capital, "positions": {}, "history": []}
+
+
+def apply_event(state, event):
+    """اعمال یک رویداد ژورنال روی وضعیت (همان تغییرات open/close_position)"""
+    symbol = event["symbol"]
+    if event["type"] == "open":
+        state["capital"] -= event["cost"]
+        state["positions"][symbol] = event["position"]
+    elif event["type"] == "close":
+        state["capital"] += event["revenue"]
+        state["history"].append(event["trade"])
+        state["positions"].pop(symbol, None)
+    else:
+        raise ValueError(f"Unknown journal event: {event['type']}")
+    return state
+
+
+def _atomic_write_json(path, data, indent=None, fsync=True):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent, default=str)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def compact_snapshot(seq, state):
+    """اسنپ‌شات بدون history: trades تعداد تریدهای بسته تا seq (طول معتبر فایل تاریخچه)"""
+    return {
+        "seq": seq,
+        "capital": state["capital"],
+        "positions": state["positions"],
+        "trades": len(state["history"]),
+    }
+
+
+def restore_state(snapshot, history, events, source):
+    """
+    بازسازی وضعیت از اسنپ‌شات فشرده، تاریخچه تریدهای تا اسنپ‌شات و رویدادهای (seq, event) به ترتیب.
+    رویدادهای تا seq اسنپ‌شات (باقی‌مانده از کرش پیش از حذف ژورنال) نادیده گرفته می‌شوند.
+    خروجی: (state، آخرین seq، تعداد رویدادهای بعد از اسنپ‌شات)
+    """
+    if snapshot is None:
+        raise ValueError(f"Journal without snapshot: {source}")
+    if len(history) != snapshot["trades"]:
+        raise ValueError(f"Trade history is incomplete: {source}")
+
+    state = {"capital": snapshot["capital"], "positions": snapshot["positions"], "history": history}
+    seq = snapshot["seq"]
+    pending = 0
+    for event_seq, event in events:
+        if event_seq <= seq:
+            continue
+        if event_seq != seq + 1:
+            raise ValueError(f"Journal is missing events after seq {seq}: {source}")
+        apply_event(state, event)
+        seq = event_seq
+        pending += 1
+    return state, seq, pending
+
+
+def read_json_state(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {
+        "capital": data["capital"],
+        "positions": data["positions"],
+        "history": data.get("history", []),
+    }
+
+
+# =========================================
+# Backends
+# =========================================
+
+class JsonStateStore:
+    """کل وضعیت در یک فایل JSON (فرمت paper_wallet.json)؛ نوشتن اتمیک با فایل موقت"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def exists(self):
+        return self.path.exists()
+
+    def load(self):
+        return read_json_state(self.path) if self.exists() else None
+
+    def record(self, event, state):
+        self.snapshot(state)
+
+    def snapshot(self, state):
+        _atomic_write_json(self.path, state, indent=4, fsync=False)
+
+    def close(self):
+        pass
+
+
+class JournalStateStore:
+    """
+    ژورنال JSONL رویدادهای بعد از آخرین اسنپ‌شات (<base>.journal.jsonl)، اسنپ‌شات فشرده
+    (<base>.snapshot.json) و تاریخچه فقط-افزودنی تریدهای بسته (<base>.history.jsonl).
+    هر رویداد شماره ترتیبی (seq) دارد و اسنپ‌شات آخرین seq را نگه می‌دارد؛ با هر اسنپ‌شات
+    تریدهای جدید به تاریخچه اضافه و ژورنال خالی می‌شود.
+    """
+
+    def __init__(self, base_path, snapshot_every=SNAPSHOT_EVERY, fsync=True):
+        base = Path(base_path)
+        base = base.with_suffix("") if base.suffix == ".json" else base
+        self.snapshot_path = base.with_name(base.name + ".snapshot.json")
+        self.journal_path = base.with_name(base.name + ".journal.jsonl")
+        self.history_path = base.with_name(base.name + ".history.jsonl")
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.seq = 0
+        self.pending = 0
+        self.archived = 0       # تعداد تریدهای فایل تاریخچه
+        self._journal = None
+
+    def exists(self):
+        return self.snapshot_path.exists() or self.journal_path.exists()
+
+    def load(self):
+        if not self.exists():
+            return None
+
+        snapshot = None
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+
+        history = self._read_history(snapshot["trades"]) if snapshot else []
+        events = ((event["seq"], event) for event in self._read_journal())
+        self.archived = len(history)
+        state, self.seq, self.pending = restore_state(snapshot, history, events, self.journal_path)
+        return state
+
+    def _read_history(self, count):
+        """count ترید اول فایل تاریخچه؛ خطوط بعد از آن (کرش پیش از نوشتن اسنپ‌شات) حذف می‌شوند"""
+        history = []
+        if not self.history_path.exists():
+            return history
+        good = 0
+        with open(self.history_path, "rb") as f:
+            for line in f:
+                if len(history) == count or not line.endswith(b"\n"):
+                    break
+                try:
+                    history.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                good += len(line)
+            extra = f.seek(0, os.SEEK_END) > good
+        if extra and len(history) == count:
+            with open(self.history_path, "r+b") as f:
+                f.truncate(good)
+        return history
+
+    def _read_journal(self):
+        if not self.journal_path.exists():
+            return
+        good = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    event = None
+                if event is None or not line.endswith(b"\n"):
+                    break
+                good += len(line)
+                yield event
+            torn = f.tell() > good
+        if torn:
+            # خط آخر نیمه‌نوشته (کرش حین نوشتن) رویداد ثبت نشده است؛ حذف می‌شود تا
+            # رویدادهای بعدی پشت آن نوشته نشوند
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+
+    def record(self, event, state):
+        self.seq += 1
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        self._journal.write(json.dumps(dict(event, seq=self.seq), default=str) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self.pending += 1
+        if self.pending >= self.snapshot_every:
+            self.snapshot(state)
+
+    def snapshot(self, state):
+        # ترتیب نوشتن برای تحمل کرش: تاریخچه، اسنپ‌شات و در آخر خالی کردن ژورنال
+        new_trades = state["history"][self.archived:]
+        if new_trades:
+            with open(self.history_path, "a") as f:
+                f.writelines(json.dumps(trade, default=str) + "\n" for trade in new_trades)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.archived = len(state["history"])
+        _atomic_write_json(self.snapshot_path, compact_snapshot(self.seq, state))
+
+        self.close()
+        with open(self.journal_path, "w"):
+            pass
+        self.pending = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class SqliteStateStore:
+    """
+    رویدادهای بعد از آخرین اسنپ‌شات، اسنپ‌شات فشرده و تاریخچه تریدهای بسته در یک فایل
+    SQLite (journal_mode=WAL)؛ هر اسنپ‌شات در یک تراکنش رویدادهای قبل از خود را حذف می‌کند.
+    """
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY):
+        path = Path(path)
+        self.path = path.with_suffix(".db") if path.suffix == ".json" else path
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self.pending = 0
+        self.archived = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY, event TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS snapshots (seq INTEGER PRIMARY KEY, state TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS history (position INTEGER PRIMARY KEY, trade TEXT NOT NULL)")
+        return self._conn
+
+    def exists(self):
+        if not self.path.exists():
+            return False
+        row = self.conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM snapshots) OR EXISTS(SELECT 1 FROM events)"
+        ).fetchone()
+        return bool(row[0])
+
+    def load(self):
+        if not self.exists():
+            return None
+
+        row = self.conn.execute("SELECT state FROM snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+        snapshot = json.loads(row[0]) if row else None
+        history = [
+            json.loads(text) for (text,) in self.conn.execute(
+                "SELECT trade FROM history ORDER BY position LIMIT ?", (snapshot["trades"] if snapshot else 0,)
+            )
+        ]
+        events = (
+            (seq, json.loads(text))
+            for seq, text in self.conn.execute(
+                "SELECT seq, event FROM events WHERE seq > ? ORDER BY seq", (snapshot["seq"] if snapshot else 0,)
+            )
+        )
+        self.archived = len(history)
+        state, self.seq, self.pending = restore_state(snapshot, history, events, self.path)
+        return state
+
+    def record(self, event, state):
+        self.seq += 1
+        with self.conn:
+            self.conn.execute("INSERT INTO events (seq, event) VALUES (?, ?)",
+                              (self.seq, json.dumps(event, default=str)))
+        self.pending += 1
+        if self.pending >= self.snapshot_every:
+            self.snapshot(state)
+
+    def snapshot(self, state):
+        # تریدهای جدید، اسنپ‌شات و حذف رویدادهای قبلی در یک تراکنش
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO history (position, trade) VALUES (?, ?)",
+                ((i, json.dumps(trade, default=str))
+                 for i, trade in enumerate(state["history"][self.archived:], self.archived)),
+            )
+            snapshot = compact_snapshot(self.seq, state)
+            self.conn.execute("INSERT OR REPLACE INTO snapshots (seq, state) VALUES (?, ?)",
+                              (self.seq, json.dumps(snapshot, default=str)))
+            self.conn.execute("DELETE FROM snapshots WHERE seq < ?", (self.seq,))
+            self.conn.execute("DELETE FROM events WHERE seq <= ?", (self.seq,))
+        self.archived = len(state["history"])
+        self.pending = 0
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+BACKENDS = {
+    "json": JsonStateStore,
+    "journal": JournalStateStore,
+    "sqlite": SqliteStateStore,
+}
+
+
+def open_state_store(backend, state_file, **kwargs):
+    """ساخت backend از روی نام؛ مسیر فایل‌های ژورنال/دیتابیس از state_file ساخته می‌شود"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown state backend: {backend} (choose from {', '.join(BACKENDS)})")
+    if backend == "json":
+        return JsonStateStore(state_file)
+    return BACKENDS[backend](state_file, **kwargs)
+
+
+def migrate_json_state(json_path, store):
+    """
+    انتقال paper_wallet.json موجود به backend جدید به عنوان اسنپ‌شات اولیه.
+    فایل JSON دست نمی‌خورد؛ خروجی: وضعیت منتقل شده یا None.
+    """
+    if store.exists() or not Path(json_path).exists():
+        return None
+    state = read_json_state(json_path)
+    store.snapshot(state)
+    return state
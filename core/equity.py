@@ -0,0 +1,167 @@
+### core/equity.py ###
+# منحنی سرمایه mark-to-market در سطح کندل: نقد + ارزش پوزیشن‌های باز با قیمت close.
+# در حلقه بک‌تست فقط رویدادهای معامله (تغییر نقد و تعداد) در بافر NumPy ثبت می‌شوند (O(1))؛
+# منحنی کامل یک بار و به صورت برداری روی محور زمانی همه نمادها ساخته می‌شود.
+import numpy as np
+import pandas as pd
+
+
+NS_PER_YEAR = 365 * 24 * 3600 * 1e9
+
+
+def annual_periods(step_ns):
+    """تعداد کندل در سال برای فاصله step_ns نانوثانیه (سالانه کردن شاخص‌ها)؛ None برای فاصله نامعتبر"""
+    return NS_PER_YEAR / step_ns if step_ns and step_ns > 0 else None
+
+
+class EventBuffer:
+    """بافر ستونی از پیش تخصیص یافته که با پر شدن دو برابر می‌شود"""
+
+    def __init__(self, dtypes, capacity=1024):
+        self.size = 0
+        self.capacity = capacity
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self._arrays = list(self.columns.values())
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, arr in self.columns.items():
+            grown = np.empty(self.capacity, dtype=arr.dtype)
+            grown[:self.size] = arr[:self.size]
+            self.columns[name] = grown
+        self._arrays = list(self.columns.values())
+
+    def append(self, *values):
+        """یک ردیف به ترتیب ستون‌های dtypes"""
+        if self.size == self.capacity:
+            self._grow()
+        i = self.size
+        for arr, value in zip(self._arrays, values):
+            arr[i] = value
+        self.size = i + 1
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.size]
+
+    def __len__(self):
+        return self.size
+
+
+class EquityCurve:
+    """سری سرمایه با ایندکس زمانی (آرایه‌های times از نوع datetime64[ns] و values)"""
+
+    def __init__(self, times, values):
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def to_series(self):
+        return pd.Series(self.values, index=pd.DatetimeIndex(self.times, name="time"), name="equity")
+
+    def returns(self):
+        return np.diff(self.values) / self.values[:-1]
+
+    def periods_per_year(self):
+        """تعداد کندل در سال از روی فاصله میانه زمان‌ها (برای سالانه کردن شاخص‌ها)"""
+        if len(self.times) < 2:
+            return None
+        return annual_periods(np.median(np.diff(self.times.view(np.int64))))
+
+
+class EquityTracker:
+    """
+    ثبت رویدادهای معامله و قیمت‌های هر نماد و ساخت EquityCurve:
+    ارزش پوزیشن نماد s در زمان t برابر size_s(t) * close_s(آخرین کندل <= t) است.
+    """
+
+    def __init__(self, initial_capital):
+        self.initial_capital = initial_capital
+        self.prices = {}  # symbol -> (times int64 ns, close)
+        self.events = EventBuffer({
+            "time": np.int64, "symbol": np.int32, "size": np.float64, "cash": np.float64,
+        })
+        self.symbol_ids = {}
+        self._curve = None
+
+    def register_prices(self, symbol, index, close):
+        """قیمت‌های close نماد (بدون کپی) برای ارزش‌گذاری پوزیشن‌های باز"""
+        times = np.asarray(index.values.astype("datetime64[ns]")).view(np.int64)
+        self.prices[symbol] = (times, np.asarray(close, dtype=np.float64))
+        self._curve = None
+
+    def record(self, symbol, timestamp, size_delta, cash_delta):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbol_ids)
+        time_ns = timestamp.value if isinstance(timestamp, pd.Timestamp) else pd.Timestamp(timestamp).value
+        self.events.append(time_ns, symbol_id, size_delta, cash_delta)
+        self._curve = None
+
+    def _timeline(self):
+        times = [t for t, _ in self.prices.values()]
+        times.append(self.events["time"])
+        if len(times) == 1:
+            return np.unique(times[0])
+        return np.unique(np.concatenate(times))
+
+    @staticmethod
+    def _cost_basis_changes(size, cash):
+        """تغییر ارزش پوزیشن (به بهای تمام شده) در هر رویداد یک نماد؛ خروج جزئی به نسبت سایز"""
+        changes = np.empty(len(size), dtype=np.float64)
+        held = basis = 0.0
+        for i, (size_delta, cash_delta) in enumerate(zip(size.tolist(), cash.tolist())):
+            if size_delta > 0:
+                change = -cash_delta
+            else:
+                change = -basis * min(-size_delta / held, 1.0) if held > 0 else 0.0
+            held += size_delta
+            basis += change
+            changes[i] = change
+        return changes
+
+    def build(self):
+        """ساخت (و کش) منحنی روی اجتماع زمان‌های همه نمادها"""
+        if self._curve is not None:
+            return self._curve
+
+        timeline = self._timeline()
+        n = len(timeline)
+        event_time = self.events["time"]
+        event_symbol = self.events["symbol"]
+        event_size = self.events["size"]
+        event_pos = np.searchsorted(timeline, event_time)
+
+        # تغییرات ارزش در هر نقطه زمانی؛ با cumsum به سطح تبدیل می‌شود
+        deltas = np.bincount(event_pos, weights=self.events["cash"], minlength=n).astype(np.float64)
+
+        for symbol, symbol_id in self.symbol_ids.items():
+            mask = event_symbol == symbol_id
+            if symbol not in self.prices:
+                # بدون قیمت: پوزیشن با بهای تمام شده ارزش‌گذاری می‌شود؛ ورود اثر خنثی دارد و
+                # سود/زیان تحقق یافته در زمان خروج در منحنی می‌ماند
+                value_change = self._cost_basis_changes(event_size[mask], self.events["cash"][mask])
+                deltas += np.bincount(event_pos[mask], weights=value_change, minlength=n)
+                continue
+
+            times, close = self.prices[symbol]
+            own_pos = np.searchsorted(times, event_time[mask])
+            size = np.cumsum(np.bincount(own_pos, weights=event_size[mask], minlength=len(times)))
+            # کندل‌های بدون پوزیشن صفر (حتی اگر close نامعتبر باشد)
+            value = np.where(size != 0, size * close, 0.0)
+            value_change = np.diff(value, prepend=0.0)
+            # فقط کندل‌هایی که ارزش تغییر کرده روی محور زمانی پخش می‌شوند
+            changed = np.flatnonzero(value_change)
+            deltas += np.bincount(
+                np.searchsorted(timeline, times[changed]), weights=value_change[changed], minlength=n
+            )
+
+        values = np.empty(n, dtype=np.float64)
+        np.cumsum(deltas, out=values)
+        values += self.initial_capital
+        self._curve = EquityCurve(timeline.view("datetime64[ns]"), values)
+        return self._curve
@@ -0,0 +1,257 @@
+### core/features.py ###
+# pipeline واحد ویژگی‌های مدل AI برای آموزش، بک‌تست و معاملات لایو.
+# هر ویژگی (و هر مقدار میانی مثل ATR یا returns) یک گره با ورودی‌های اعلام شده است؛
+# گره‌ها به ترتیب وابستگی و هر کدام فقط یک بار محاسبه می‌شوند، در سه حالت:
+#   compute(df)       : batch روی کل دیتافریم (آموزش / بک‌تست)
+#   stream()          : وضعیت جریانی، O(1) برای هر کندل (حلقه لایو)
+#   compute_last(df)  : فقط آخرین ردیف به صورت آرایه (1, n) برای predict_proba
+# نسخه schema کنار مدل ذخیره می‌شود تا مدلی که با تعریف دیگری از ویژگی‌ها آموزش دیده
+# هنگام لود رد شود.
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.indicators import calculate_atr, calculate_rsi, calculate_adx
+from core.streaming import (
+    StreamingATR, StreamingRSI, StreamingADX, StreamingRollingMean, StreamingRollingStd, _safe_div, NaN
+)
+from data.feature_store import ewm_warmup
+
+
+# با هر تغییر در تعریف یا ترتیب ویژگی‌ها افزایش یابد
+FEATURE_SCHEMA_VERSION = 1
+
+# ترتیب ستون‌ها باید دقیقاً مثل زمان آموزش باشد
+AI_FEATURE_COLS = ["atr_pct", "return_std", "rsi", "adx", "volume_z"]
+
+RAW_INPUTS = ("high", "low", "close", "volume")
+
+
+class FeatureSchemaError(ValueError):
+    """مدل با تعریف دیگری از ویژگی‌ها آموزش دیده است"""
+
+
+# =========================================
+# Nodes
+# =========================================
+
+class FeatureNode:
+    """
+    inputs: نام ستون‌های خام (high/low/close/volume) یا گره‌های دیگر.
+    batch(df, *inputs): سری کامل (df دیتافریم OHLCV اصلی برای اندیکاتورهای کش‌شده)
+    stream(): شیء با update(*inputs) برای یک کندل.
+    warmup: کندل لازم تا مقدار گره (با ورودی‌های معتبر) به نسخه batch برسد.
+    """
+
+    def __init__(self, name, inputs, batch, stream, warmup=0):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.batch = batch
+        self.stream = stream
+        self.warmup = warmup
+
+
+class _Stateless:
+    """گره جریانی بدون وضعیت (تابع عنصر به عنصر)"""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def update(self, *values):
+        return self.fn(*values)
+
+
+class _ReturnsStream:
+    def __init__(self):
+        self.prev = NaN
+
+    def update(self, close):
+        value = _safe_div(close, self.prev) - 1
+        self.prev = close
+        return value
+
+
+def ai_feature_nodes(atr_period=14, rsi_period=14, adx_period=14, window=20):
+    wilder = ewm_warmup(alpha=1 / rsi_period)
+    return [
+        # مقادیر میانی مشترک
+        FeatureNode("returns", ["close"], lambda df, close: close.pct_change(), _ReturnsStream, 1),
+        FeatureNode("atr", ["high", "low", "close"],
+                    lambda df, *_: calculate_atr(df, atr_period),
+                    lambda: _Stateless(StreamingATR(atr_period).update), atr_period + 1),
+        FeatureNode("volume_mean", ["volume"], lambda df, volume: volume.rolling(window).mean(),
+                    lambda: _Stateless(StreamingRollingMean(window).update), window),
+        FeatureNode("volume_std", ["volume"], lambda df, volume: volume.rolling(window).std(),
+                    lambda: _Stateless(StreamingRollingStd(window).update), window),
+
+        # ویژگی‌های مدل
+        FeatureNode("atr_pct", ["atr", "close"], lambda df, atr, close: atr / close,
+                    lambda: _Stateless(_safe_div)),
+        FeatureNode("return_std", ["returns"], lambda df, returns: returns.rolling(window).std(),
+                    lambda: _Stateless(StreamingRollingStd(window).update), window + 1),
+        FeatureNode("rsi", ["close"], lambda df, close: calculate_rsi(close, rsi_period),
+                    lambda: _Stateless(StreamingRSI(rsi_period).update), wilder),
+        FeatureNode("adx", ["high", "low", "close"], lambda df, *_: calculate_adx(df, adx_period),
+                    lambda: _Stateless(StreamingADX(adx_period).update), 2 * ewm_warmup(alpha=1 / adx_period)),
+        FeatureNode("volume_z", ["volume", "volume_mean", "volume_std"],
+                    lambda df, volume, mean, std: (volume - mean) / std,
+                    lambda: _Stateless(lambda volume, mean, std: _safe_div(volume - mean, std))),
+    ]
+
+
+# =========================================
+# Pipeline
+# =========================================
+
+class FeaturePipeline:
+    def __init__(self, nodes, columns, version, params=None):
+        self.nodes = {node.name: node for node in nodes}
+        self.columns = list(columns)
+        self.version = version
+        self.params = dict(params or {})
+        self.plan = self._plan(self.columns)
+
+    def _plan(self, columns):
+        """گره‌های لازم برای columns به ترتیب وابستگی (هر گره یک بار)"""
+        order, seen = [], set()
+
+        def visit(name, path=()):
+            if name in RAW_INPUTS or name in seen:
+                return
+            if name in path:
+                raise ValueError(f"Feature dependency cycle: {' -> '.join(path + (name,))}")
+            if name not in self.nodes:
+                raise KeyError(f"Unknown feature: {name}")
+            for dep in self.nodes[name].inputs:
+                visit(dep, path + (name,))
+            seen.add(name)
+            order.append(self.nodes[name])
+
+        for column in columns:
+            visit(column)
+        return order
+
+    @property
+    def warmup(self):
+        """کندل‌های گرم شدن: مجموع warmup در طولانی‌ترین زنجیره وابستگی"""
+        depth = {}
+        for node in self.plan:
+            depth[node.name] = node.warmup + max((depth.get(dep, 0) for dep in node.inputs), default=0)
+        return max(depth[column] for column in self.columns)
+
+    def schema(self):
+        return {"version": self.version, "columns": self.columns, "params": self.params}
+
+    # --- batch ---
+
+    def compute(self, df, columns=None):
+        """ستون‌های ویژگی برای همه ردیف‌های df (ردیف‌های گرم شدن NaN)"""
+        plan = self.plan if columns is None else self._plan(columns)
+        values = {name: df[name] for name in RAW_INPUTS if name in df.columns}
+        for node in plan:
+            values[node.name] = node.batch(df, *(values[dep] for dep in node.inputs))
+        return pd.DataFrame({col: values[col] for col in (columns or self.columns)}, index=df.index)
+
+    def compute_last(self, df):
+        """ویژگی‌های آخرین ردیف با شکل (1, n)؛ None اگر هنوز NaN داشته باشد"""
+        features = self.compute(df).to_numpy(dtype=np.float64)[-1:]
+        return None if len(features) == 0 or np.isnan(features).any() else features
+
+    # --- streaming ---
+
+    def stream(self):
+        return FeatureStream(self)
+
+
+class FeatureStream:
+    """حالت جریانی pipeline: هر کندل بسته شده با یک update، هر گره یک بار"""
+
+    def __init__(self, pipeline):
+        self.columns = pipeline.columns
+        self.steps = [(node.name, node.inputs, node.stream()) for node in pipeline.plan]
+        self.values = {}
+        self.features = None
+
+    def update(self, high, low, close, volume):
+        values = self.values
+        values.update(high=high, low=low, close=close, volume=volume)
+        for name, inputs, state in self.steps:
+            values[name] = state.update(*(values[dep] for dep in inputs))
+
+        features = np.array([[values[col] for col in self.columns]])
+        # هندل کردن مقادیر NaN
+        self.features = None if np.isnan(features).any() else features
+        return self.features
+
+    def seed(self, df):
+        """گرم کردن با داده تاریخی (یک بار، O(n))"""
+        columns = [df[c].to_numpy(dtype=np.float64).tolist() for c in RAW_INPUTS]
+        for high, low, close, volume in zip(*columns):
+            self.update(high, low, close, volume)
+        return self
+
+
+AI_PIPELINE = FeaturePipeline(
+    ai_feature_nodes(), AI_FEATURE_COLS, FEATURE_SCHEMA_VERSION,
+    params={"atr_period": 14, "rsi_period": 14, "adx_period": 14, "window": 20},
+)
+
+
+# =========================================
+# Model + Schema
+# =========================================
+
+def schema_path(model_path):
+    """فایل schema کنار مدل: market_condition_xgb.pkl -> market_condition_xgb.schema.json"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + ".schema.json")
+
+
+def save_model(model, path, pipeline=AI_PIPELINE):
+    import joblib
+
+    joblib.dump(model, path)
+    schema_path(path).write_text(json.dumps(pipeline.schema(), indent=2), encoding="utf-8")
+
+
+def check_schema(schema, pipeline=AI_PIPELINE, model=None):
+    if schema["version"] != pipeline.version or list(schema["columns"]) != pipeline.columns:
+        raise FeatureSchemaError(
+            f"Model was trained on feature schema v{schema['version']} {schema['columns']}, "
+            f"pipeline is v{pipeline.version} {pipeline.columns}; retrain the model"
+        )
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features is not None and n_features != len(pipeline.columns):
+        raise FeatureSchemaError(f"Model expects {n_features} features, pipeline produces {len(pipeline.columns)}")
+
+
+def load_schema(path):
+    """
+    schema ذخیره شده کنار مدل. مدل‌های قدیمی بدون فایل schema نسخه 1
+    (تعریف scripts/train_ai_model.py پیش از pipeline) در نظر گرفته می‌شوند.
+    """
+    sidecar = schema_path(path)
+    if sidecar.exists():
+        return json.loads(sidecar.read_text(encoding="utf-8"))
+    return {"version": 1, "columns": AI_FEATURE_COLS}
+
+
+def load_model(path, pipeline=AI_PIPELINE, prefer_trees=False):
+    """
+    لود مدل و بررسی schema ویژگی‌ها.
+    prefer_trees: اگر خروجی درخت‌های همین مدل (core/tree_model) موجود باشد ارزیاب NumPy آن
+    برگردانده می‌شود (بدون joblib/xgboost، لود و استنتاج تک ردیفی سریع‌تر).
+    """
+    model = None
+    if prefer_trees:
+        from core.tree_model import load_trees
+
+        model = load_trees(path)
+    if model is None:
+        import joblib
+
+        model = joblib.load(path)
+    check_schema(load_schema(path), pipeline, model)
+    return model
@@ -1,37 +1,486 @@
 ### اصلاحیه کامل فایل core/indicators.py ###
+import os
+import hashlib
+import inspect
+import functools
+import importlib.util
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 
+# numba اختیاری است؛ در نبود آن نسخه NumPy استفاده می‌شود. خود import و کامپایل (یا خواندن
+# cache) هسته‌ها تا اولین محاسبه اندیکاتور عقب می‌افتد تا دستورهای بدون اندیکاتور سریع شروع شوند.
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+
+# =========================================
+# Indicator Cache
+# =========================================
+
+class IndicatorCache:
+    """
+    کش LRU برای خروجی اندیکاتورها با سقف حافظه (بایت) و لایه اختیاری روی دیسک.
+    کلید: (نام تابع، پارامترها، اثر انگشت داده ورودی)
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2, disk_dir=None, enabled=True):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"{key[0]}-{digest}.npy")
+
+    def get(self, key):
+        arr = self._entries.get(key)
+        if arr is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return arr
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    arr = np.load(path, allow_pickle=False)
+                except (OSError, ValueError):
+                    arr = None
+                if arr is not None:
+                    arr.flags.writeable = False  # مثل آرایه‌های put شده
+                    self.disk_hits += 1
+                    self._store(key, arr)
+                    return arr
+
+        self.misses += 1
+        return None
+
+    def put(self, key, arr):
+        arr = np.array(arr, copy=True)
+        arr.flags.writeable = False
+        self._store(key, arr)
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, arr, allow_pickle=False)
+            os.replace(tmp_path, path)  # نوشتن اتمیک
+
+    def _store(self, key, arr):
+        if arr.nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = arr
+        self._bytes += arr.nbytes
+
+        # حذف قدیمی‌ترین آیتم‌ها تا رسیدن به سقف حافظه
+        while self._bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+_CACHE = IndicatorCache()
+
+
+def configure_cache(max_bytes=None, disk_dir=None, enabled=None):
+    """تنظیم کش سراسری اندیکاتورها (disk_dir=None یعنی فقط حافظه)"""
+    if max_bytes is not None:
+        _CACHE.max_bytes = max_bytes
+    if enabled is not None:
+        _CACHE.enabled = enabled
+    _CACHE.disk_dir = disk_dir
+    return _CACHE
+
+
+def cache_stats():
+    """شمارنده‌های hit/miss کش اندیکاتورها"""
+    return _CACHE.stats()
+
+
+def clear_cache():
+    _CACHE.clear()
+
+
+def data_fingerprint(data, columns=None):
+    """اثر انگشت محتوای ستون‌های ورودی (مستقل از ایندکس)"""
+    h = hashlib.sha1()
+    series_list = [data] if isinstance(data, pd.Series) else [data[c] for c in columns]
+    for series in series_list:
+        arr = np.ascontiguousarray(series.to_numpy())
+        if arr.dtype.kind not in "fiub":
+            return None
+        h.update(f"{arr.dtype.str}{arr.shape}".encode())
+        h.update(memoryview(arr).cast("B"))
+    return h.hexdigest()
+
+
+def cached_indicator(columns=None):
+    """
+    دکوراتور کش برای توابع اندیکاتور. columns ستون‌هایی از DataFrame است که
+    خروجی به آن‌ها وابسته است (برای ورودی Series نیازی نیست).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(data, *args, **kwargs):
+            if not _CACHE.enabled:
+                return func(data, *args, **kwargs)
+
+            bound = signature.bind(data, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple((k, repr(v)) for k, v in list(bound.arguments.items())[1:])
+
+            fingerprint = data_fingerprint(data, columns)
+            if fingerprint is None:
+                return func(data, *args, **kwargs)
+
+            key = (func.__name__, params, fingerprint)
+            arr = _CACHE.get(key)
+            if arr is None:
+                result = func(data, *args, **kwargs)
+                _CACHE.put(key, result.to_numpy() if isinstance(result, pd.Series) else result)
+                return result
+
+            if isinstance(data, (pd.Series, pd.DataFrame)) and arr.ndim == 1:
+                name = data.name if isinstance(data, pd.Series) else None
+                return pd.Series(arr.copy(), index=data.index, name=name)
+            return arr.copy()
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+# =========================================
+# Kernels
+# =========================================
+# هسته‌های اندیکاتور روی آرایه‌های float64 خام با بافر خروجی از پیش تخصیص یافته (out).
+# هر هسته در یک یا دو گذر و بدون آرایه موقت هم‌اندازه داده کار می‌کند و خروجی آن
+# بیت به بیت با نسخه pandas برابر است (همان ترتیب عملیات rolling/ewm در pandas).
+# در نبود numba همان محاسبه با pandas انجام و در out کپی می‌شود.
+
+def _ewm_alpha(span=None, alpha=None):
+    """alpha مؤثر pandas: ابتدا com ساخته و alpha از آن به دست می‌آید"""
+    com = (span - 1) / 2.0 if span is not None else (1.0 - alpha) / alpha
+    return 1.0 / (1.0 + com)
+
+
+def _ewm_step(weighted, old_wt, cur, alpha):
+    """یک گام ewm(adjust=False, ignore_na=False).mean() در pandas"""
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if cur == cur:
+            # جلوگیری از خطای عددی روی سری ثابت (مثل pandas)
+            if weighted != cur:
+                weighted = old_wt * weighted + alpha * cur
+                weighted /= old_wt + alpha
+            old_wt = 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+def _true_range_at(high, low, close, i):
+    """True Range کندل i (بیشینه با نادیده گرفتن NaN، ردیف اول: high - low)"""
+    tr = high[i] - low[i]
+    if i > 0:
+        for value in (abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])):
+            if value == value and (tr != tr or value > tr):
+                tr = value
+    return tr
+
+
+def _ewm_loop(values, alpha, out):
+    weighted = np.nan
+    old_wt = 1.0
+    for i in range(len(values)):
+        weighted, old_wt = _ewm_step(weighted, old_wt, values[i], alpha)
+        out[i] = weighted
+    return out
+
+
+def _rolling_mean_loop(values, window, out):
+    """
+    معادل rolling(window).mean() در pandas: جمع Kahan جداگانه برای افزودن و حذف و
+    اصلاح مقادیر تکراری/علامت. پنجره آخر در یک بافر حلقوی نگه داشته می‌شود تا out
+    می‌تواند همان values باشد.
+    """
+    ring = np.empty(window)
+    nobs = 0
+    neg_ct = 0
+    sum_x = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    same = 0
+    prev = np.nan
+    for i in range(len(values)):
+        val = values[i]
+        if window == 1 or i == 0:
+            # پنجره‌ای که با قبلی هم‌پوشانی ندارد از صفر ساخته می‌شود
+            nobs = 0
+            neg_ct = 0
+            sum_x = 0.0
+            comp_add = 0.0
+            comp_remove = 0.0
+            same = 0
+            prev = val
+        elif i >= window:
+            old = ring[i % window]
+            if old == old:
+                nobs -= 1
+                y = -old - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if np.signbit(old):
+                    neg_ct -= 1
+        ring[i % window] = val
+
+        if val == val:
+            nobs += 1
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if np.signbit(val):
+                neg_ct += 1
+            if val == prev:
+                same += 1
+            else:
+                same = 1
+            prev = val
+
+        if nobs >= window:
+            result = sum_x / nobs
+            if same >= nobs:
+                result = prev
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+            out[i] = result
+        else:
+            out[i] = np.nan
+    return out
+
+
+def _true_range_loop(high, low, close, out):
+    for i in range(len(close)):
+        out[i] = _true_range_at(high, low, close, i)
+    return out
+
+
+def _rsi_loop(close, alpha, out):
+    avg_gain = avg_loss = np.nan
+    gain_wt = loss_wt = 1.0
+    for i in range(len(close)):
+        delta = close[i] - close[i - 1] if i > 0 else np.nan
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain, gain_wt = _ewm_step(avg_gain, gain_wt, gain, alpha)
+        avg_loss, loss_wt = _ewm_step(avg_loss, loss_wt, loss, alpha)
+        rs = avg_gain / avg_loss
+        out[i] = 100 - (100 / (1 + rs))
+    return out
+
+
+def _adx_loop(high, low, close, alpha, out):
+    tr_s = pdm_s = ndm_s = adx = np.nan
+    tr_wt = pdm_wt = ndm_wt = adx_wt = 1.0
+    for i in range(len(close)):
+        if i > 0:
+            up_move = high[i] - high[i - 1]
+            down_move = low[i - 1] - low[i]
+        else:
+            up_move = down_move = np.nan
+        pdm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        ndm = down_move if (down_move > up_move and down_move > 0) else 0.0
+
+        tr_s, tr_wt = _ewm_step(tr_s, tr_wt, _true_range_at(high, low, close, i), alpha)
+        pdm_s, pdm_wt = _ewm_step(pdm_s, pdm_wt, pdm, alpha)
+        ndm_s, ndm_wt = _ewm_step(ndm_s, ndm_wt, ndm, alpha)
+
+        pdi = 100 * (pdm_s / tr_s)
+        ndi = 100 * (ndm_s / tr_s)
+        dx = 100 * abs(pdi - ndi) / (pdi + ndi)
+        adx, adx_wt = _ewm_step(adx, adx_wt, dx, alpha)
+        out[i] = adx
+    return out
+
+
+_ewm_kernel = _rolling_mean_kernel = _true_range_kernel = _rsi_kernel = _adx_kernel = None
+_supertrend_kernel = _supertrend_batch_kernel = None
+_kernels_loaded = False
+
+
+def _load_kernels():
+    """
+    ساخت همه هسته‌های numba در اولین فراخوانی (هسته‌ها همدیگر را صدا می‌زنند، پس یکجا).
+    خروجی: True اگر هسته‌ها آماده‌اند، False برای مسیر NumPy/pandas.
+    """
+    global _kernels_loaded, _ewm_step, _true_range_at
+    global _ewm_kernel, _rolling_mean_kernel, _true_range_kernel, _rsi_kernel, _adx_kernel
+    global _supertrend_kernel, _supertrend_batch_kernel
+    if _kernels_loaded:
+        return _ewm_kernel is not None
+    _kernels_loaded = True
+    if not NUMBA_AVAILABLE:
+        return False
+    from numba import njit
+
+    # تقسیم بر صفر مثل NumPy (inf/NaN) به جای استثنا
+    _jit = njit(cache=True, nogil=True, error_model="numpy")
+    _ewm_step = _jit(_ewm_step)
+    _true_range_at = _jit(_true_range_at)
+    _ewm_kernel = _jit(_ewm_loop)
+    _rolling_mean_kernel = _jit(_rolling_mean_loop)
+    _true_range_kernel = _jit(_true_range_loop)
+    _rsi_kernel = _jit(_rsi_loop)
+    _adx_kernel = _jit(_adx_loop)
+    _supertrend_kernel = njit(cache=True, nogil=True)(_supertrend_loop)
+    _supertrend_batch_kernel = njit(cache=True, nogil=True)(_supertrend_batch_loop)
+    return True
+
+
+def _as_float(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _output(n, out):
+    if out is None:
+        return np.empty(n)
+    if out.shape != (n,) or out.dtype != np.float64:
+        raise ValueError(f"out must be a float64 array of shape ({n},)")
+    return out
+
+
+def ewm_kernel(values, span=None, alpha=None, out=None):
+    """ewm(span|alpha, adjust=False).mean() روی آرایه؛ out می‌تواند همان values باشد"""
+    values = _as_float(values)
+    out = _output(len(values), out)
+    alpha = _ewm_alpha(span, alpha)
+    if not _load_kernels():
+        out[:] = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        return out
+    return _ewm_kernel(values, alpha, out)
+
+
+def rolling_mean_kernel(values, window, out=None):
+    """rolling(window).mean() روی آرایه؛ out می‌تواند همان values باشد"""
+    values = _as_float(values)
+    out = _output(len(values), out)
+    if not _load_kernels():
+        out[:] = pd.Series(values).rolling(window).mean().to_numpy()
+        return out
+    return _rolling_mean_kernel(values, int(window), out)
+
+
+def true_range_kernel(high, low, close, out=None):
+    """True Range (ردیف اول: high - low)"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    out = _output(len(close), out)
+    if not _load_kernels():
+        out[:] = _true_range_numpy(high, low, close)
+        return out
+    return _true_range_kernel(high, low, close, out)
+
+
+def atr_kernel(high, low, close, period=14, out=None):
+    """ATR در دو گذر روی همان بافر out (True Range و سپس میانگین غلتان درجا)"""
+    out = true_range_kernel(high, low, close, out)
+    return rolling_mean_kernel(out, period, out)
+
+
+def rsi_kernel(close, period=14, out=None):
+    """RSI (Wilder) در یک گذر"""
+    close = _as_float(close)
+    out = _output(len(close), out)
+    if not _load_kernels():
+        out[:] = _rsi_pandas(pd.Series(close), period).to_numpy()
+        return out
+    return _rsi_kernel(close, _ewm_alpha(alpha=1 / period), out)
+
+
+def adx_kernel(high, low, close, period=14, out=None):
+    """ADX در یک گذر (چهار EWM به صورت همزمان، بدون ستون موقت)"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    out = _output(len(close), out)
+    if not _load_kernels():
+        out[:] = _adx_pandas(pd.DataFrame({"high": high, "low": low, "close": close}), period).to_numpy()
+        return out
+    return _adx_kernel(high, low, close, _ewm_alpha(alpha=1 / period), out)
+
+
+def _columns(df):
+    return (df["high"].to_numpy(dtype=np.float64), df["low"].to_numpy(dtype=np.float64),
+            df["close"].to_numpy(dtype=np.float64))
+
 
 # =========================================
 # Basic Indicators
 # =========================================
+# wrapper های pandas (با کش) روی هسته‌های بالا
 
+@cached_indicator()
 def ema(series, period):
     """Exponential Moving Average"""
-    return series.ewm(span=period, adjust=False).mean()
+    return pd.Series(ewm_kernel(series.to_numpy(dtype=np.float64), span=period), index=series.index, name=series.name)
 
 
+@cached_indicator(columns=("high", "low", "close"))
 def calculate_atr(df, period=14):
     """Average True Range"""
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
-
-    tr1 = high - low
-    tr2 = (high - close.shift()).abs()
-    tr3 = (low - close.shift()).abs()
-
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(period).mean()
+    return pd.Series(atr_kernel(*_columns(df), period), index=df.index)
 
 
 # Alias for compatibility
 atr = calculate_atr
 
 
+@cached_indicator()
 def calculate_rsi(series, period=14):
     """Relative Strength Index"""
+    return pd.Series(rsi_kernel(series.to_numpy(dtype=np.float64), period), index=series.index, name=series.name)
+
+
+@cached_indicator(columns=("high", "low", "close"))
+def calculate_adx(df, period=14):
+    """Average Directional Index"""
+    return pd.Series(adx_kernel(*_columns(df), period), index=df.index)
+
+
+# --- نسخه‌های pandas قبلی: مرجع برابری و مسیر جایگزین در نبود numba ---
+
+def _rsi_pandas(series, period=14):
     delta = series.diff()
     gain = delta.where(delta > 0, 0)
     loss = -delta.where(delta < 0, 0)
@@ -44,8 +493,20 @@ def calculate_rsi(series, period=14):
     return rsi
 
 
-def calculate_adx(df, period=14):
-    """Average Directional Index"""
+def _atr_pandas(df, period=14):
+    high = df["high"]
+    low = df["low"]
+    close = df["close"]
+
+    tr1 = high - low
+    tr2 = (high - close.shift()).abs()
+    tr3 = (low - close.shift()).abs()
+
+    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    return tr.rolling(period).mean()
+
+
+def _adx_pandas(df, period=14):
     df = df.copy()
     alpha = 1 / period
 
@@ -55,7 +516,7 @@ def calculate_adx(df, period=14):
     df['pdm'] = np.where((df['up_move'] > df['down_move']) & (df['up_move'] > 0), df['up_move'], 0)
     df['ndm'] = np.where((df['down_move'] > df['up_move']) & (df['down_move'] > 0), df['down_move'], 0)
 
-    df['tr'] = calculate_atr(df, period=1)
+    df['tr'] = _atr_pandas(df, period=1)
 
     df['tr_s'] = df['tr'].ewm(alpha=alpha, adjust=False).mean()
     df['pdm_s'] = df['pdm'].ewm(alpha=alpha, adjust=False).mean()
@@ -74,30 +535,36 @@ def calculate_adx(df, period=14):
 # Complex Indicators
 # =========================================
 
-def supertrend(df, period=10, multiplier=3):
-    """Supertrend Indicator (Optimized with NumPy)"""
-    atr_val = calculate_atr(df, period).fillna(0)
-    hl2 = (df["high"] + df["low"]) / 2
-
-    # محاسبه باندهای اولیه
-    upperband = hl2 + multiplier * atr_val
-    lowerband = hl2 - multiplier * atr_val
-
-    # تبدیل به آرایه نامپای برای سرعت و جلوگیری از وارنینگ
-    close = df["close"].values
-    upperband = upperband.values
-    lowerband = lowerband.values
-
-    final_upper = np.zeros(len(df))
-    final_lower = np.zeros(len(df))
-    trend = np.zeros(len(df))
+def _true_range_numpy(high, low, close):
+    """True Range به صورت آرایه (ردیف اول: high - low)"""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+
+    # fmax مقادیر NaN را مثل pandas.max(skipna) نادیده می‌گیرد
+    tr = np.fmax(high - low, np.abs(high - prev_close))
+    return np.fmax(tr, np.abs(low - prev_close))
+
+
+def _supertrend_loop(upperband, lowerband, close):
+    """
+    هسته بازگشتی سوپرترند (باندهای نهایی و جهت روند).
+    همین تابع در صورت وجود numba کامپایل می‌شود و در غیر این صورت
+    مرجع نسخه NumPy برای داده‌های دارای NaN است.
+    """
+    n = len(close)
+    final_upper = np.zeros(n)
+    final_lower = np.zeros(n)
+    trend = np.zeros(n)
+    if n == 0:
+        return trend
 
     # مقداردهی اولیه
     final_upper[0] = upperband[0]
     final_lower[0] = lowerband[0]
     trend[0] = 1
 
-    for i in range(1, len(df)):
+    for i in range(1, n):
         # محاسبه Final Upper Band
         if upperband[i] < final_upper[i - 1] or close[i - 1] > final_upper[i - 1]:
             final_upper[i] = upperband[i]
@@ -122,4 +589,172 @@ def supertrend(df, period=10, multiplier=3):
             else:
                 trend[i] = -1
 
+    return trend
+
+
+def _supertrend_batch_loop(hl2, close, atr_rows, atr_index, multipliers, trends):
+    """
+    چند جفت (period, multiplier) روی یک hl2/close مشترک.
+    atr_rows برای هر period یکتا یک ردیف دارد و atr_index ردیف هر جفت را مشخص می‌کند؛
+    نتیجه در trends با شکل (k, n) نوشته می‌شود.
+    """
+    k = len(multipliers)
+    n = len(close)
+    if n == 0:
+        return trends
+
+    # هر ردیف پیوسته پردازش می‌شود تا دسترسی به حافظه ترتیبی بماند
+    for j in range(k):
+        m = multipliers[j]
+        atr_row = atr_rows[atr_index[j]]
+        trend = trends[j]
+
+        final_upper = hl2[0] + m * atr_row[0]
+        final_lower = hl2[0] - m * atr_row[0]
+        state = 1
+        trend[0] = 1
+
+        for i in range(1, n):
+            upper = hl2[i] + m * atr_row[i]
+            lower = hl2[i] - m * atr_row[i]
+            prev_upper = final_upper
+            prev_lower = final_lower
+
+            if upper < prev_upper or close[i - 1] > prev_upper:
+                final_upper = upper
+            if lower > prev_lower or close[i - 1] < prev_lower:
+                final_lower = lower
+
+            if state == 1:
+                if close[i] < prev_lower:
+                    state = -1
+            elif close[i] > prev_upper:
+                state = 1
+            trend[i] = state
+
+    return trends
+
+
+def _final_band(band, close, upper=True, chunk=32):
+    """
+    باند نهایی بدون حلقه کندل به کندل: بین دو ریست، باند بالا کمینه تجمعی
+    (و باند پایین بیشینه تجمعی) باند اولیه است. ریست وقتی رخ می‌دهد که
+    close کندل قبل از باند نهایی عبور کند؛ هر بخش با یک accumulate پیدا می‌شود.
+    """
+    n = len(band)
+    out = np.empty(n)
+    accumulate = np.minimum.accumulate if upper else np.maximum.accumulate
+
+    s = 0
+    while s < n:
+        window = chunk
+        while True:
+            e = min(n, s + window)
+            seg = accumulate(band[s:e])
+            if upper:
+                reset = close[s:e - 1] > seg[:-1]
+            else:
+                reset = close[s:e - 1] < seg[:-1]
+
+            k = int(np.argmax(reset)) if len(reset) else 0
+            if len(reset) and reset[k]:
+                out[s:s + k + 1] = seg[:k + 1]
+                s += k + 1
+                break
+            if e == n:
+                out[s:] = seg
+                s = n
+                break
+            window *= 4
+
+    return out
+
+
+def _supertrend_numpy(upperband, lowerband, close):
+    """نسخه NumPy هسته سوپرترند (خروجی دقیقاً برابر با _supertrend_loop)"""
+    n = len(close)
+    if n == 0:
+        return np.zeros(0)
+
+    # مقایسه با NaN در حلقه مرجع رفتار خاصی دارد؛ این حالت نادر را به مرجع بسپار
+    if not (np.isfinite(upperband).all() and np.isfinite(lowerband).all()):
+        return _supertrend_loop(upperband, lowerband, close)
+
+    final_upper = _final_band(upperband, close, upper=True)
+    final_lower = _final_band(lowerband, close, upper=False)
+
+    # رویدادهای تغییر روند نسبت به باندهای کندل قبل
+    down = close[1:] < final_lower[:-1]
+    up = close[1:] > final_upper[:-1]
+
+    state = np.zeros(n)
+    state[0] = 1
+    state[1:][down & ~up] = -1
+    state[1:][up & ~down] = 1
+    both = np.flatnonzero(down & up) + 1
+
+    # آخرین رویداد تا هر کندل (forward fill روی اندیس‌ها)
+    event_idx = np.arange(n)
+    event_idx[state == 0] = 0
+    if len(both):
+        event_idx[both] = both
+    event_idx = np.maximum.accumulate(event_idx)
+
+    # اگر هر دو شرط برقرار باشد، روند قبلی برعکس می‌شود
+    for b in both:
+        state[b] = -state[event_idx[b - 1]]
+
+    return state[event_idx]
+
+
+@cached_indicator(columns=("high", "low", "close"))
+def supertrend(df, period=10, multiplier=3):
+    """Supertrend Indicator (numba kernel with NumPy fallback)"""
+    atr_val = calculate_atr(df, period).fillna(0).to_numpy(dtype=np.float64)
+    hl2 = ((df["high"] + df["low"]) / 2).to_numpy(dtype=np.float64)
+
+    # محاسبه باندهای اولیه
+    upperband = hl2 + multiplier * atr_val
+    lowerband = hl2 - multiplier * atr_val
+    close = df["close"].to_numpy(dtype=np.float64)
+
+    if _load_kernels():
+        trend = _supertrend_kernel(upperband, lowerband, close)
+    else:
+        trend = _supertrend_numpy(upperband, lowerband, close)
+
     return pd.Series(trend, index=df.index)
+
+
+@cached_indicator(columns=("high", "low", "close"))
+def supertrend_batch(df, params):
+    """
+    جهت سوپرترند برای چند جفت (period, multiplier) به صورت یکجا.
+    True Range یک بار و ATR برای هر period یکتا فقط یک بار محاسبه می‌شود.
+    خروجی: آرایه int8 دو بعدی (len(params), len(df)) با همان مقادیر supertrend.
+    """
+    params = [(int(p), float(m)) for p, m in params]
+    n = len(df)
+
+    tr = true_range_kernel(*_columns(df))
+    periods = sorted({period for period, _ in params})
+    atr_rows = np.empty((len(periods), n))
+    for row, period in enumerate(periods):
+        atr_row = rolling_mean_kernel(tr, period, out=atr_rows[row])
+        np.copyto(atr_row, 0.0, where=np.isnan(atr_row))
+
+    atr_index = np.array([periods.index(period) for period, _ in params], dtype=np.int64)
+    multipliers = np.array([m for _, m in params], dtype=np.float64)
+
+    hl2 = ((df["high"] + df["low"]) / 2).to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    trends = np.empty((len(params), n), dtype=np.int8)
+
+    if _load_kernels():
+        return _supertrend_batch_kernel(hl2, close, atr_rows, atr_index, multipliers, trends)
+
+    for j in range(len(params)):
+        atr_val = atr_rows[atr_index[j]]
+        m = multipliers[j]
+        trends[j] = _supertrend_numpy(hl2 + m * atr_val, hl2 - m * atr_val, close)
+    return trends
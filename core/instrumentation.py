@@ -0,0 +1,247 @@
+### core/instrumentation.py ###
+# ابزار سبک اندازه‌گیری: شمارنده، gauge و هیستوگرام تأخیر (timer) با نام‌های نقطه‌دار
+# مثل "engine.bar_loop" یا "live.fetch_ohlcv". در حالت خاموش (پیش‌فرض) timer یک شیء
+# بی‌اثر مشترک برمی‌گرداند و wrap خود تابع را، پس مسیرهای داغ عملاً هزینه‌ای ندارند.
+# خروجی: خلاصه JSON (پایان بک‌تست) و فایل متنی Prometheus (textfile collector) برای حلقه لایو.
+import os
+import json
+import time
+import bisect
+import functools
+
+# مرزهای سطل‌های هیستوگرام تأخیر (ثانیه)
+LATENCY_BUCKETS = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """هیستوگرام با سطل‌های ثابت + جمع/کمینه/بیشینه (حافظه ثابت)"""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # آخرین سطل: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """تخمین چندک با درون‌یابی خطی داخل سطل"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = self.bounds[i - 1] if i > 0 else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else self.max
+                value = lo + (hi - lo) * (rank - seen) / n
+                return min(max(value, self.min), self.max)
+            seen += n
+        return self.max
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0, "total": 0.0}
+        return {
+            "count": self.count,
+            "total": self.sum,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _Timer:
+    """context manager قابل استفاده مجدد (غیر تودرتو) که مدت را در هیستوگرام ثبت می‌کند"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Registry:
+    def __init__(self, enabled=False, prefix="trader"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        return hist
+
+    def timer(self, name):
+        """
+        with timer("engine.bar_loop"): ...
+        هر فراخوانی timer جدید می‌سازد (امن برای async)؛ در حلقه‌های داغ wrap را ترجیح دهید.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name))
+
+    def wrap(self, name, func):
+        """نسخه زمان‌دار func؛ در حالت خاموش خود func (بدون هیچ سربار)"""
+        if not self.enabled:
+            return func
+        hist = self.histogram(name)
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(clock() - start)
+
+        return timed
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+        self.started = time.time()
+
+    # --- خروجی ---
+
+    def summary(self):
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "timers": {name: hist.summary() for name, hist in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "gauges": dict(sorted(self.gauges.items())),
+        }
+
+    def write_json(self, path, **extra):
+        summary = self.summary()
+        summary.update(extra)
+        _atomic_write(path, json.dumps(summary, indent=2, default=str))
+
+    def _metric_name(self, name, suffix=""):
+        clean = "".join(c if c.isalnum() else "_" for c in name)
+        return f"{self.prefix}_{clean}{suffix}"
+
+    def to_prometheus(self):
+        """قالب متنی Prometheus (exposition format 0.0.4)"""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = self._metric_name(name, "_total")
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(self.gauges.items()):
+            metric = self._metric_name(name)
+            lines += [f"# TYPE {metric} gauge", f"{metric} {float(value)!r}"]
+        for name, hist in sorted(self.histograms.items()):
+            metric = self._metric_name(name, "_seconds")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(hist.bounds, hist.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound!r}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f"{metric}_sum {hist.sum!r}")
+            lines.append(f"{metric}_count {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """فایل برای node_exporter textfile collector (جایگزینی اتمیک)"""
+        _atomic_write(path, self.to_prometheus())
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+_REGISTRY = Registry()
+
+
+def configure_instrumentation(enabled=True, reset=False):
+    """روشن/خاموش کردن رجیستری سراسری"""
+    _REGISTRY.enabled = enabled
+    if reset:
+        _REGISTRY.reset()
+    return _REGISTRY
+
+
+def registry():
+    return _REGISTRY
+
+
+def enabled():
+    return _REGISTRY.enabled
+
+
+def timer(name):
+    return _REGISTRY.timer(name)
+
+
+def wrap(name, func):
+    return _REGISTRY.wrap(name, func)
+
+
+def count(name, n=1):
+    _REGISTRY.count(name, n)
+
+
+def gauge(name, value):
+    _REGISTRY.gauge(name, value)
+
+
+def summary():
+    return _REGISTRY.summary()
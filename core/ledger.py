@@ -0,0 +1,145 @@
+### core/ledger.py ###
+# دفتر معاملات ستونی: هر فیلد ترید یک بافر array.array رشدپذیر است (append سریع‌تر
+# از نوشتن تکی در آرایه NumPy) که بدون کپی به NumPy/DataFrame تبدیل می‌شود؛
+# به جای یک dict پایتونی برای هر ترید (~60 بایت در برابر چند صد بایت).
+# برای کدهای قبلی، ledger مثل لیست dict ها رفتار می‌کند (len، اندیس، برش، پیمایش).
+from array import array
+
+import numpy as np
+import pandas as pd
+
+
+TRADE_FIELDS = [
+    "symbol", "entry_price", "exit_price", "position_size",
+    "pnl", "pnl_pct", "entry_time", "exit_time", "reason",
+]
+
+# فیلد -> typecode بافر array (symbol و reason به صورت کد عددی ذخیره می‌شوند)
+FIELD_TYPES = {
+    "symbol": "i",
+    "entry_price": "d",
+    "exit_price": "d",
+    "position_size": "d",
+    "pnl": "d",
+    "pnl_pct": "d",
+    "entry_time": "q",
+    "exit_time": "q",
+    "reason": "h",
+}
+
+
+class _Codes:
+    """نگاشت رشته (نماد/دلیل خروج) به کد عددی و برعکس"""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def encode(self, name):
+        code = self.ids.get(name)
+        if code is None:
+            code = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def decode(self, codes):
+        return np.array(self.names, dtype=object)[codes] if self.names else np.empty(0, dtype=object)
+
+
+def _time_ns(value):
+    return value.value if isinstance(value, pd.Timestamp) else pd.Timestamp(value).value
+
+
+class TradeLedger:
+    """
+    دفتر معاملات ستونی. append/record یک ترید ثبت می‌کنند، to_frame خروجی DataFrame
+    بدون ساخت dict است و column(name) آرایه یک فیلد را برمی‌گرداند.
+    """
+
+    def __init__(self):
+        self.columns = {field: array(code) for field, code in FIELD_TYPES.items()}
+        self._appends = [column.append for column in self.columns.values()]
+        self.symbols = _Codes()
+        self.reasons = _Codes()
+        self.tz = None
+
+    def record(self, symbol, entry_price, exit_price, position_size, pnl, pnl_pct,
+               entry_time, exit_time, reason):
+        if not self.columns["pnl"] and isinstance(entry_time, pd.Timestamp):
+            self.tz = entry_time.tz
+        (add_symbol, add_entry_price, add_exit_price, add_size,
+         add_pnl, add_pnl_pct, add_entry_time, add_exit_time, add_reason) = self._appends
+        add_symbol(self.symbols.encode(symbol))
+        add_entry_price(entry_price)
+        add_exit_price(exit_price)
+        add_size(position_size)
+        add_pnl(pnl)
+        add_pnl_pct(pnl_pct)
+        add_entry_time(_time_ns(entry_time))
+        add_exit_time(_time_ns(exit_time))
+        add_reason(self.reasons.encode(reason))
+
+    def append(self, trade):
+        """سازگاری با trades.append(dict)"""
+        self.record(*(trade[field] for field in TRADE_FIELDS))
+
+    def column(self, name):
+        """آرایه یک فیلد (symbol/reason به صورت رشته، زمان‌ها datetime64[ns])"""
+        column = self.columns[name]
+        # کپی: تا وقتی نمای frombuffer زنده باشد بافر array قابل رشد نیست
+        values = np.frombuffer(column, dtype=column.typecode).copy()
+        if name == "symbol":
+            return self.symbols.decode(values)
+        if name == "reason":
+            return self.reasons.decode(values)
+        if name in ("entry_time", "exit_time"):
+            return values.view("datetime64[ns]")
+        return values
+
+    def to_frame(self):
+        df = pd.DataFrame({field: self.column(field) for field in TRADE_FIELDS})
+        if self.tz is not None:
+            for field in ("entry_time", "exit_time"):
+                df[field] = df[field].dt.tz_localize("UTC").dt.tz_convert(self.tz)
+        return df
+
+    # --- نمای سازگار با لیست dict ها ---
+
+    def _timestamp(self, ns):
+        if self.tz is None:
+            return pd.Timestamp(ns)
+        return pd.Timestamp(ns, tz="UTC").tz_convert(self.tz)
+
+    def _trade(self, i):
+        buf = self.columns
+        return {
+            "symbol": self.symbols.names[buf["symbol"][i]],
+            "entry_price": np.float64(buf["entry_price"][i]),
+            "exit_price": np.float64(buf["exit_price"][i]),
+            "position_size": np.float64(buf["position_size"][i]),
+            "pnl": np.float64(buf["pnl"][i]),
+            "pnl_pct": np.float64(buf["pnl_pct"][i]),
+            "entry_time": self._timestamp(buf["entry_time"][i]),
+            "exit_time": self._timestamp(buf["exit_time"][i]),
+            "reason": self.reasons.names[buf["reason"][i]],
+        }
+
+    def __len__(self):
+        return len(self.columns["pnl"])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._trade(j) for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("trade index out of range")
+        return self._trade(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._trade(i)
+
+    def __repr__(self):
+        return f"TradeLedger({len(self)} trades)"
@@ -1,17 +1,27 @@
 ### فایل core/paper_account.py ###
-import json
-import os
 import pandas as pd
 from datetime import datetime
 
+from core.account_store import empty_state, migrate_json_state, open_state_store
+from core import instrumentation
+
 
 class PaperAccount:
-    def __init__(self, initial_capital=1000, state_file="paper_wallet.json"):
+    def __init__(self, initial_capital=1000, state_file="paper_wallet.json", backend="json", store=None):
+        """
+        backend: "json" (کل کیف پول در state_file)، "journal" یا "sqlite"
+        (ژورنال رویدادها + اسنپ‌شات کنار state_file). در اولین اجرای backend جدید،
+        state_file قدیمی (JSON) به عنوان اسنپ‌شات اولیه منتقل می‌شود.
+        """
         self.state_file = state_file
         self.initial_capital = initial_capital
+        self.store = store or open_state_store(backend, state_file)
+
+        if backend != "json" and store is None and migrate_json_state(state_file, self.store) is not None:
+            print(f"📦 Migrated {state_file} to {backend} backend")
 
         # بارگذاری وضعیت قبلی یا ایجاد حساب جدید
-        if os.path.exists(self.state_file):
+        if self.store.exists():
             self.load_state()
         else:
             self.capital = initial_capital
@@ -19,21 +29,30 @@ class PaperAccount:
             self.history = []
             self.save_state()
 
-    def save_state(self):
-        data = {
+    def _state(self):
+        return {
             "capital": self.capital,
             "positions": self.positions,
             "history": self.history
         }
-        with open(self.state_file, "w") as f:
-            json.dump(data, f, indent=4, default=str)
+
+    def save_state(self):
+        """ذخیره کامل وضعیت (در backend های ژورنالی یعنی یک اسنپ‌شات)"""
+        with instrumentation.timer("account.snapshot"):
+            self.store.snapshot(self._state())
 
     def load_state(self):
-        with open(self.state_file, "r") as f:
-            data = json.load(f)
-            self.capital = data["capital"]
-            self.positions = data["positions"]
-            self.history = data.get("history", [])
+        data = self.store.load() or empty_state(self.initial_capital)
+        self.capital = data["capital"]
+        self.positions = data["positions"]
+        self.history = data.get("history", [])
+
+    def _record(self, event):
+        with instrumentation.timer("account.save"):
+            self.store.record(event, self._state())
+
+    def close(self):
+        self.store.close()
 
     def open_position(self, symbol, entry_price, size, sl, tp):
         if symbol in self.positions:
@@ -55,7 +74,7 @@ class PaperAccount:
             "tp": tp,
             "entry_time": datetime.now().isoformat()
         }
-        self.save_state()
+        self._record({"type": "open", "symbol": symbol, "cost": cost, "position": self.positions[symbol]})
 
     def close_position(self, symbol, exit_price, reason):
         if symbol not in self.positions:
@@ -83,7 +102,7 @@ class PaperAccount:
         print(f"🔴 CLOSE {symbol}: {reason} | PnL: {pnl:.2f}$")
 
         del self.positions[symbol]
-        self.save_state()
+        self._record({"type": "close", "symbol": symbol, "revenue": revenue, "trade": trade_record})
 
     def check_sl_tp(self, symbol, current_price):
         """بررسی می‌کند آیا قیمت به حد سود یا ضرر رسیده است"""
@@ -1,5 +1,31 @@
 ### core/portfolio.py ###
-import pandas as pd
+from core.equity import EquityTracker
+from core.ledger import TradeLedger
+
+
+class Position:
+    """پوزیشن باز (با __slots__ به جای dict)؛ position['stop_loss'] هم برای سازگاری کار می‌کند"""
+
+    __slots__ = ("entry_price", "position_size", "stop_loss", "take_profit", "entry_time")
+
+    def __init__(self, entry_price, position_size, stop_loss, take_profit, entry_time):
+        self.entry_price = entry_price
+        self.position_size = position_size
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.entry_time = entry_time
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Position({self.to_dict()})"
 
 
 class MultiAssetPortfolio:
@@ -7,18 +33,32 @@ class MultiAssetPortfolio:
         self.initial_capital = initial_capital
         self.capital = initial_capital
         self.assets_config = assets_config
-        self.positions = {}  # symbol -> position info
-        self.trades = []
+        # وزن هر نماد یک بار از assets_config ساخته می‌شود (به جای جستجوی خطی در هر ورود)
+        default_weight = 1.0 / len(assets_config) if assets_config else 1.0
+        self.default_weight = default_weight
+        self.weights = {}
+        for asset in assets_config:
+            self.weights.setdefault(asset['symbol'], asset.get('weight', default_weight))
+        self.positions = {}  # symbol -> Position
+        # دفتر معاملات ستونی؛ مثل لیست dict ها هم قابل استفاده است
+        self.trades = TradeLedger()
         # اضافه کردن لیست منحنی سرمایه برای محاسبه متریک‌ها
         self.equity_curve = [initial_capital]
+        # منحنی سرمایه mark-to-market در سطح کندل (self.equity)
+        self.equity_tracker = EquityTracker(initial_capital)
+
+    def register_prices(self, symbol, index, close):
+        """ثبت قیمت‌های close نماد برای ارزش‌گذاری پوزیشن‌های باز در هر کندل"""
+        self.equity_tracker.register_prices(symbol, index, close)
+
+    @property
+    def equity(self):
+        """EquityCurve: نقد + پوزیشن‌های باز با قیمت close در هر کندل (روی همه نمادها)"""
+        return self.equity_tracker.build()
 
     def allocate_capital(self, symbol):
-        # تخصیص سرمایه بر اساس وزن هر ارز
-        asset_config = next((a for a in self.assets_config if a['symbol'] == symbol), None)
-        if asset_config:
-            weight = asset_config.get('weight', 1.0 / len(self.assets_config))
-        else:
-            weight = 1.0 / len(self.assets_config)  # مقدار پیش‌فرض اگر پیدا نشد
+        # تخصیص سرمایه بر اساس وزن هر ارز (مقدار پیش‌فرض اگر پیدا نشد)
+        weight = self.weights.get(symbol, self.default_weight)
 
         allocated = self.capital * weight
         return allocated
@@ -32,15 +72,10 @@ class MultiAssetPortfolio:
             position_size = self.capital / entry_price
             cost = self.capital  # تمام سرمایه باقی‌مانده
 
-        self.positions[symbol] = {
-            'entry_price': entry_price,
-            'position_size': position_size,
-            'stop_loss': stop_loss,
-            'take_profit': take_profit,
-            'entry_time': entry_time
-        }
+        self.positions[symbol] = Position(entry_price, position_size, stop_loss, take_profit, entry_time)
         # کسر هزینه از سرمایه آزاد (در مارکت کریپتو اسپات، پول بلوکه می‌شود)
         self.capital -= cost
+        self.equity_tracker.record(symbol, entry_time, position_size, -cost)
 
     def close_position(self, symbol, exit_price, exit_time, reason="Signal"):
         if symbol not in self.positions:
@@ -48,28 +83,22 @@ class MultiAssetPortfolio:
 
         position = self.positions[symbol]
         # محاسبه مقدار بازگشتی (سایز * قیمت خروج)
-        revenue = position['position_size'] * exit_price
+        revenue = position.position_size * exit_price
 
         # محاسبه سود/ضرر خالص
-        cost = position['position_size'] * position['entry_price']
+        cost = position.position_size * position.entry_price
         pnl = revenue - cost
         pnl_pct = (pnl / cost) * 100 if cost > 0 else 0
 
         # بازگشت سرمایه به حساب
         self.capital += revenue
+        self.equity_tracker.record(symbol, exit_time, -position.position_size, revenue)
 
         # ثبت ترید
-        self.trades.append({
-            'symbol': symbol,
-            'entry_price': position['entry_price'],
-            'exit_price': exit_price,
-            'position_size': position['position_size'],
-            'pnl': pnl,
-            'pnl_pct': pnl_pct,
-            'entry_time': position['entry_time'],
-            'exit_time': exit_time,
-            'reason': reason
-        })
+        self.trades.record(
+            symbol, position.entry_price, exit_price, position.position_size,
+            pnl, pnl_pct, position.entry_time, exit_time, reason,
+        )
 
         # به‌روزرسانی منحنی سرمایه (مهم برای رفع ارور)
         self.equity_curve.append(self.capital)
@@ -13,6 +13,14 @@ class RiskManager:
         position_size = risk_amount / risk_per_unit
         return position_size
 
+    def stop_loss_price(self, entry_price, atr, atr_multiplier=1.5):
+        """حد ضرر از روی مقادیر اسکالر (بدون نیاز به DataFrame)"""
+        return entry_price - (atr * atr_multiplier)
+
+    def take_profit_price(self, entry_price, atr, atr_multiplier=3.0):
+        """حد سود از روی مقادیر اسکالر (بدون نیاز به DataFrame)"""
+        return entry_price + (atr * atr_multiplier)
+
     def calculate_stop_loss(self, df, current_idx, atr_multiplier=1.5):
         # استفاده از iloc برای دسترسی با ایندکس عددی
         # اگر ستون 'atr' وجود نداشت، مقدار پیش‌فرض یا محاسبه در لحظه نیاز است
@@ -20,12 +28,10 @@ class RiskManager:
         atr = df['atr'].iloc[current_idx]
         entry_price = df['close'].iloc[current_idx]
 
-        stop_loss = entry_price - (atr * atr_multiplier)
-        return stop_loss
+        return self.stop_loss_price(entry_price, atr, atr_multiplier)
 
     def calculate_take_profit(self, df, current_idx, atr_multiplier=3.0):
         atr = df['atr'].iloc[current_idx]
         entry_price = df['close'].iloc[current_idx]
 
-        take_profit = entry_price + (atr * atr_multiplier)
-        return take_profit
+        return self.take_profit_price(entry_price, atr, atr_multiplier)
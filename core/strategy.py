@@ -1,7 +1,8 @@
 ### core/strategy.py ###
 import pandas as pd
 import numpy as np
-from core.indicators import ema, calculate_atr, supertrend
+from core.indicators import ema, calculate_atr, supertrend_batch
+from data.resample import resample_ohlcv, align_to, align_values
 
 
 class DualSupertrendStrategy:
@@ -18,51 +19,63 @@ class DualSupertrendStrategy:
         # محاسبه ATR
         df['atr'] = calculate_atr(df, period=self.params['atr_period'])
 
-        # محاسبه EMA 200
-        df['ema_long'] = ema(df['close'], period=self.params['ema_period'])
-
-        # محاسبه سوپرترند اصلی (Trend Filter)
-        # فرض بر این است که تابع supertrend در indicators.py ستون روند را برمی‌گرداند یا به df اضافه می‌کند
-        # در اینجا ما خروجی را گرفته و استفاده می‌کنیم
-        st_main_dir = supertrend(
-            df,
-            period=self.params['st_period'],
-            multiplier=self.params['st_multiplier']
-        )
-        # اگر خروجی سری باشد، نامگذاری میکنیم، اگر DF باشد فرض میکنیم ستون آخر است
-        if isinstance(st_main_dir, pd.DataFrame):
-            df['trend_main'] = st_main_dir.iloc[:, -1]  # فرض بر اینکه ستون آخر جهت روند است
+        trend_timeframe = self.params.get('trend_timeframe')
+        if trend_timeframe:
+            # فیلتر روند (EMA و سوپرترند اصلی) روی تایم فریم بالاتر، تریگر روی تایم فریم خود df
+            df['ema_long'], df['trend_main'] = self.higher_timeframe_trend(df, trend_timeframe)
+            df['trend_fast'] = supertrend_batch(df, [
+                (self.params['st_fast_period'], self.params['st_fast_multiplier']),
+            ])[0]
         else:
-            df['trend_main'] = st_main_dir
+            # محاسبه EMA 200
+            df['ema_long'] = ema(df['close'], period=self.params['ema_period'])
 
-        # محاسبه سوپرترند سریع (Trigger)
-        st_fast_dir = supertrend(
-            df,
-            period=self.params['st_fast_period'],
-            multiplier=self.params['st_fast_multiplier']
+            # محاسبه سوپرترند اصلی (Trend Filter) و سریع (Trigger) در یک عبور
+            trends = supertrend_batch(df, [
+                (self.params['st_period'], self.params['st_multiplier']),
+                (self.params['st_fast_period'], self.params['st_fast_multiplier']),
+            ])
+            df['trend_main'] = trends[0]
+            df['trend_fast'] = trends[1]
+
+        # 2. منطق ورود (پیوسته) و 3. خروجی
+        df['signal'] = self.entry_signal(
+            df['close'].to_numpy(), df['ema_long'].to_numpy(),
+            df['trend_main'].to_numpy(), df['trend_fast'].to_numpy()
         )
-        if isinstance(st_fast_dir, pd.DataFrame):
-            df['trend_fast'] = st_fast_dir.iloc[:, -1]
-        else:
-            df['trend_fast'] = st_fast_dir
 
-        # 2. منطق ورود (پیوسته)
+        return df
+
+    def higher_timeframe_trend(self, df, timeframe):
+        """
+        EMA و سوپرترند اصلی روی کندل‌های timeframe ساخته شده از df، هم‌تراز با کندل‌های df.
+        هر کندل فقط مقدار آخرین کندل بالاتری را می‌بیند که تا پایان خودش بسته شده (بدون نگاه به آینده)؛
+        قبل از اولین کندل بسته شده EMA برابر NaN و روند 0 است (بدون سیگنال).
+        """
+        higher = resample_ohlcv(df, timeframe)
+        ema_long = ema(higher['close'], period=self.params['ema_period']).to_numpy()
+        trend_main = supertrend_batch(higher, [(self.params['st_period'], self.params['st_multiplier'])])[0]
+
+        positions = align_to(higher.index.values, timeframe, df.index.values)
+        return align_values(ema_long, positions), align_values(trend_main, positions, fill=0)
+
+    @staticmethod
+    def entry_signal(close, ema_long, trend_main, trend_fast):
+        """
+        سیگنال ورود از روی آرایه‌های از پیش محاسبه شده (برای بهینه‌ساز هم استفاده می‌شود)
+        """
         # به جای بررسی لحظه کراس (که با shift انجام میشد)، وضعیت فعلی را چک می‌کنیم.
 
         # شرط ۱: سوپرترند اصلی صعودی باشد (معمولا ۱ برای صعود)
-        cond_main = (df['trend_main'] == 1)
+        cond_main = (trend_main == 1)
 
         # شرط ۲: سوپرترند سریع صعودی باشد
-        cond_fast = (df['trend_fast'] == 1)
+        cond_fast = (trend_fast == 1)
 
         # شرط ۳: قیمت بالای EMA 200 باشد
-        cond_ema = (df['close'] > df['ema_long'])
+        cond_ema = (close > ema_long)
 
         # ترکیب شرایط: تا زمانی که همه اینها برقرارند، سیگنال ورود فعال است
         buy_signal = cond_main & cond_fast & cond_ema
 
-        # 3. خروجی
-        df['signal'] = 0
-        df.loc[buy_signal, 'signal'] = 1
-
-        return df
+        return np.asarray(buy_signal).astype(np.int64)
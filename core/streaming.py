@@ -0,0 +1,453 @@
+### core/streaming.py ###
+# نسخه‌های جریانی (stateful) اندیکاتورهای core/indicators برای حلقه لایو:
+# هر کندل جدید با یک فراخوانی update در زمان ثابت پردازش می‌شود و نیازی
+# به محاسبه دوباره کل پنجره نیست. خروجی‌ها با نسخه‌های batch برابرند
+# (EMA/RSI/ADX/ATR و میانگین غلتان بیت به بیت، انحراف معیار غلتان در حد خطای ممیز شناور).
+import math
+from collections import deque
+
+import numpy as np
+
+from core.strategy import DualSupertrendStrategy
+from data.resample import timeframe_ns, bucket_starts
+
+NaN = float("nan")
+
+
+# =========================================
+# Building Blocks
+# =========================================
+
+class StreamingEWM:
+    """
+    معادل series.ewm(..., adjust=False).mean() در pandas با همان ترتیب عملیات
+    (از جمله رفتار با NaN)، تا خروجی دقیقاً یکسان باشد.
+    """
+
+    def __init__(self, span=None, alpha=None):
+        # pandas ابتدا com را می‌سازد و alpha را از آن به دست می‌آورد
+        if span is not None:
+            com = (span - 1) / 2.0
+        else:
+            com = (1.0 - alpha) / alpha
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.value = NaN
+        self.old_wt = 1.0
+        self.count = 0
+
+    def update(self, x):
+        x = float(x)
+        is_observation = x == x
+
+        if self.count == 0:
+            self.value = x
+        elif self.value == self.value:
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.value != x:
+                    self.value = self.old_wt * self.value + self.alpha * x
+                    self.value /= (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.value = x
+
+        self.count += 1
+        return self.value
+
+
+class StreamingRollingMean:
+    """
+    میانگین غلتان با پنجره ثابت (معادل rolling(window).mean()) در زمان ثابت: همان جمع جاری
+    pandas با جبران Kahan جداگانه برای افزودن و حذف (indicators._rolling_mean_loop)، پس
+    خروجی بیت به بیت با نسخه batch برابر است.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0        # تعداد مقادیر غیر NaN داخل پنجره
+        self.neg_ct = 0
+        self.sum = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same = 0        # تعداد تکرار پشت سر هم آخرین مقدار
+        self.prev = NaN
+        self.value = NaN
+
+    def update(self, x):
+        x = float(x)
+        if self.window == 1 or not self.values:
+            self.nobs = self.neg_ct = self.same = 0
+            self.sum = self.comp_add = self.comp_remove = 0.0
+            self.prev = x
+        elif len(self.values) == self.window:
+            old = self.values[0]
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.comp_remove
+                t = self.sum + y
+                self.comp_remove = t - self.sum - y
+                self.sum = t
+                if math.copysign(1.0, old) < 0:
+                    self.neg_ct -= 1
+        self.values.append(x)
+
+        if x == x:
+            self.nobs += 1
+            y = x - self.comp_add
+            t = self.sum + y
+            self.comp_add = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, x) < 0:
+                self.neg_ct += 1
+            self.same = self.same + 1 if x == self.prev else 1
+            self.prev = x
+
+        if self.nobs < self.window:
+            self.value = NaN
+        elif self.same >= self.nobs:
+            self.value = self.prev
+        else:
+            value = self.sum / self.nobs
+            if (self.neg_ct == 0 and value < 0) or (self.neg_ct == self.nobs and value > 0):
+                value = 0.0
+            self.value = value
+        return self.value
+
+
+class StreamingRollingStd:
+    """
+    انحراف معیار نمونه (ddof=1) غلتان در زمان ثابت؛ معادل rolling(window).std().
+    واریانس با روش Welford افزودنی/حذفی و جبران Kahan (همان الگوریتم roll_var در pandas).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm = 0.0     # مجموع مجذور انحراف از میانگین
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.mean = NaN
+        self.value = NaN
+
+    def _add(self, x):
+        if x != x:
+            return
+        self.nobs += 1
+        prev_mean = self.mean_x - self.comp_add
+        y = x - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm += (x - prev_mean) * (x - self.mean_x)
+
+    def _remove(self, x):
+        if x != x:
+            return
+        self.nobs -= 1
+        if self.nobs == 1:
+            # یک مشاهده باقی مانده: حالت دقیقاً معلوم است و خطای انباشته دور ریخته می‌شود (مثل pandas)
+            self.mean_x = next(v for v in self.values if v == v)
+            self.ssqdm = self.comp_add = self.comp_remove = 0.0
+        elif self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = x - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm -= (x - prev_mean) * (x - self.mean_x)
+        else:
+            self.mean_x = self.ssqdm = 0.0
+
+    def update(self, x):
+        x = float(x)
+        if self.window == 1 or not self.values:
+            self.nobs = 0
+            self.mean_x = self.ssqdm = self.comp_add = self.comp_remove = 0.0
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+
+        if self.nobs < self.window or self.nobs < 2:
+            self.mean = self.value = NaN
+            return self.value
+        self.mean = self.mean_x
+        variance = self.ssqdm / (self.nobs - 1)
+        self.value = math.sqrt(variance) if variance > 0 else 0.0
+        return self.value
+
+
+class StreamingResampler:
+    """
+    تجمیع کندل‌های تایم فریم پایه به timeframe بالاتر (مثل data/resample.resample_ohlcv).
+    update کندل‌های (high, low, close) بالاتری را برمی‌گرداند که تا پایان کندل ورودی بسته
+    شده‌اند؛ مثل align_to کندل در حال تشکیل هرگز برگردانده نمی‌شود.
+    """
+
+    def __init__(self, timeframe, base_timeframe):
+        self.timeframe = timeframe
+        self.length = timeframe_ns(timeframe)
+        self.step = timeframe_ns(base_timeframe)
+        self.start = None
+        self.high = self.low = self.close = NaN
+
+    def update(self, time, high, low, close):
+        t = int(np.datetime64(time, "ns").astype(np.int64))
+        bucket = int(bucket_starts(t, self.timeframe))
+
+        closed = []
+        if self.start is not None and bucket != self.start:
+            # شکاف داده: آخرین کندل پایه بازه قبلی نرسیده ولی بازه قبلی تمام شده است
+            closed.append((self.high, self.low, self.close))
+            self.start = None
+
+        if self.start is None:
+            self.start, self.high, self.low = bucket, high, low
+        else:
+            self.high = max(self.high, high)
+            self.low = min(self.low, low)
+        self.close = close
+
+        if t + self.step >= self.start + self.length:
+            closed.append((self.high, self.low, self.close))
+            self.start = None
+        return closed
+
+
+# =========================================
+# Indicators
+# =========================================
+
+class StreamingEMA(StreamingEWM):
+    """Exponential Moving Average (معادل indicators.ema)"""
+
+    def __init__(self, period):
+        super().__init__(span=period)
+
+
+class StreamingTrueRange:
+    def __init__(self):
+        self.prev_close = NaN
+        self.value = NaN
+
+    def update(self, high, low, close):
+        tr = high - low
+        if self.prev_close == self.prev_close:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.value = tr
+        return tr
+
+
+class StreamingATR:
+    """Average True Range (معادل indicators.calculate_atr)"""
+
+    def __init__(self, period=14):
+        self.tr = StreamingTrueRange()
+        self.mean = StreamingRollingMean(period)
+        self.value = NaN
+
+    def update(self, high, low, close):
+        self.value = self.mean.update(self.tr.update(high, low, close))
+        return self.value
+
+
+class StreamingRSI:
+    """Relative Strength Index (معادل indicators.calculate_rsi)"""
+
+    def __init__(self, period=14):
+        self.avg_gain = StreamingEWM(alpha=1 / period)
+        self.avg_loss = StreamingEWM(alpha=1 / period)
+        self.prev = NaN
+        self.value = NaN
+
+    def update(self, close):
+        delta = close - self.prev
+        self.prev = close
+
+        # مثل delta.where در pandas: NaN اولین کندل صفر در نظر گرفته می‌شود
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else -0.0
+
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+        self.value = _rsi_from_averages(avg_gain, avg_loss)
+        return self.value
+
+
+class StreamingADX:
+    """Average Directional Index (معادل indicators.calculate_adx)"""
+
+    def __init__(self, period=14):
+        alpha = 1 / period
+        self.tr = StreamingTrueRange()
+        self.tr_s = StreamingEWM(alpha=alpha)
+        self.pdm_s = StreamingEWM(alpha=alpha)
+        self.ndm_s = StreamingEWM(alpha=alpha)
+        self.adx = StreamingEWM(alpha=alpha)
+        self.prev_high = NaN
+        self.prev_low = NaN
+        self.value = NaN
+
+    def update(self, high, low, close):
+        up_move = high - self.prev_high
+        down_move = self.prev_low - low
+        self.prev_high = high
+        self.prev_low = low
+
+        pdm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        ndm = down_move if (down_move > up_move and down_move > 0) else 0.0
+
+        tr_s = self.tr_s.update(self.tr.update(high, low, close))
+        pdm_s = self.pdm_s.update(pdm)
+        ndm_s = self.ndm_s.update(ndm)
+
+        pdi = 100 * _safe_div(pdm_s, tr_s)
+        ndi = 100 * _safe_div(ndm_s, tr_s)
+
+        dx = _safe_div(100 * abs(pdi - ndi), pdi + ndi)
+        self.value = self.adx.update(dx)
+        return self.value
+
+
+class StreamingSupertrend:
+    """جهت سوپرترند (معادل indicators.supertrend)؛ 1 صعودی و -1 نزولی"""
+
+    def __init__(self, period=10, multiplier=3):
+        self.multiplier = multiplier
+        self.atr = StreamingATR(period)
+        self.final_upper = NaN
+        self.final_lower = NaN
+        self.prev_close = NaN
+        self.value = NaN
+        self.count = 0
+
+    def update(self, high, low, close):
+        atr_val = self.atr.update(high, low, close)
+        if atr_val != atr_val:
+            atr_val = 0.0  # مثل fillna(0)
+
+        hl2 = (high + low) / 2
+        upperband = hl2 + self.multiplier * atr_val
+        lowerband = hl2 - self.multiplier * atr_val
+
+        if self.count == 0:
+            final_upper, final_lower, trend = upperband, lowerband, 1.0
+        else:
+            prev_upper, prev_lower = self.final_upper, self.final_lower
+
+            if upperband < prev_upper or self.prev_close > prev_upper:
+                final_upper = upperband
+            else:
+                final_upper = prev_upper
+
+            if lowerband > prev_lower or self.prev_close < prev_lower:
+                final_lower = lowerband
+            else:
+                final_lower = prev_lower
+
+            if self.value == 1:
+                trend = -1.0 if close < prev_lower else 1.0
+            else:
+                trend = 1.0 if close > prev_upper else -1.0
+
+        self.final_upper = final_upper
+        self.final_lower = final_lower
+        self.prev_close = close
+        self.value = trend
+        self.count += 1
+        return trend
+
+
+def _safe_div(a, b):
+    """تقسیم با رفتار ممیز شناور NumPy (x/0 -> ±inf، 0/0 -> NaN)"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return NaN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    rs = _safe_div(avg_gain, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+# =========================================
+# Composite Streams
+# =========================================
+
+class StrategyStream:
+    """
+    وضعیت جریانی DualSupertrendStrategy برای یک نماد: با هر کندل بسته شده
+    اندیکاتورها به‌روز می‌شوند و signal همان مقدار generate_signals برای آخرین کندل است.
+    با trend_timeframe، EMA و سوپرترند اصلی فقط با بسته شدن کندل تایم فریم بالاتر به‌روز
+    می‌شوند (timeframe: تایم فریم کندل‌های ورودی، update به open_time هر کندل نیاز دارد).
+    """
+
+    def __init__(self, params, timeframe=None):
+        self.atr = StreamingATR(params['atr_period'])
+        self.ema_long = StreamingEMA(params['ema_period'])
+        self.trend_main = StreamingSupertrend(params['st_period'], params['st_multiplier'])
+        self.trend_fast = StreamingSupertrend(params['st_fast_period'], params['st_fast_multiplier'])
+        self.higher = None
+        if params.get('trend_timeframe'):
+            if not timeframe:
+                raise ValueError("trend_timeframe requires the timeframe of the streamed bars")
+            self.higher = StreamingResampler(params['trend_timeframe'], timeframe)
+        self.close = NaN
+        self.signal = 0
+
+    def update(self, high, low, close, time=None):
+        self.atr.update(high, low, close)
+        trend_fast = self.trend_fast.update(high, low, close)
+        if self.higher is None:
+            ema_long = self.ema_long.update(close)
+            trend_main = self.trend_main.update(high, low, close)
+        else:
+            if time is None:
+                raise ValueError("StrategyStream with trend_timeframe needs the bar open time")
+            for bar_high, bar_low, bar_close in self.higher.update(time, high, low, close):
+                self.ema_long.update(bar_close)
+                self.trend_main.update(bar_high, bar_low, bar_close)
+            # قبل از اولین کندل بالاتر بسته شده: EMA برابر NaN و روند 0 (مثل align_values)
+            ema_long = self.ema_long.value
+            trend_main = self.trend_main.value if self.trend_main.count else 0
+        self.close = close
+
+        self.signal = int(DualSupertrendStrategy.entry_signal(close, ema_long, trend_main, trend_fast))
+        return self.signal
+
+
+# =========================================
+# Seeding
+# =========================================
+
+def seed_from_history(indicator, df):
+    """
+    گرم کردن یک اندیکاتور جریانی با داده تاریخی (یک بار، O(n)).
+    برای اندیکاتورهای تک‌ورودی ستون close و برای بقیه high/low/close(/volume) استفاده می‌شود؛
+    StrategyStream زمان کندل‌ها (df.index) را هم می‌گیرد.
+    """
+    if hasattr(indicator, "seed"):
+        # مثل FeatureStream در core/features
+        indicator.seed(df)
+    elif isinstance(indicator, StrategyStream):
+        columns = [df[c].to_numpy(dtype=np.float64).tolist() for c in ("high", "low", "close")]
+        for time, high, low, close in zip(df.index.values, *columns):
+            indicator.update(high, low, close, time)
+    elif isinstance(indicator, (StreamingEWM, StreamingRSI)):
+        for close in df["close"].to_numpy(dtype=np.float64).tolist():
+            indicator.update(close)
+    else:
+        highs = df["high"].to_numpy(dtype=np.float64).tolist()
+        lows = df["low"].to_numpy(dtype=np.float64).tolist()
+        closes = df["close"].to_numpy(dtype=np.float64).tolist()
+        for high, low, close in zip(highs, lows, closes):
+            indicator.update(high, low, close)
+    return indicator
@@ -0,0 +1,223 @@
+### core/tree_model.py ###
+# خروجی فشرده مدل XGBoost فیلتر بازار برای استنتاج تک ردیفی در حلقه لایو (بدون import xgboost).
+# هر درخت به یک درخت دودویی کامل با عمق ثابت depth پر می‌شود (برگ‌های کم‌عمق‌تر در همه
+# نوادگانشان تکرار می‌شوند)، پس گره‌ها فقط با اندیس پیمایش می‌شوند: child = 2 * node + 1 + (x >= split)
+# و همه درخت‌ها و ردیف‌ها با هم، در depth گام برداری NumPy ارزیابی می‌شوند.
+#
+#     market_condition_xgb.trees.npz
+#         feature / threshold / default_right : (n_trees, 2^depth - 1)  گره‌های داخلی
+#         leaf                                : (n_trees, 2^depth)      مقدار برگ‌ها
+#         base_margin, feature_names, objective
+#
+# مقایسه‌ها مثل خود XGBoost در float32 انجام می‌شوند (x < split -> چپ، NaN -> جهت پیش‌فرض).
+import json
+import math
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+
+# عمق بیشتر درخت دودویی کامل را بزرگ می‌کند (2^depth برگ برای هر درخت)
+MAX_EXPORT_DEPTH = 16
+
+SUPPORTED_OBJECTIVES = ("binary:logistic", "reg:logistic")
+
+
+class ExportMismatchError(ValueError):
+    """خروجی مدل صادر شده با احتمال‌های XGBoost در حد تلورانس برابر نیست"""
+
+
+def trees_path(model_path):
+    """فایل درخت‌ها کنار مدل: market_condition_xgb.pkl -> market_condition_xgb.trees.npz"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + ".trees.npz")
+
+
+def file_digest(path):
+    """sha256 فایل مدل اصلی؛ خروجی درخت‌ها فقط برای همان فایل معتبر است"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def _base_margin(learner):
+    """base_score (احتمال) به margin؛ در نسخه‌های جدید به صورت "[3.6E-1]" ذخیره می‌شود"""
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    return math.log(base_score / (1.0 - base_score))
+
+
+def _tree_depth(left, right, node=0):
+    if left[node] == -1:
+        return 0
+    return 1 + max(_tree_depth(left, right, left[node]), _tree_depth(left, right, right[node]))
+
+
+class TreeModel:
+    """
+    ارزیاب NumPy مجموعه درخت‌ها؛ همان رابط predict_proba / predict مدل sklearn
+    (n_features_in_ برای بررسی schema در core.features).
+    """
+
+    def __init__(self, feature, threshold, default_right, leaf, base_margin, feature_names=None,
+                 objective="binary:logistic", source_digest=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.default_right = np.ascontiguousarray(default_right, dtype=bool)
+        self.leaf = np.ascontiguousarray(leaf, dtype=np.float32)
+        self.base_margin = float(base_margin)
+        self.feature_names = None if feature_names is None else [str(name) for name in feature_names]
+        self.objective = str(objective)
+        self.source_digest = None if source_digest is None else str(source_digest)
+
+        self.n_trees, n_internal = self.feature.shape
+        self.depth = int(round(math.log2(n_internal + 1)))
+        self.n_features_in_ = len(self.feature_names) if self.feature_names else int(self.feature.max(initial=0)) + 1
+        # اندیس تخت شده ابتدای هر درخت در آرایه‌های گره و برگ
+        self._internal_offsets = np.arange(self.n_trees, dtype=np.intp) * n_internal
+        self._leaf_offsets = np.arange(self.n_trees, dtype=np.intp) * (n_internal + 1) - n_internal
+        self._flat = (self.feature.ravel(), self.threshold.ravel(), self.default_right.ravel(), self.leaf.ravel())
+
+    # --- ساخت از XGBoost ---
+
+    @classmethod
+    def from_xgboost(cls, model):
+        """model: XGBClassifier یا Booster"""
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for tree export: {objective}")
+        gbm = learner["gradient_booster"]
+        if gbm["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster for tree export: {gbm['name']}")
+
+        trees = gbm["model"]["trees"]
+        depth = max((_tree_depth(t["left_children"], t["right_children"]) for t in trees), default=0)
+        if depth > MAX_EXPORT_DEPTH:
+            raise ValueError(f"Tree depth {depth} exceeds MAX_EXPORT_DEPTH={MAX_EXPORT_DEPTH}")
+
+        n_internal = 2 ** depth - 1
+        feature = np.zeros((len(trees), n_internal), dtype=np.intp)
+        threshold = np.full((len(trees), n_internal), np.inf, dtype=np.float32)
+        default_right = np.zeros((len(trees), n_internal), dtype=bool)
+        leaf = np.zeros((len(trees), n_internal + 1), dtype=np.float32)
+
+        for row, tree in enumerate(trees):
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported by the tree export")
+            left, right = tree["left_children"], tree["right_children"]
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            # (گره XGBoost، جایگاه در درخت کامل، عمق)
+            stack = [(0, 0, 0)]
+            while stack:
+                node, position, level = stack.pop()
+                if left[node] == -1:
+                    # برگ کم‌عمق: مقدارش در همه برگ‌های زیردرخت جایگاهش (گره‌های داخلی پر شده همیشه چپ می‌روند)
+                    span = 2 ** (depth - level)
+                    first = (position + 1) * span - 1 - n_internal
+                    leaf[row, first:first + span] = conditions[node]
+                    continue
+                feature[row, position] = tree["split_indices"][node]
+                threshold[row, position] = conditions[node]
+                default_right[row, position] = not tree["default_left"][node]
+                stack.append((left[node], 2 * position + 1, level + 1))
+                stack.append((right[node], 2 * position + 2, level + 1))
+
+        names = booster.feature_names
+        return cls(feature, threshold, default_right, leaf, _base_margin(learner), names, objective)
+
+    # --- ذخیره / لود ---
+
+    def save(self, path):
+        arrays = {
+            "feature": self.feature.astype(np.int32),
+            "threshold": self.threshold,
+            "default_right": self.default_right,
+            "leaf": self.leaf,
+            "base_margin": np.float64(self.base_margin),
+            "objective": np.str_(self.objective),
+        }
+        if self.feature_names:
+            arrays["feature_names"] = np.array(self.feature_names)
+        if self.source_digest:
+            arrays["source_digest"] = np.str_(self.source_digest)
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            names = data["feature_names"] if "feature_names" in data.files else None
+            digest = data["source_digest"] if "source_digest" in data.files else None
+            return cls(data["feature"], data["threshold"], data["default_right"], data["leaf"],
+                       data["base_margin"], names, data["objective"], digest)
+
+    # --- ارزیابی ---
+
+    def predict_margin(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        feature, threshold, default_right, leaf = self._flat
+        values = X.ravel()
+        has_nan = np.isnan(values).any()
+        # اندیس تخت شده ابتدای هر ردیف X (برای یک ردیف لازم نیست)
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None] if n_rows > 1 else None
+
+        node = np.zeros((n_rows, self.n_trees), dtype=np.intp)
+        flat = np.empty_like(node)
+        for _ in range(self.depth):
+            np.add(node, self._internal_offsets, out=flat)
+            split_feature = feature[flat]
+            if row_offsets is not None:
+                split_feature += row_offsets
+            x = values[split_feature]
+            go_right = x >= threshold[flat]
+            if has_nan:
+                go_right |= np.isnan(x) & default_right[flat]
+            node *= 2
+            node += 1
+            node += go_right
+
+        node += self._leaf_offsets
+        return leaf[node].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        """(n, 2) مثل XGBClassifier.predict_proba"""
+        proba = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack((1.0 - proba, proba))
+
+    def predict(self, X):
+        return (self.predict_margin(X) > 0).astype(np.int64)
+
+
+def export_trees(model, model_path, X=None, tolerance=1e-6):
+    """
+    ساخت و ذخیره TreeModel کنار model_path. با X (نمونه ردیف‌های ویژگی) احتمال‌ها با
+    model.predict_proba مقایسه می‌شوند و در صورت اختلاف بیش از tolerance فایلی نوشته نمی‌شود.
+    model_path باید فایل ذخیره شده همین مدل باشد (sha256 آن داخل خروجی ثبت می‌شود).
+    خروجی: (TreeModel، بیشترین اختلاف یا None)
+    """
+    tree_model = TreeModel.from_xgboost(model)
+    tree_model.source_digest = file_digest(model_path)
+    max_diff = None
+    if X is not None:
+        X = np.asarray(X, dtype=np.float64)
+        max_diff = float(np.abs(tree_model.predict_proba(X)[:, 1] - model.predict_proba(X)[:, 1]).max(initial=0.0))
+        if max_diff > tolerance:
+            raise ExportMismatchError(f"Exported trees differ from XGBoost by {max_diff:.3g} (tolerance {tolerance:g})")
+    tree_model.save(trees_path(model_path))
+    return tree_model, max_diff
+
+
+def load_trees(model_path):
+    """TreeModel صادر شده برای model_path؛ None اگر نباشد یا از نسخه دیگری از مدل ساخته شده باشد"""
+    path = trees_path(model_path)
+    if not path.exists():
+        return None
+    tree_model = TreeModel.load(path)
+    if tree_model.source_digest != file_digest(model_path):
+        return None
+    return tree_model
@@ -0,0 +1,208 @@
+### data/feature_store.py ###
+# انبار ستونی ویژگی‌ها، پارتیشن‌بندی شده بر اساس ارز/تایم فریم و سال:
+#
+#     data/features/<feature_set>/BTCUSDT_4h/
+#         meta.json
+#         2023/  open_time.npy  rsi.npy  adx.npy  ...
+#         2024/  ...
+#
+# هر ردیف انبار متناظر یک کندل انبار OHLCV است (ردیف‌های گرم شدن و برچسب‌های بدون آینده NaN).
+# با رسیدن کندل‌های جدید فقط دُم داده دوباره محاسبه می‌شود: ردیف‌های جدید به همراه horizon
+# ردیف آخر (برچسب‌هایی که به آینده نگاه می‌کنند) و warmup کندل قبل از آن‌ها برای گرم شدن
+# EMA و پنجره‌های غلتان؛ فقط پارتیشن‌های همان دُم بازنویسی می‌شوند.
+import os
+import json
+import math
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data.store import DATA_ROOT, TIME_COL, _atomic_save, _to_datetime64, load_ohlcv
+
+
+FEATURE_DIR = DATA_ROOT / "features"
+
+
+def ewm_warmup(span=None, alpha=None, tol=1e-12):
+    """تعداد کندل لازم تا اثر مقدار اولیه EWM (adjust=False) کمتر از tol شود"""
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    return int(math.ceil(math.log(tol) / math.log(1.0 - alpha)))
+
+
+class FeatureSet:
+    """
+    تعریف یک مجموعه ویژگی برای انبار.
+    compute(df) روی OHLCV (ایندکس open_time) همه ستون‌های columns را برمی‌گرداند (بدون dropna).
+    warmup: کندل‌های قبل از دُم که برای برابری با محاسبه کامل لازم است.
+    horizon: تعداد کندل آینده‌ای که برچسب‌ها به آن نگاه می‌کنند.
+    تغییر version باعث ساخت دوباره کامل انبار می‌شود.
+    """
+
+    def __init__(self, name, columns, compute, warmup, horizon=0, version=1):
+        self.name = name
+        self.columns = list(columns)
+        self.compute = compute
+        self.warmup = warmup
+        self.horizon = horizon
+        self.version = version
+
+
+def feature_dir(symbol, timeframe, feature_set_name, root=None):
+    return Path(root or FEATURE_DIR) / feature_set_name / f"{symbol}_{timeframe}"
+
+
+def _read_meta(directory):
+    path = directory / "meta.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_meta(directory, meta):
+    tmp_path = directory / "meta.json.tmp"
+    tmp_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp_path, directory / "meta.json")
+
+
+def _partition_keys(times):
+    """کلید پارتیشن (سال) هر ردیف"""
+    return times.astype("datetime64[Y]").astype(int) + 1970
+
+
+def _is_current(meta, feature_set, times):
+    """انبار موجود با همین تعریف ساخته شده و تاریخچه OHLCV زیر آن تغییر نکرده است"""
+    if meta is None or meta["version"] != feature_set.version or meta["columns"] != feature_set.columns:
+        return False
+    rows = meta["rows"]
+    if rows > len(times):
+        return False
+    return rows == 0 or times[rows - 1] == _to_datetime64(meta["end"])
+
+
+def update_features(symbol, timeframe, feature_set, ohlcv=None, root=None, full=False):
+    """
+    به‌روزرسانی افزایشی ویژگی‌های یک ارز. ohlcv: کل داده (پیش‌فرض از انبار OHLCV با memory-map).
+    خروجی: تعداد ردیف‌هایی که نوشته (یا بازنویسی) شدند.
+    """
+    if ohlcv is None:
+        ohlcv = load_ohlcv(symbol, timeframe)
+        if ohlcv is None:
+            raise FileNotFoundError(f"No OHLCV data for {symbol} {timeframe}")
+    times = ohlcv.index.values.astype("datetime64[ns]")
+    n = len(times)
+
+    directory = feature_dir(symbol, timeframe, feature_set.name, root)
+    meta = _read_meta(directory)
+    if full or not _is_current(meta, feature_set, times):
+        if directory.exists():
+            shutil.rmtree(directory)
+        meta = None
+        first = 0
+    else:
+        if meta["rows"] == n:
+            return 0
+        # برچسب‌های horizon ردیف آخر با کندل‌های جدید کامل می‌شوند
+        first = max(0, meta["rows"] - feature_set.horizon)
+
+    lo = max(0, first - feature_set.warmup)
+    computed = feature_set.compute(ohlcv.iloc[lo:])
+    values = {col: computed[col].to_numpy(dtype=np.float64)[first - lo:] for col in feature_set.columns}
+    new_times = times[first:]
+
+    directory.mkdir(parents=True, exist_ok=True)
+    partitions = _write_tail(directory, meta, feature_set.columns, first, new_times, values)
+
+    _write_meta(directory, {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "feature_set": feature_set.name,
+        "version": feature_set.version,
+        "columns": feature_set.columns,
+        "rows": int(n),
+        "start": str(times[0]) if n else None,
+        "end": str(times[-1]) if n else None,
+        "partitions": partitions,
+    })
+    return n - first
+
+
+def _write_tail(directory, meta, columns, first, new_times, values):
+    """
+    بازنویسی ردیف‌های first به بعد. پارتیشن‌های قبل از first دست نمی‌خورند؛ در پارتیشنی که
+    first داخل آن است ردیف‌های قبلی نگه داشته و بقیه جایگزین می‌شوند.
+    مثل انبار OHLCV هر فایل اتمیک جایگزین و meta.json آخر نوشته می‌شود.
+    """
+    partitions = []
+    offset = 0
+    for part in (meta or {}).get("partitions", []):
+        if offset + part["rows"] <= first:
+            partitions.append(part)
+        elif offset < first:
+            # پارتیشن مرزی: ردیف‌های قبل از first به داده جدید اضافه می‌شوند
+            keep = first - offset
+            part_dir = directory / part["key"]
+            old_times = np.load(part_dir / f"{TIME_COL}.npy")[:keep]
+            new_times = np.concatenate([old_times, new_times])
+            values = {
+                col: np.concatenate([np.load(part_dir / f"{col}.npy")[:keep], values[col]])
+                for col in columns
+            }
+            first = offset
+        offset += part["rows"]
+
+    keys = _partition_keys(new_times)
+    for key in np.unique(keys):
+        mask = keys == key
+        part_times = new_times[mask]
+        part_dir = directory / str(key)
+        part_dir.mkdir(exist_ok=True)
+        _atomic_save(part_dir / f"{TIME_COL}.npy", part_times)
+        for col in columns:
+            _atomic_save(part_dir / f"{col}.npy", values[col][mask])
+        partitions.append({
+            "key": str(key),
+            "rows": int(mask.sum()),
+            "start": str(part_times[0]),
+            "end": str(part_times[-1]),
+        })
+    return partitions
+
+
+def load_features(symbol, timeframe, feature_set_name, columns=None, start=None, end=None,
+                  root=None, dropna=False):
+    """
+    خواندن ستون‌های انتخابی در بازه [start, end] (شامل)؛ فقط پارتیشن‌های هم‌پوشان با بازه
+    و فقط ستون‌های خواسته شده با memory-map باز می‌شوند. در نبود انبار None برمی‌گردد.
+    """
+    directory = feature_dir(symbol, timeframe, feature_set_name, root)
+    meta = _read_meta(directory)
+    if meta is None:
+        return None
+    columns = list(columns or meta["columns"])
+    start = None if start is None else _to_datetime64(start)
+    end = None if end is None else _to_datetime64(end)
+
+    time_parts = []
+    column_parts = {col: [] for col in columns}
+    for part in meta["partitions"]:
+        if (start is not None and _to_datetime64(part["end"]) < start) or \
+                (end is not None and _to_datetime64(part["start"]) > end):
+            continue
+        part_dir = directory / part["key"]
+        times = np.load(part_dir / f"{TIME_COL}.npy", mmap_mode="r")[:part["rows"]]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = part["rows"] if end is None else int(np.searchsorted(times, end, side="right"))
+        time_parts.append(times[lo:hi])
+        for col in columns:
+            column_parts[col].append(np.load(part_dir / f"{col}.npy", mmap_mode="r")[lo:hi])
+
+    if not time_parts:
+        index = pd.DatetimeIndex(np.empty(0, dtype="datetime64[ns]"), name=TIME_COL)
+        return pd.DataFrame({col: np.empty(0) for col in columns}, index=index)
+
+    index = pd.DatetimeIndex(np.concatenate(time_parts), name=TIME_COL)
+    df = pd.DataFrame({col: np.concatenate(column_parts[col]) for col in columns}, index=index)
+    return df.dropna() if dropna else df
@@ -0,0 +1,227 @@
+### data/klines.py ###
+# دانلود افزایشی کندل‌ها: از آخرین open_time ذخیره شده ادامه می‌دهد، صفحه به صفحه
+# دریافت و در انبار (و CSV خام) append می‌کند؛ پس دانلود قطع شده از همان‌جا ادامه پیدا می‌کند.
+# منبع کندل قابل تعویض است (Binance یا منبع محلی برای اجرای بدون شبکه).
+import time
+import zlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data import store
+from utils.helpers import make_synthetic_ohlcv
+
+
+PAGE_LIMIT = 1000  # حداکثر کندل در هر درخواست Binance
+FLUSH_ROWS = 50_000  # هر چند ردیف یک بار روی دیسک نوشته شود
+LOCAL_BLOCK = 10_000  # اندازه بلوک‌های سری مصنوعی منبع محلی
+
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_asset_volume",
+    "number_of_trades", "taker_buy_base_volume",
+    "taker_buy_quote_volume", "ignore"
+]
+
+_INTERVAL_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def interval_ms(interval):
+    """طول یک کندل به میلی‌ثانیه (مثلاً 4h -> 14400000)"""
+    return int(interval[:-1]) * _INTERVAL_UNITS_MS[interval[-1]]
+
+
+def to_ms(value):
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def klines_to_frame(klines):
+    """تبدیل خروجی خام klines به DataFrame با ایندکس open_time (همان فرمت CSV های خام)"""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df = df[["open_time", "open", "high", "low", "close", "volume"]]
+
+    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms").astype("datetime64[ns]")
+    df.set_index("open_time", inplace=True)
+
+    return df.astype(float)
+
+
+# =========================================
+# Kline Sources
+# =========================================
+
+class RateLimiter:
+    """محدودیت نرخ درخواست (token bucket) که بین thread ها مشترک است"""
+
+    def __init__(self, rate=10.0, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BinanceKlineSource:
+    """منبع Binance با یک Client مشترک و محدودیت نرخ برای همه thread ها"""
+
+    def __init__(self, rate=10.0):
+        self.limiter = RateLimiter(rate)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from binance.client import Client
+                # برای داده تاریخی API Key لازم نیست
+                self._client = Client()
+            return self._client
+
+    def fetch_klines(self, symbol, interval, start_ms, limit=PAGE_LIMIT):
+        self.limiter.acquire()
+        return self.client.get_klines(symbol=symbol, interval=interval, startTime=start_ms, limit=limit)
+
+    def server_time_ms(self):
+        self.limiter.acquire()
+        return self.client.get_server_time()["serverTime"]
+
+
+class LocalKlineSource:
+    """
+    منبع محلی و قطعی (بدون شبکه) با همان فرمت klines؛ برای تست و اجرای آفلاین.
+    کندل‌ها از origin تا now ساخته می‌شوند و برای یک نماد همیشه یکسان هستند.
+    """
+
+    def __init__(self, origin="2020-01-01", now=None, delay=0.0):
+        self.origin = pd.Timestamp(origin)
+        self.now = now
+        self.delay = delay
+        self.calls = 0
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def server_time_ms(self):
+        return to_ms(self.now) if self.now is not None else int(time.time() * 1000)
+
+    def _klines(self, symbol, interval):
+        """
+        سری به صورت بلوک‌های ثابت (هر بلوک با seed خودش، ادامه قیمت بلوک قبل) ساخته می‌شود
+        تا کندل‌های گذشته به زمان now بستگی نداشته باشند.
+        """
+        key = (symbol, interval)
+        step = interval_ms(interval)
+        n_bars = (self.server_time_ms() - to_ms(self.origin)) // step + 1
+        with self._lock:
+            open_ms, values = self._series.get(key, (np.empty(0, dtype=np.int64), np.empty((0, 5))))
+            seed = zlib.crc32(symbol.encode())
+            while len(open_ms) < n_bars:
+                block = len(open_ms) // LOCAL_BLOCK
+                start = self.origin + pd.Timedelta(milliseconds=step * len(open_ms))
+                start_price = values[-1, 3] if len(values) else 100.0
+                df = make_synthetic_ohlcv(
+                    LOCAL_BLOCK, seed=(seed, block), start=start, freq=f"{step}ms", start_price=start_price
+                )
+                open_ms = np.concatenate([open_ms, df.index.values.astype("datetime64[ms]").astype(np.int64)])
+                values = np.vstack([values, df[["open", "high", "low", "close", "volume"]].to_numpy()])
+            self._series[key] = (open_ms, values)
+        return open_ms[:n_bars], values[:n_bars]
+
+    def fetch_klines(self, symbol, interval, start_ms, limit=PAGE_LIMIT):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        open_ms, values = self._klines(symbol, interval)
+        step = interval_ms(interval)
+        lo = int(np.searchsorted(open_ms, start_ms, side="left"))
+        klines = []
+        for t, row in zip(open_ms[lo:lo + limit].tolist(), values[lo:lo + limit].tolist()):
+            klines.append([t, *(str(v) for v in row), t + step - 1, "0", 0, "0", "0", "0"])
+        return klines
+
+
+# =========================================
+# Incremental Download
+# =========================================
+
+def _flush(symbol, timeframe, frames, root, raw_dir):
+    df = pd.concat(frames)
+    added = store.append_ohlcv(symbol, timeframe, df, root)
+
+    # CSV خام همگام با انبار؛ اگر نبود از کل دیتاست ساخته می‌شود
+    path = store.csv_path(symbol, timeframe, raw_dir)
+    if path.exists():
+        store.append_csv_ohlcv(path, df)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        store.load_ohlcv(symbol, timeframe, root=root).to_csv(path)
+    return added
+
+
+def sync_klines(source, symbol, timeframe, start_date, root=None, raw_dir=None, full=False,
+                flush_rows=FLUSH_ROWS):
+    """
+    دانلود افزایشی یک نماد/تایم فریم. فقط کندل‌های بسته شده ذخیره می‌شوند
+    و داده هر flush_rows ردیف یک بار append می‌شود (نقطه ادامه در صورت قطع شدن).
+    خروجی: تعداد ردیف‌های جدید.
+    """
+    csv_file = store.csv_path(symbol, timeframe, raw_dir)
+    if full:
+        last = None
+    elif store.has_dataset(symbol, timeframe, root):
+        last = store.last_open_time(symbol, timeframe, root)
+    elif csv_file.exists():
+        # CSV قدیمی بدون انبار: یک بار به انبار منتقل می‌شود
+        store.write_ohlcv(symbol, timeframe, store.read_csv_ohlcv(csv_file), root)
+        last = store.last_open_time(symbol, timeframe, root)
+    else:
+        last = None
+
+    step = interval_ms(timeframe)
+    start_ms = to_ms(start_date) if last is None else to_ms(last) + step
+    now_ms = source.server_time_ms()
+
+    frames = []
+    pending = 0
+    added = 0
+    first_flush = full
+    while start_ms < now_ms:
+        klines = source.fetch_klines(symbol, timeframe, start_ms)
+        # کندل در حال تشکیل (close_time در آینده) ذخیره نمی‌شود
+        closed = [k for k in klines if k[6] < now_ms]
+        if closed:
+            frames.append(klines_to_frame(closed))
+            pending += len(closed)
+            start_ms = closed[-1][0] + step
+
+        done = len(closed) < len(klines) or len(klines) < PAGE_LIMIT
+        if frames and (pending >= flush_rows or done):
+            if first_flush:
+                # دانلود کامل: جایگزینی دیتاست قبلی با صفحه اول
+                df = pd.concat(frames)
+                store.write_ohlcv(symbol, timeframe, df, root)
+                csv_file.parent.mkdir(parents=True, exist_ok=True)
+                df.to_csv(csv_file)
+                added += len(df)
+                first_flush = False
+            else:
+                added += _flush(symbol, timeframe, frames, root, raw_dir)
+            frames, pending = [], 0
+        if done:
+            break
+
+    return added
@@ -0,0 +1,228 @@
+### data/resample.py ###
+# ساخت کندل‌های تایم فریم بالاتر (15m/1h/4h/1d/...) از یک تایم فریم پایه ذخیره شده (مثلاً 1m).
+# تجمیع برداری است: شروع هر بازه با floor کردن open_time، مرز گروه‌ها با یک diff و
+# high/low/volume با ufunc.reduceat (بدون groupby پانداس، مستقیم روی آرایه‌های memory-map).
+# خروجی‌ها با همان قالب انبار OHLCV در data/derived کش می‌شوند:
+#
+#     data/derived/BTCUSDT_4h/
+#         open_time.npy  open.npy  ...  meta.json  source.json   (base_timeframe, base_rows, base_end)
+#
+# با رشد داده پایه فقط کندل‌های بعد از آخرین کندل کش شده دوباره ساخته می‌شوند؛ اگر تاریخچه
+# پایه تغییر کرده باشد (دانلود کامل دوباره) کش کامل بازسازی می‌شود.
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from data.store import (
+    DATA_ROOT, TIME_COL, OHLCV_COLUMNS, dataset_dir, has_dataset, list_datasets,
+    load_ohlcv, load_ohlcv_arrays, write_ohlcv, append_ohlcv, _read_meta, _to_datetime64,
+)
+from data.klines import interval_ms
+
+
+DERIVED_DIR = DATA_ROOT / "derived"
+
+SOURCE_FILE = "source.json"
+
+# کندل هفتگی Binance از دوشنبه شروع می‌شود؛ مبدأ epoch (1970-01-01) پنجشنبه است
+_WEEK_OFFSET_NS = 4 * 86_400 * 10 ** 9
+
+
+def timeframe_ns(timeframe):
+    """طول کندل به نانوثانیه (15m، 4h، 1d، 1w)"""
+    return interval_ms(timeframe) * 1_000_000
+
+
+def bar_duration(times):
+    """طول کندل از کوچک‌ترین فاصله بین open_time ها (شکاف‌های داده اثری ندارند)"""
+    if len(times) < 2:
+        return None
+    return np.diff(times).min()
+
+
+def bucket_starts(times, timeframe):
+    """open_time کندل تایم فریم بالاتری که هر open_time داخل آن است (int64 نانوثانیه)"""
+    step = timeframe_ns(timeframe)
+    offset = _WEEK_OFFSET_NS if timeframe.endswith("w") else 0
+    t = np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+    return (t - offset) // step * step + offset
+
+
+def aggregate_arrays(arrays, timeframe, base_timeframe=None):
+    """
+    تجمیع آرایه‌های OHLCV (دیکشنری ستون -> آرایه به همراه open_time) به timeframe.
+    با base_timeframe آخرین کندل در صورت ناقص بودن (بسته نشدن بازه) حذف می‌شود.
+    """
+    times = arrays[TIME_COL]
+    if not len(times):
+        return {TIME_COL: np.empty(0, dtype="datetime64[ns]"),
+                **{col: np.empty(0) for col in OHLCV_COLUMNS if col in arrays}}
+
+    buckets = bucket_starts(times, timeframe)
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(buckets)])) - 1
+
+    if base_timeframe is not None:
+        last_close = times[-1].astype("datetime64[ns]").astype(np.int64) + timeframe_ns(base_timeframe)
+        if last_close < buckets[-1] + timeframe_ns(timeframe):
+            starts, ends = starts[:-1], ends[:-1]
+
+    # reduceat آخرین گروه را تا انتهای آرایه ادامه می‌دهد: ردیف‌های کندل ناقص حذف شده کنار گذاشته می‌شوند
+    stop = int(ends[-1]) + 1 if len(ends) else 0
+
+    out = {TIME_COL: buckets[starts].view("datetime64[ns]")}
+    if "open" in arrays:
+        out["open"] = np.asarray(arrays["open"])[starts]
+    if "high" in arrays:
+        out["high"] = np.maximum.reduceat(arrays["high"][:stop], starts) if stop else np.empty(0)
+    if "low" in arrays:
+        out["low"] = np.minimum.reduceat(arrays["low"][:stop], starts) if stop else np.empty(0)
+    if "close" in arrays:
+        out["close"] = np.asarray(arrays["close"])[ends]
+    if "volume" in arrays:
+        out["volume"] = np.add.reduceat(arrays["volume"][:stop], starts) if stop else np.empty(0)
+    return out
+
+
+def resample_ohlcv(df, timeframe, base_timeframe=None):
+    """نسخه DataFrame تابع aggregate_arrays (ایندکس open_time)"""
+    arrays = {col: df[col].to_numpy(dtype=np.float64) for col in OHLCV_COLUMNS if col in df.columns}
+    arrays[TIME_COL] = df.index.values.astype("datetime64[ns]")
+    out = aggregate_arrays(arrays, timeframe, base_timeframe)
+    index = pd.DatetimeIndex(out.pop(TIME_COL), name=TIME_COL)
+    return pd.DataFrame(out, index=index)
+
+
+# =========================================
+# Derived Cache
+# =========================================
+
+def find_base(symbol, timeframe, root=None):
+    """درشت‌ترین تایم فریم ذخیره شده که timeframe مضربی از آن است (کمترین ردیف برای تجمیع)"""
+    step = timeframe_ns(timeframe)
+    candidates = []
+    for stored_symbol, stored_tf in list_datasets(root):
+        if stored_symbol != symbol:
+            continue
+        try:
+            base_step = timeframe_ns(stored_tf)
+        except (KeyError, ValueError):
+            continue
+        if base_step < step and step % base_step == 0:
+            candidates.append((base_step, stored_tf))
+    return max(candidates)[1] if candidates else None
+
+
+def _read_source(directory):
+    path = directory / SOURCE_FILE
+    if not (directory / "meta.json").exists() or not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_source(directory, source):
+    tmp_path = directory / f"{SOURCE_FILE}.tmp"
+    tmp_path.write_text(json.dumps(source, indent=2), encoding="utf-8")
+    os.replace(tmp_path, directory / SOURCE_FILE)
+
+
+def update_resampled(symbol, timeframe, base_timeframe=None, root=None, derived_root=None, full=False):
+    """
+    به‌روزرسانی کش کندل‌های timeframe از داده پایه. خروجی: تعداد کندل‌های نوشته شده.
+    کش فعلی معتبر است اگر از همان تایم فریم پایه ساخته شده و base_rows ردیف اول پایه دست نخورده باشد.
+    """
+    base_timeframe = base_timeframe or find_base(symbol, timeframe, root)
+    if base_timeframe is None or not has_dataset(symbol, base_timeframe, root):
+        raise FileNotFoundError(f"No base data to derive {symbol} {timeframe}")
+
+    base_meta = _read_meta(dataset_dir(symbol, base_timeframe, root))
+    base_times = load_ohlcv_arrays(symbol, base_timeframe, columns=[], root=root)[TIME_COL]
+    directory = dataset_dir(symbol, timeframe, derived_root or DERIVED_DIR)
+    source = None if full else _read_source(directory)
+
+    current = (
+        source is not None and source["base_timeframe"] == base_timeframe
+        and source["base_rows"] <= len(base_times)
+        and (source["base_rows"] == 0 or base_times[source["base_rows"] - 1] == _to_datetime64(source["base_end"]))
+    )
+    if current and source["base_rows"] == len(base_times):
+        return 0
+
+    start = None
+    meta = _read_meta(directory) if current else None
+    if meta and meta["rows"]:
+        # کندل ناقص آخر هیچ وقت ذخیره نمی‌شود؛ تجمیع از شروع کندل بعد از آخرین کندل کش شده
+        start = _to_datetime64(meta["end"]) + np.timedelta64(timeframe_ns(timeframe), "ns")
+    arrays = load_ohlcv_arrays(symbol, base_timeframe, start=start, root=root)
+    out = aggregate_arrays(arrays, timeframe, base_timeframe)
+    index = pd.DatetimeIndex(out.pop(TIME_COL), name=TIME_COL)
+    df = pd.DataFrame(out, index=index)
+
+    derived_root = derived_root or DERIVED_DIR
+    if start is None:
+        write_ohlcv(symbol, timeframe, df, derived_root)
+        written = len(df)
+    else:
+        written = append_ohlcv(symbol, timeframe, df, derived_root)
+
+    _write_source(directory, {
+        "base_timeframe": base_timeframe,
+        "base_rows": int(base_meta["rows"]),
+        "base_end": base_meta["end"],
+    })
+    return written
+
+
+def load_resampled(symbol, timeframe, base_timeframe=None, start=None, end=None, columns=None,
+                   root=None, derived_root=None):
+    """کندل‌های مشتق شده (کش به‌روز می‌شود و با memory-map خوانده می‌شود)؛ None در نبود داده پایه"""
+    base_timeframe = base_timeframe or find_base(symbol, timeframe, root)
+    if base_timeframe is None:
+        return None
+    update_resampled(symbol, timeframe, base_timeframe, root, derived_root)
+    return load_ohlcv(symbol, timeframe, start, end, columns, root=derived_root or DERIVED_DIR)
+
+
+def load_timeframe(symbol, timeframe, start=None, end=None, columns=None, root=None, raw_dir=None,
+                   derived_root=None):
+    """
+    هر تایم فریم: دیتاست (یا CSV) ذخیره شده خود آن تایم فریم، در غیر این صورت
+    مشتق از داده پایه ریزتر. None اگر هیچ‌کدام موجود نباشد.
+    """
+    df = load_ohlcv(symbol, timeframe, start, end, columns, root=root, raw_dir=raw_dir)
+    if df is not None:
+        return df
+    return load_resampled(symbol, timeframe, start=start, end=end, columns=columns,
+                          root=root, derived_root=derived_root)
+
+
+# =========================================
+# Alignment
+# =========================================
+
+def align_to(higher_times, higher_timeframe, times, timeframe=None):
+    """
+    برای هر کندل times، اندیس آخرین کندل higher_timeframe که تا پایان همان کندل بسته شده
+    (-1 اگر هنوز هیچ کندلی بسته نشده). مقدار کندل بالاتر در حال تشکیل هرگز استفاده نمی‌شود.
+    timeframe: تایم فریم times (پیش‌فرض از فاصله open_time ها).
+    """
+    times = np.asarray(times, dtype="datetime64[ns]")
+    if timeframe:
+        step = timeframe_ns(timeframe)
+    else:
+        duration = bar_duration(times)
+        step = 0 if duration is None else int(duration.astype("timedelta64[ns]").astype(np.int64))
+    higher_close = np.asarray(higher_times, dtype="datetime64[ns]").view(np.int64) + timeframe_ns(higher_timeframe)
+    return np.searchsorted(higher_close, times.view(np.int64) + step, side="right") - 1
+
+
+def align_values(values, positions, fill=np.nan):
+    """values[positions] با fill برای کندل‌هایی که هنوز کندل بالاتر بسته شده ندارند"""
+    values = np.asarray(values)
+    if not len(values):
+        return np.full(len(positions), fill)
+    out = values[np.maximum(positions, 0)].astype(np.result_type(values.dtype, np.asarray(fill).dtype))
+    out[positions < 0] = fill
+    return out
@@ -0,0 +1,293 @@
+### data/store.py ###
+# انبار ستونی OHLCV: هر دیتاست یک پوشه با یک فایل .npy برای هر ستون
+# و ایندکس زمانی open_time (datetime64[ns]). خواندن با memory-map انجام
+# می‌شود تا فقط بخش مورد نیاز (مثلاً یک بازه تاریخ) از دیسک خوانده شود.
+#
+#     data/store/BTCUSDT_4h/
+#         open_time.npy  open.npy  high.npy  low.npy  close.npy  volume.npy  meta.json
+import io
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+DATA_ROOT = Path(__file__).resolve().parent
+RAW_DIR = DATA_ROOT / "raw"
+STORE_DIR = DATA_ROOT / "store"
+
+TIME_COL = "open_time"
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def dataset_dir(symbol, timeframe, root=None):
+    return Path(root or STORE_DIR) / f"{symbol}_{timeframe}"
+
+
+def csv_path(symbol, timeframe, raw_dir=None):
+    return Path(raw_dir or RAW_DIR) / f"{symbol}_{timeframe}.csv"
+
+
+def has_dataset(symbol, timeframe, root=None):
+    return (dataset_dir(symbol, timeframe, root) / "meta.json").exists()
+
+
+def list_datasets(root=None):
+    """لیست (symbol, timeframe) های موجود در انبار"""
+    root = Path(root or STORE_DIR)
+    if not root.exists():
+        return []
+    datasets = []
+    for path in sorted(root.iterdir()):
+        if (path / "meta.json").exists():
+            meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+            datasets.append((meta["symbol"], meta["timeframe"]))
+    return datasets
+
+
+def _atomic_save(path, arr):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, arr, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def _append_npy(path, rows, values):
+    """
+    نوشتن values بعد از rows ردیف اول یک فایل .npy یک‌بعدی، در جا و بدون بازنویسی ردیف‌های قبلی.
+    ترتیب: حذف دنباله append نیمه‌کاره قبلی، نوشتن داده و در آخر shape داخل header. np.save در
+    header جای خالی برای رشد محور اول می‌گذارد؛ اگر header جدید هم‌اندازه قبلی نباشد (فایل
+    ساخته شده با NumPy قدیمی) False برمی‌گردد و فایل دست نمی‌خورد.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+        if len(shape) != 1 or fortran_order or shape[0] < rows:
+            return False
+
+        header = io.BytesIO()
+        write_header = np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0
+        write_header(header, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                              "shape": (rows + len(values),)})
+        if header.tell() != offset:
+            return False
+
+        f.truncate(offset + rows * dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+
+def _write_meta(directory, symbol, timeframe, columns, rows, start, end):
+    meta = {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "columns": columns,
+        "rows": int(rows),
+        "start": None if start is None else str(start),
+        "end": None if end is None else str(end),
+    }
+    tmp_path = directory / "meta.json.tmp"
+    tmp_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp_path, directory / "meta.json")
+
+
+def write_ohlcv(symbol, timeframe, df, root=None):
+    """
+    ذخیره DataFrame با ایندکس زمانی در انبار (جایگزینی کامل).
+    meta.json آخر از همه نوشته می‌شود تا دیتاست نیمه‌کاره قابل خواندن نباشد.
+    """
+    directory = dataset_dir(symbol, timeframe, root)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    df = df.sort_index()
+    times = df.index.values.astype("datetime64[ns]")
+    columns = [c for c in OHLCV_COLUMNS if c in df.columns]
+
+    _atomic_save(directory / f"{TIME_COL}.npy", times)
+    for col in columns:
+        _atomic_save(directory / f"{col}.npy", df[col].to_numpy(dtype=np.float64))
+
+    _write_meta(directory, symbol, timeframe, columns, len(times),
+                times[0] if len(times) else None, times[-1] if len(times) else None)
+    return directory
+
+
+def append_ohlcv(symbol, timeframe, df, root=None):
+    """
+    افزودن کندل‌های جدیدتر از آخرین open_time به دیتاست (ردیف‌های تکراری نادیده گرفته می‌شوند).
+    ردیف‌ها در جا به انتهای فایل هر ستون اضافه می‌شوند (هزینه متناسب با ردیف‌های جدید، نه کل
+    تاریخچه) و meta.json در آخر؛ چون خواننده فقط meta["rows"] ردیف اول را می‌خواند و ردیف‌های
+    قدیمی تغییر نمی‌کنند، قطع شدن در وسط کار دیتاست را خراب نمی‌کند.
+    خروجی: تعداد ردیف‌های اضافه شده.
+    """
+    if not has_dataset(symbol, timeframe, root):
+        write_ohlcv(symbol, timeframe, df, root)
+        return len(df)
+
+    directory = dataset_dir(symbol, timeframe, root)
+    meta = _read_meta(directory)
+    rows = meta["rows"]
+
+    df = df.sort_index()
+    new_times = df.index.values.astype("datetime64[ns]")
+    if rows:
+        mask = new_times > _to_datetime64(meta["end"])
+        df, new_times = df[mask], new_times[mask]
+    if not len(df):
+        return 0
+
+    columns = {TIME_COL: new_times}
+    columns.update((col, df[col].to_numpy(dtype=np.float64)) for col in meta["columns"])
+    for col, values in columns.items():
+        path = directory / f"{col}.npy"
+        if not _append_npy(path, rows, values):
+            # header بدون جای رشد: یک بار بازنویسی کامل (از این به بعد در جا)
+            old = np.load(path)[:rows]
+            _atomic_save(path, np.concatenate([old, values]))
+
+    start = meta["start"] if rows else new_times[0]
+    _write_meta(directory, symbol, timeframe, meta["columns"], rows + len(df), start, new_times[-1])
+    return len(df)
+
+
+def last_open_time(symbol, timeframe, root=None):
+    """آخرین open_time ذخیره شده در انبار (یا None)"""
+    if not has_dataset(symbol, timeframe, root):
+        return None
+    end = _read_meta(dataset_dir(symbol, timeframe, root))["end"]
+    return None if end is None else pd.Timestamp(end)
+
+
+def _to_datetime64(value):
+    return pd.Timestamp(value).to_datetime64().astype("datetime64[ns]")
+
+
+def _read_meta(directory):
+    return json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+
+
+def load_ohlcv_arrays(symbol, timeframe, start=None, end=None, columns=None, root=None):
+    """
+    آرایه‌های memory-map شده (بدون کپی) برای یک بازه زمانی.
+    start/end شامل هستند؛ خروجی دیکشنری ستون -> آرایه به همراه open_time.
+    """
+    directory = dataset_dir(symbol, timeframe, root)
+    meta = _read_meta(directory)
+    columns = columns or meta["columns"]
+
+    # np.load فایل ناقص‌تر از meta را هم باز می‌کند؛ تعداد سطر از meta ملاک است
+    rows = meta["rows"]
+    times = np.load(directory / f"{TIME_COL}.npy", mmap_mode="r")[:rows]
+
+    # جستجوی دودویی روی ایندکس زمانی فقط چند صفحه از دیسک را لمس می‌کند
+    lo = 0 if start is None else int(np.searchsorted(times, _to_datetime64(start), side="left"))
+    hi = rows if end is None else int(np.searchsorted(times, _to_datetime64(end), side="right"))
+
+    arrays = {TIME_COL: times[lo:hi]}
+    for col in columns:
+        arrays[col] = np.load(directory / f"{col}.npy", mmap_mode="r")[lo:hi]
+    return arrays
+
+
+def read_csv_ohlcv(path):
+    """خواندن CSV خام (فرمت download_data.py) با ایندکس open_time"""
+    df = pd.read_csv(path)
+    df[TIME_COL] = pd.to_datetime(df[TIME_COL]).astype("datetime64[ns]")
+    df.set_index(TIME_COL, inplace=True)
+    return df
+
+
+def _truncate_partial_line(path, block=4096):
+    """حذف خط ناقص انتهای فایل (append قطع شده)؛ فقط انتهای فایل خوانده می‌شود"""
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                pos = start + newline + 1
+                break
+            pos = start
+        if pos != end:
+            f.truncate(pos)
+
+
+def csv_last_time(path):
+    """آخرین open_time یک CSV خام بدون خواندن کل فایل (فقط انتهای فایل)"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = f.read().decode("utf-8").strip().splitlines()
+    last_line = lines[-1] if lines else ""
+    if not last_line or last_line.startswith(TIME_COL):
+        return None  # فایل خالی یا فقط هدر
+    return pd.Timestamp(last_line.split(",", 1)[0])
+
+
+def append_csv_ohlcv(path, df):
+    """
+    افزودن ردیف‌های جدیدتر از آخرین ردیف CSV، در جا به انتهای فایل (بدون کپی کل فایل).
+    خط ناقص append قطع شده قبلی پیش از خواندن آخرین زمان حذف می‌شود.
+    """
+    path = Path(path)
+    if not path.exists():
+        df.to_csv(path)
+        return len(df)
+
+    _truncate_partial_line(path)
+    last = csv_last_time(path)
+    if last is not None:
+        df = df[df.index > last]
+    if not len(df):
+        return 0
+
+    df.to_csv(path, mode="a", header=False)
+    return len(df)
+
+
+def load_ohlcv(symbol, timeframe, start=None, end=None, columns=None, root=None, raw_dir=None):
+    """
+    API واحد بارگذاری OHLCV: اگر دیتاست در انبار باشد به صورت memory-map
+    خوانده می‌شود، در غیر این صورت از CSV خام. در نبود هر دو None برمی‌گردد.
+    """
+    if has_dataset(symbol, timeframe, root):
+        arrays = load_ohlcv_arrays(symbol, timeframe, start, end, columns, root)
+        index = pd.DatetimeIndex(arrays.pop(TIME_COL), name=TIME_COL)
+        return pd.DataFrame(arrays, index=index, copy=False)
+
+    path = csv_path(symbol, timeframe, raw_dir)
+    if not path.exists():
+        return None
+
+    df = read_csv_ohlcv(path)
+    if columns:
+        df = df[list(columns)]
+    if start is not None or end is not None:
+        # همان مرز شامل start/end نسخه انبار (بدون تفسیر رشته‌ای تاریخ)
+        df = df.loc[
+            None if start is None else pd.Timestamp(start):
+            None if end is None else pd.Timestamp(end)
+        ]
+    return df
+
+
+def convert_csv_dir(raw_dir=None, root=None):
+    """تبدیل یک‌باره همه CSV های data/raw به انبار ستونی"""
+    converted = []
+    for path in sorted(Path(raw_dir or RAW_DIR).glob("*.csv")):
+        symbol, _, timeframe = path.stem.partition("_")
+        df = read_csv_ohlcv(path)
+        write_ohlcv(symbol, timeframe, df, root)
+        converted.append((symbol, timeframe, len(df)))
+    return converted
@@ -0,0 +1,933 @@
+# scripts/benchmark.py
+# فقط زمان‌سنجی، حافظه و مقایسه JSON با خط مبنا؛ بررسی درستی (برابری با نسخه‌های مرجع) در tests/ است
+
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# اضافه کردن ریشه پروژه
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from config import settings
+from core.strategy import DualSupertrendStrategy
+from core.risk_manager import RiskManager
+from core.portfolio import MultiAssetPortfolio
+from backtest.engine import BacktestEngine
+from core import indicators
+from utils.helpers import make_synthetic_ohlcv
+from data import store
+from core import streaming
+from core.features import AI_PIPELINE
+
+SYMBOL = "SYNTHUSDT"
+
+
+def build_engine():
+    assets_config = [{"symbol": SYMBOL, "weight": 1.0}]
+    portfolio = MultiAssetPortfolio(settings.INITIAL_CAPITAL, assets_config)
+    strategy = DualSupertrendStrategy(settings.STRATEGY_PARAMS)
+    risk_manager = RiskManager(settings.INITIAL_CAPITAL, settings.RISK_PER_TRADE)
+    return BacktestEngine(portfolio, strategy, risk_manager)
+
+
+def legacy_bar_loop(engine, symbol, df, start=200):
+    """حلقه قدیمی سطر به سطر با df.iloc (فقط برای مقایسه)"""
+    portfolio = engine.portfolio
+    risk_manager = engine.risk_manager
+
+    for i in range(start, len(df)):
+        current_row = df.iloc[i]
+
+        if symbol in portfolio.positions:
+            position = portfolio.positions[symbol]
+            if current_row['low'] <= position['stop_loss']:
+                portfolio.close_position(symbol, position['stop_loss'], current_row.name, reason="SL")
+            elif current_row['high'] >= position['take_profit']:
+                portfolio.close_position(symbol, position['take_profit'], current_row.name, reason="TP")
+
+        if current_row['signal'] == 1 and symbol not in portfolio.positions:
+            stop_loss = risk_manager.calculate_stop_loss(df, i)
+            if stop_loss >= current_row['close']:
+                continue
+            position_size = risk_manager.calculate_position_size(current_row['close'], stop_loss)
+            if position_size > 0:
+                take_profit = risk_manager.calculate_take_profit(df, i)
+                portfolio.open_position(
+                    symbol, current_row['close'], position_size, stop_loss, take_profit, current_row.name
+                )
+
+
+def bench_engine(n_bars, legacy=True):
+    print(f"\n=== Engine bar loop | {n_bars:,} bars ===")
+    df = make_synthetic_ohlcv(n_bars)
+
+    t0 = time.perf_counter()
+    signals = build_engine().strategy.generate_signals(df)
+    print(f"generate_signals : {time.perf_counter() - t0:8.3f}s")
+
+    engine = build_engine()
+    t0 = time.perf_counter()
+    engine._run_bar_loop(SYMBOL, signals)
+    array_time = time.perf_counter() - t0
+    print(f"array loop       : {array_time:8.3f}s  ({len(engine.portfolio.trades)} trades)")
+
+    if not legacy:
+        return
+
+    legacy_engine = build_engine()
+    t0 = time.perf_counter()
+    legacy_bar_loop(legacy_engine, SYMBOL, signals)
+    legacy_time = time.perf_counter() - t0
+    print(f"legacy iloc loop : {legacy_time:8.3f}s  ({len(legacy_engine.portfolio.trades)} trades)")
+    print(f"speedup          : {legacy_time / max(array_time, 1e-9):8.1f}x")
+
+
+def bench_merged(n_symbols, n_bars):
+    """حلقه زمانی چند نمادی (heap) در برابر حلقه نماد به نماد روی سیگنال‌های آماده"""
+    print(f"\n=== Chronological loop | {n_symbols} symbols x {n_bars:,} bars ===")
+    strategy = DualSupertrendStrategy(settings.STRATEGY_PARAMS)
+    frames = {
+        f"SYN{i:04d}USDT": strategy.generate_signals(make_synthetic_ohlcv(n_bars, seed=i))
+        for i in range(n_symbols)
+    }
+    assets_config = [{"symbol": symbol, "weight": 1.0 / n_symbols} for symbol in frames]
+
+    for chronological in (False, True):
+        portfolio = MultiAssetPortfolio(settings.INITIAL_CAPITAL, assets_config)
+        risk_manager = RiskManager(settings.INITIAL_CAPITAL, settings.RISK_PER_TRADE)
+        engine = BacktestEngine(portfolio, strategy, risk_manager, chronological=chronological)
+        t0 = time.perf_counter()
+        engine.run_signals(frames)
+        elapsed = time.perf_counter() - t0
+        label = "chronological" if chronological else "per-symbol"
+        print(f"{label:<17}: {elapsed:8.3f}s  ({len(portfolio.trades):,} trades, "
+              f"{elapsed / (n_symbols * n_bars) * 1e9:.1f}ns/bar)")
+
+
+def bench_supertrend(n_bars, n_params=100):
+    print(f"\n=== Supertrend | {n_bars:,} bars ===")
+    df = make_synthetic_ohlcv(n_bars)
+    close = df["close"].to_numpy()
+    hl2 = ((df["high"] + df["low"]) / 2).to_numpy()
+    atr_val = indicators.calculate_atr(df, 10).fillna(0).to_numpy()
+    upper, lower = hl2 + 3.0 * atr_val, hl2 - 3.0 * atr_val
+
+    t0 = time.perf_counter()
+    indicators._supertrend_loop(upper, lower, close)
+    print(f"python loop      : {time.perf_counter() - t0:8.3f}s")
+
+    t0 = time.perf_counter()
+    indicators._supertrend_numpy(upper, lower, close)
+    print(f"numpy fallback   : {time.perf_counter() - t0:8.3f}s")
+
+    if indicators._load_kernels():
+        indicators.supertrend(df.iloc[:10], 10, 3.0)  # warm-up (JIT)
+        t0 = time.perf_counter()
+        indicators._supertrend_kernel(upper, lower, close)
+        print(f"numba kernel     : {time.perf_counter() - t0:8.3f}s")
+    else:
+        print("numba kernel     :      n/a (numba not installed)")
+
+    grid = [(period, 1.0 + 0.5 * step) for period in range(5, 25) for step in range(n_params // 20)]
+    indicators.supertrend_batch(df.iloc[:10], grid[:1])  # warm-up (JIT)
+    t0 = time.perf_counter()
+    trends = indicators.supertrend_batch(df, grid)
+    print(f"batch x{len(grid):<4}      : {time.perf_counter() - t0:8.3f}s  shape: {trends.shape}")
+
+
+def bench_store(n_bars):
+    print(f"\n=== OHLCV loading | {n_bars:,} bars ===")
+    df = make_synthetic_ohlcv(n_bars)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, f"{SYMBOL}_1h.csv")
+        df.to_csv(csv_file)
+        store.write_ohlcv(SYMBOL, "1h", df, root=tmp)
+
+        t0 = time.perf_counter()
+        store.read_csv_ohlcv(csv_file)
+        print(f"csv + date parse : {time.perf_counter() - t0:8.3f}s")
+
+        t0 = time.perf_counter()
+        loaded = store.load_ohlcv(SYMBOL, "1h", root=tmp)
+        loaded["close"].sum()
+        print(f"columnar (mmap)  : {time.perf_counter() - t0:8.3f}s")
+
+        mid = df.index[n_bars // 2]
+        t0 = time.perf_counter()
+        sliced = store.load_ohlcv(SYMBOL, "1h", start=mid, end=df.index[-1], root=tmp)
+        print(f"date-range slice : {time.perf_counter() - t0:8.3f}s  ({len(sliced):,} rows)")
+        del loaded, sliced
+
+
+def bench_features(n_bars, new_bars=24):
+    """انبار ویژگی: ساخت کامل در برابر به‌روزرسانی افزایشی دُم"""
+    from data import feature_store
+    from scripts.build_features import MARKET_FEATURES
+
+    print(f"\n=== Feature store | {n_bars:,} bars, +{new_bars} new bars ===")
+    df = make_synthetic_ohlcv(n_bars)
+    name = MARKET_FEATURES.name
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        feature_store.update_features(SYMBOL, "1h", MARKET_FEATURES, ohlcv=df.iloc[:-new_bars], root=tmp)
+        print(f"full build       : {time.perf_counter() - t0:8.3f}s")
+
+        t0 = time.perf_counter()
+        written = feature_store.update_features(SYMBOL, "1h", MARKET_FEATURES, ohlcv=df, root=tmp)
+        print(f"incremental      : {time.perf_counter() - t0:8.3f}s  ({written} rows rewritten, "
+              f"warm-up {MARKET_FEATURES.warmup} bars)")
+
+        t0 = time.perf_counter()
+        feature_store.update_features(SYMBOL, "1h", MARKET_FEATURES, ohlcv=df, root=tmp, full=True)
+        print(f"full rebuild     : {time.perf_counter() - t0:8.3f}s")
+
+        mid = df.index[n_bars // 2]
+        t0 = time.perf_counter()
+        sliced = feature_store.load_features(SYMBOL, "1h", name, columns=["rsi", "atr"], start=mid, root=tmp)
+        print(f"2 cols, 1/2 range: {time.perf_counter() - t0:8.3f}s  ({len(sliced):,} rows)")
+
+
+def bench_streaming(n_bars):
+    """زمان هر به‌روزرسانی اندیکاتورهای جریانی و محاسبه batch خط لوله ویژگی‌ها"""
+    print(f"\n=== Streaming indicators | {n_bars:,} bars ===")
+    df = make_synthetic_ohlcv(n_bars)
+
+    strategy_stream = streaming.StrategyStream(settings.STRATEGY_PARAMS)
+    feature_stream = AI_PIPELINE.stream()
+    columns = [df[c].to_numpy().tolist() for c in ("high", "low", "close", "volume")]
+    t0 = time.perf_counter()
+    for high, low, close, volume in zip(*columns):
+        strategy_stream.update(high, low, close)
+        feature_stream.update(high, low, close, volume)
+    elapsed = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    AI_PIPELINE.compute(df)
+    batch_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    AI_PIPELINE.compute_last(df)
+    last_time = time.perf_counter() - t0
+
+    print(f"per-bar update   : {elapsed / n_bars * 1e6:8.1f}us")
+    print(f"pipeline batch   : {batch_time:8.3f}s")
+    print(f"pipeline last    : {last_time:8.3f}s")
+
+
+def bench_live(n_symbols, concurrency=10, latency=0.05, cycles=3):
+    """تست بار اسکن پیپر تریدینگ روی صرافی محلی: ترتیبی (همزمانی 1) در برابر همزمان"""
+    import asyncio
+    from core.paper_account import PaperAccount
+    from utils.fake_exchange import FakeExchange
+    from scripts.run_paper_trading import PaperTrader
+
+    print(f"\n=== Live scan | {n_symbols} symbols | latency {latency * 1000:.0f}ms ===")
+    symbols = [f"SYN{i:04d}USDT" for i in range(n_symbols)]
+
+    async def timed_scans(limit, state_file):
+        exchange = FakeExchange(latency=latency, jitter=latency / 2)
+        account = PaperAccount(initial_capital=1000, state_file=state_file)
+        risk_manager = RiskManager(account.capital, risk_per_trade=0.01)
+        trader = PaperTrader(exchange, account, risk_manager, None, symbols, concurrency=limit)
+        timings = []
+        for _ in range(cycles):
+            t0 = time.perf_counter()
+            await trader.scan()
+            timings.append(time.perf_counter() - t0)
+        return timings, exchange.stats()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for limit in (1, concurrency):
+            state_file = os.path.join(tmp, f"wallet_{limit}.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings, stats = asyncio.run(timed_scans(limit, state_file))
+            print(f"concurrency {limit:<5}: warmup {timings[0]:7.2f}s  steady {np.mean(timings[1:]):7.2f}s"
+                  f"  (calls {stats['calls']}, max in flight {stats['max_in_flight']})")
+
+
+def bench_account(n_events):
+    """هزینه ذخیره وضعیت PaperAccount برای هر backend و زمان بارگذاری مجدد"""
+    import random
+    from core.paper_account import PaperAccount
+
+    print(f"\n=== Paper account state | {n_events:,} events ===")
+
+    def workload(account, rng):
+        for _ in range(n_events):
+            symbol = f"SYN{rng.randrange(20):02d}USDT"
+            if symbol in account.positions:
+                account.close_position(symbol, rng.uniform(90, 110), "TP")
+            else:
+                account.open_position(symbol, rng.uniform(90, 110), rng.uniform(0.01, 0.1), 80, 120)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ("json", "journal", "sqlite"):
+            state_file = os.path.join(tmp, f"wallet_{backend}.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                account = PaperAccount(1000, state_file, backend=backend)
+                t0 = time.perf_counter()
+                workload(account, random.Random(0))
+                elapsed = time.perf_counter() - t0
+                account.close()
+
+                t0 = time.perf_counter()
+                reloaded = PaperAccount(1000, state_file, backend=backend)
+                load_time = time.perf_counter() - t0
+                reloaded.close()
+            print(f"{backend:<17}: {elapsed / n_events * 1e6:8.1f}us/event  load {load_time:6.3f}s")
+
+
+def bench_metrics(n_points):
+    """شاخص‌های برداری در برابر حلقه پایتونی قدیمی و Accumulator آنلاین"""
+    from backtest import metrics
+
+    print(f"\n=== Metrics | {n_points:,} equity points ===")
+    rng = np.random.default_rng(0)
+    values = settings.INITIAL_CAPITAL * np.exp(np.cumsum(rng.normal(0.0, 0.001, n_points)))
+    times = np.arange(n_points).astype("datetime64[h]").astype("datetime64[ns]")
+    equity_list = values.tolist()
+
+    t0 = time.perf_counter()
+    peak, legacy_dd = equity_list[0], 0
+    for value in equity_list:
+        if value > peak:
+            peak = value
+        legacy_dd = max(legacy_dd, (peak - value) / peak)
+    legacy_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    metrics.max_drawdown(values)
+    metrics.longest_drawdown(values, times)
+    vector_time = time.perf_counter() - t0
+
+    accumulator = metrics.MetricsAccumulator()
+    chunk = 100_000
+    t0 = time.perf_counter()
+    for i in range(0, n_points, chunk):
+        accumulator.update_many(values[i:i + chunk], times[i:i + chunk])
+    stream_time = time.perf_counter() - t0
+
+    print(f"legacy dd loop   : {legacy_time:8.3f}s")
+    print(f"vectorized dd    : {vector_time:8.3f}s  (incl. longest drawdown)")
+    print(f"accumulator      : {stream_time:8.3f}s  (chunks of {chunk:,})")
+
+
+def bench_ledger(n_trades):
+    """دفتر معاملات ستونی در برابر لیست dict ها: زمان ثبت، حافظه و ساخت DataFrame"""
+    import tracemalloc
+    from core.ledger import TradeLedger, TRADE_FIELDS
+
+    print(f"\n=== Trade ledger | {n_trades:,} trades ===")
+    rng = np.random.default_rng(0)
+    symbols = [f"SYN{i:03d}USDT" for i in range(50)]
+    times = pd.date_range("2020-01-01", periods=n_trades + 1, freq="h")
+    rows = [
+        (symbols[i % 50], price, price * 1.01, size, pnl, pnl / 10, times[i], times[i + 1], "TP" if pnl > 0 else "SL")
+        for i, (price, size, pnl) in enumerate(zip(
+            rng.uniform(10, 1000, n_trades), rng.uniform(0.1, 2, n_trades), rng.normal(0, 10, n_trades)
+        ))
+    ]
+
+    def build(label):
+        if label == "dict list":
+            return [dict(zip(TRADE_FIELDS, row)) for row in rows]
+        trades = TradeLedger()
+        for row in rows:
+            trades.record(*row)
+        return trades
+
+    for label in ("dict list", "ledger"):
+        t0 = time.perf_counter()
+        trades = build(label)
+        elapsed = time.perf_counter() - t0
+
+        # حافظه در اجرای جداگانه (tracemalloc خودش کند است)
+        del trades
+        tracemalloc.start()
+        trades = build(label)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        t0 = time.perf_counter()
+        trades.to_frame() if label == "ledger" else pd.DataFrame(trades)
+        frame_time = time.perf_counter() - t0
+        print(f"{label:<17}: {elapsed:8.3f}s  ({peak / 1e6:7.1f} MB, {peak / n_trades:6.0f} B/trade, "
+              f"DataFrame {frame_time:.3f}s)")
+
+
+def bench_indicators(n_bars):
+    """هسته‌های NumPy/numba اندیکاتور در برابر نسخه pandas قبلی: زمان و اوج حافظه"""
+    import tracemalloc
+
+    print(f"\n=== Indicator kernels | {n_bars:,} bars ===")
+    df = make_synthetic_ohlcv(n_bars)
+    high, low, close = (df[c].to_numpy() for c in ("high", "low", "close"))
+    out = np.empty(n_bars)
+
+    cases = {
+        "atr": (lambda: indicators._atr_pandas(df, 14), lambda: indicators.atr_kernel(high, low, close, 14, out=out)),
+        "rsi": (lambda: indicators._rsi_pandas(df["close"], 14), lambda: indicators.rsi_kernel(close, 14, out=out)),
+        "adx": (lambda: indicators._adx_pandas(df, 14), lambda: indicators.adx_kernel(high, low, close, 14, out=out)),
+    }
+    # کامپایل numba خارج از زمان‌سنجی
+    for _, kernel in cases.values():
+        kernel()
+
+    for name, (legacy, kernel) in cases.items():
+        timings = {}
+        for label, func in (("pandas", legacy), ("kernel", kernel)):
+            t0 = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - t0
+
+            # اوج حافظه در اجرای جداگانه (tracemalloc خودش کند است)
+            del result
+            tracemalloc.start()
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            timings[label] = (elapsed, peak)
+
+        (legacy_time, legacy_peak), (kernel_time, kernel_peak) = timings.values()
+        print(f"{name:<17}: pandas {legacy_time:7.3f}s {legacy_peak / 1e6:8.1f} MB | "
+              f"kernel {kernel_time:7.3f}s {kernel_peak / 1e6:8.1f} MB | "
+              f"{legacy_time / max(kernel_time, 1e-9):5.1f}x")
+
+    print(f"output buffer    : {out.nbytes / 1e6:8.1f} MB (preallocated, reused)")
+
+
+# =========================================
+# Stage Benchmarks (JSON + Baseline Compare)
+# =========================================
+# زمان و اوج حافظه هر مرحله (اندیکاتورها، سیگنال‌ها، موتور) روی داده مصنوعی قطعی.
+#   python scripts/benchmark.py --suite stages --bars 10000 100000 1000000 10000000 \
+#       --symbols 5 50 500 --json outputs/benchmarks/current.json --baseline outputs/benchmarks/baseline.json
+#   python scripts/benchmark.py --compare baseline.json current.json
+
+STAGE_FREQ = "1min"  # 10M کندل یک ساعته از بازه Timestamp (سال 2262) بیرون می‌زند
+
+
+def measure(func, repeat=1):
+    """(نتیجه، کمترین زمان از repeat اجرا، اوج حافظه tracemalloc در اجرای جداگانه)"""
+    import tracemalloc
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+        del result
+
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def _stage_record(stage, n_symbols, n_bars, seconds, peak, **extra):
+    record = {
+        "stage": stage,
+        "symbols": n_symbols,
+        "bars": n_bars,
+        "seconds": round(seconds, 6),
+        "peak_mb": round(peak / 1e6, 3),
+        "ns_per_bar": round(seconds / max(n_symbols * n_bars, 1) * 1e9, 2),
+    }
+    record.update(extra)
+    print(f"{stage:<17}: {seconds:8.3f}s  {peak / 1e6:8.1f} MB  {record['ns_per_bar']:8.1f}ns/bar"
+          + "".join(f"  {key}={value}" for key, value in extra.items()))
+    return record
+
+
+def _compute_indicators(df, params):
+    """همه اندیکاتورهای استراتژی و فیلتر AI (بدون کش)"""
+    close = df["close"]
+    return [
+        indicators.ema(close, params["ema_period"]),
+        indicators.calculate_atr(df, params["atr_period"]),
+        indicators.calculate_rsi(close),
+        indicators.calculate_adx(df),
+        indicators.supertrend(df, params["st_period"], params["st_multiplier"]),
+        indicators.supertrend(df, params["st_fast_period"], params["st_fast_multiplier"]),
+    ]
+
+
+def bench_stages(n_symbols, n_bars, repeat=1):
+    """
+    سه مرحله مستقل روی n_symbols ارز با n_bars کندل: اندیکاتورها، generate_signals
+    و BacktestEngine.run_signals (روی سیگنال‌های آماده). کش اندیکاتورها خاموش است.
+    """
+    print(f"\n=== Stages | {n_symbols} symbols x {n_bars:,} bars ===")
+    cache = indicators._CACHE
+    state = cache.enabled, cache.disk_dir
+    cache.enabled, cache.disk_dir = False, None
+    try:
+        params = settings.STRATEGY_PARAMS
+        strategy = DualSupertrendStrategy(params)
+        frames = {
+            f"SYN{i:04d}USDT": make_synthetic_ohlcv(n_bars, seed=i, freq=STAGE_FREQ)
+            for i in range(n_symbols)
+        }
+        # کامپایل numba خارج از زمان‌سنجی
+        _compute_indicators(make_synthetic_ohlcv(1_000, freq=STAGE_FREQ), params)
+
+        records = []
+        _, seconds, peak = measure(
+            lambda: [_compute_indicators(df, params) for df in frames.values()], repeat
+        )
+        records.append(_stage_record("indicators", n_symbols, n_bars, seconds, peak))
+
+        signals, seconds, peak = measure(
+            lambda: {symbol: strategy.generate_signals(df) for symbol, df in frames.items()}, repeat
+        )
+        records.append(_stage_record("signals", n_symbols, n_bars, seconds, peak))
+        del frames
+
+        assets_config = [{"symbol": symbol, "weight": 1.0 / n_symbols} for symbol in signals]
+
+        def run_engine():
+            portfolio = MultiAssetPortfolio(settings.INITIAL_CAPITAL, assets_config)
+            risk_manager = RiskManager(settings.INITIAL_CAPITAL, settings.RISK_PER_TRADE)
+            engine = BacktestEngine(portfolio, strategy, risk_manager,
+                                    chronological=settings.BACKTEST_CHRONOLOGICAL)
+            engine.run_signals(signals)
+            return portfolio
+
+        portfolio, seconds, peak = measure(run_engine, repeat)
+        records.append(_stage_record("engine", n_symbols, n_bars, seconds, peak, trades=len(portfolio.trades)))
+        return records
+    finally:
+        cache.enabled, cache.disk_dir = state
+
+
+def _environment():
+    import platform
+    import subprocess
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "numba": indicators.NUMBA_AVAILABLE,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(path, records):
+    import json
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": _environment(), "results": records}, f, indent=2)
+    print(f"\n💾 Results saved to {path}")
+
+
+def load_results(path):
+    import json
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, time_tolerance=0.25, memory_tolerance=0.10,
+                    min_seconds=0.01, min_mb=1.0):
+    """
+    مقایسه هر (stage, symbols, bars) با خط مبنا. رگرسیون: افزایش نسبی بیش از tolerance
+    و هم‌زمان افزایش مطلق بیش از min_seconds / min_mb (برای نادیده گرفتن نویز اجراهای کوتاه).
+    خروجی: لیست رگرسیون‌ها.
+    """
+    def key(record):
+        return record["stage"], record["symbols"], record["bars"]
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'stage':<11}{'symbols':>8}{'bars':>12}{'time':>10}{'Δtime':>9}{'memory':>11}{'Δmem':>9}")
+    for record in current["results"]:
+        old = base.pop(key(record), None)
+        stage, n_symbols, n_bars = key(record)
+        label = f"{stage:<11}{n_symbols:>8}{n_bars:>12,}"
+        if old is None:
+            print(f"{label}{record['seconds']:>9.3f}s{'new':>9}{record['peak_mb']:>9.1f}MB")
+            continue
+
+        time_ratio = record["seconds"] / max(old["seconds"], 1e-9) - 1
+        mem_ratio = record["peak_mb"] / max(old["peak_mb"], 1e-9) - 1
+        flags = []
+        if time_ratio > time_tolerance and record["seconds"] - old["seconds"] > min_seconds:
+            flags.append("time")
+        if mem_ratio > memory_tolerance and record["peak_mb"] - old["peak_mb"] > min_mb:
+            flags.append("memory")
+        if flags:
+            regressions.append({"key": key(record), "flags": flags, "baseline": old, "current": record})
+        print(f"{label}{record['seconds']:>9.3f}s{time_ratio:>+9.0%}{record['peak_mb']:>9.1f}MB"
+              f"{mem_ratio:>+9.0%}  {'⚠️ ' + '/'.join(flags) if flags else ''}")
+
+    for stage, n_symbols, n_bars in base:
+        print(f"{stage:<11}{n_symbols:>8}{n_bars:>12,}  missing from current run")
+
+    print(f"\n{'❌' if regressions else '✅'} {len(regressions)} regression(s) "
+          f"(tolerance: time {time_tolerance:.0%}, memory {memory_tolerance:.0%})")
+    return regressions
+
+
+def bench_robustness(n_paths, n_trades=1_000, n_bars=20_000, max_mb=32):
+    """Monte Carlo برداری تکه‌ای در برابر حلقه پایتونی مسیر به مسیر: زمان و اوج حافظه"""
+    import tracemalloc
+    from backtest import robustness
+    from backtest.metrics import max_drawdown, sharpe_ratio
+
+    print(f"\n=== Robustness | {n_paths:,} paths | {n_trades:,} trades / {n_bars:,} bars ===")
+    rng = np.random.default_rng(0)
+    pnl = rng.normal(2.0, 20.0, n_trades)
+    returns = rng.normal(2e-5, 2e-3, n_bars)
+    capital = settings.INITIAL_CAPITAL
+    max_bytes = max_mb * 1024 ** 2
+    periods = 24 * 365
+
+    # مرجع: حلقه پایتونی روی تعداد کمتری مسیر و برون‌یابی
+    loop_paths = min(n_paths, 2_000)
+    loop_rng = np.random.default_rng(2)
+    t0 = time.perf_counter()
+    for _ in range(loop_paths):
+        row = np.concatenate(([capital], capital + np.cumsum(loop_rng.permutation(pnl))))
+        max_drawdown(row)
+        sharpe_ratio(np.diff(row) / row[:-1], periods)
+    loop_time = (time.perf_counter() - t0) * n_paths / loop_paths
+    print(f"python loop      : {loop_time:8.3f}s (extrapolated from {loop_paths:,} paths)")
+
+    for method, make in (
+        ("shuffle", lambda r: robustness.trade_shuffle_paths(pnl, capital, n_paths, r, max_bytes)),
+        ("skip", lambda r: robustness.entry_skip_paths(pnl, capital, n_paths, r, max_bytes)),
+        ("bootstrap", lambda r: robustness.block_bootstrap_paths(returns, capital, n_paths, r, max_bytes)),
+    ):
+        t0 = time.perf_counter()
+        robustness.simulate(make(np.random.default_rng(3)), periods)
+        elapsed = time.perf_counter() - t0
+
+        # اوج حافظه در اجرای جداگانه (tracemalloc خودش کند است)
+        tracemalloc.start()
+        robustness.simulate(make(np.random.default_rng(3)), periods)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{method:<17}: {elapsed:8.3f}s  {peak / 1e6:7.1f} MB peak  ({n_paths / elapsed:,.0f} paths/s)")
+
+
+def _resample_ohlcv(df, rule):
+    """تجمیع کندل‌های ریز به تایم فریم بالاتر (برای ساخت داده هم‌خوان بنچمارک intrabar)"""
+    agg = df.resample(rule, label="left", closed="left").agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    )
+    return agg.dropna()
+
+
+def bench_intrabar(n_fine, rule="4h", fine_tf="1m", n_checks=2_000):
+    """
+    حل ابهام SL/TP با داده 1m: زمان resolver روی کندل‌های مبهم تصادفی، و بک‌تست کامل
+    با/بدون resolver (تعداد کندل‌های مبهم و هزینه اضافه).
+    """
+    from backtest.intrabar import IntrabarResolver
+
+    print(f"\n=== Intrabar SL/TP | {n_fine:,} {fine_tf} bars -> {rule} ===")
+    fine = make_synthetic_ohlcv(n_fine, freq=STAGE_FREQ)
+    # نوسان 1% در دقیقه برای 1m زیاد است: تبدیل توانی یکنوا (ترتیب OHLC حفظ می‌شود) به ~0.1%
+    prices = ["open", "high", "low", "close"]
+    fine[prices] = 100.0 * (fine[prices] / 100.0) ** 0.1
+    # شوک‌های تصادفی (یک دم 10% پایین و یک دم 10% بالا در ~5% کندل‌های اصلی) تا کندل‌های مبهم ساخته شوند
+    rng = np.random.default_rng(0)
+    per_bar = int(pd.Timedelta(rule) / pd.Timedelta(STAGE_FREQ))
+    shocked = rng.choice(n_fine // per_bar, size=n_fine // per_bar // 20, replace=False) * per_bar
+    fine.iloc[shocked + rng.integers(0, per_bar, len(shocked)), 2] *= 0.9
+    fine.iloc[shocked + rng.integers(0, per_bar, len(shocked)), 1] *= 1.1
+    coarse = _resample_ohlcv(fine, rule)
+
+    with tempfile.TemporaryDirectory() as root:
+        store.write_ohlcv(SYMBOL, fine_tf, fine, root)
+        resolver = IntrabarResolver([fine_tf], root=root)
+        t0 = time.perf_counter()
+        resolver.attach(SYMBOL, coarse.index)
+        print(f"attach (index)   : {(time.perf_counter() - t0) * 1e3:8.3f}ms  ({len(coarse):,} bars)")
+
+        bars = rng.integers(0, len(coarse), n_checks)
+        levels = np.sort(rng.uniform(coarse["low"].to_numpy()[bars, None], coarse["high"].to_numpy()[bars, None],
+                                     (n_checks, 2)), axis=1)
+        t0 = time.perf_counter()
+        for bar, (stop_loss, take_profit) in zip(bars.tolist(), levels.tolist()):
+            resolver.resolve(SYMBOL, bar, stop_loss, take_profit)
+        elapsed = time.perf_counter() - t0
+        print(f"resolve          : {elapsed / n_checks * 1e6:8.1f}us/bar  ({resolver.stats['tp_first']} TP first, "
+              f"{resolver.stats['sl_first']} SL first, {resolver.stats['same_bar']} same {fine_tf} bar)")
+
+
+        # بک‌تست کامل: فقط کندل‌های مبهم داده ریز را لمس می‌کنند
+        signals = build_engine().strategy.generate_signals(coarse)
+        runs = {}
+        for label, intrabar in (("SL first", None), ("intrabar", IntrabarResolver([fine_tf], root=root))):
+            engine = build_engine()
+            engine.intrabar = intrabar
+            t0 = time.perf_counter()
+            engine._simulate(SYMBOL, signals)
+            runs[label] = (engine, time.perf_counter() - t0)
+            print(f"{label:<17}: {runs[label][1]:8.3f}s  ({len(engine.portfolio.trades)} trades)")
+
+        engine = runs["intrabar"][0]
+        stats = engine.intrabar.stats
+        touched = engine.intrabar.resolved * (len(fine) / len(coarse)) * 16
+        print(f"ambiguous bars   : {stats['ambiguous']} ({engine.intrabar.resolved} resolved, "
+              f"{stats['tp_first']} flipped to TP) | fine data read ~{touched / 1e3:.1f} KB "
+              f"of {len(fine) * 16 / 1e6:.1f} MB high/low")
+
+
+def bench_resample(n_bars, timeframes=("15m", "1h", "4h", "1d"), new_bars=1_440):
+    """
+    تجمیع برداری (reduceat) در برابر resample پانداس از داده 1m، کش data/derived:
+    ساخت کامل، به‌روزرسانی افزایشی بعد از new_bars کندل جدید پایه، و بدون تغییر.
+    """
+    from data import resample
+
+    print(f"\n=== Resample | {n_bars:,} 1m bars ===")
+    base = make_synthetic_ohlcv(n_bars + new_bars, freq=STAGE_FREQ)
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    for timeframe in timeframes:
+        t0 = time.perf_counter()
+        base.resample(pd.Timedelta(resample.timeframe_ns(timeframe), "ns")).agg(agg).dropna()
+        pandas_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = resample.resample_ohlcv(base, timeframe)
+        vector_time = time.perf_counter() - t0
+        print(f"{timeframe:<4} pandas {pandas_time:8.3f}s | reduceat {vector_time:8.3f}s "
+              f"({pandas_time / max(vector_time, 1e-9):5.1f}x, {len(got):,} bars)")
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as derived:
+        store.write_ohlcv(SYMBOL, "1m", base.iloc[:n_bars], root)
+        for label, rows in (("full build", None), ("no change", None), ("incremental", new_bars)):
+            if rows:
+                store.append_ohlcv(SYMBOL, "1m", base.iloc[n_bars:], root)
+            t0 = time.perf_counter()
+            written = sum(resample.update_resampled(SYMBOL, tf, "1m", root, derived) for tf in timeframes)
+            print(f"cache {label:<11}: {time.perf_counter() - t0:8.3f}s  ({written:,} bars written)")
+
+        t0 = time.perf_counter()
+        for tf in timeframes:
+            resample.load_timeframe(SYMBOL, tf, root=root, derived_root=derived)
+        print(f"cache load       : {(time.perf_counter() - t0) * 1e3:8.3f}ms (memory-map)")
+
+
+def _cold_load_seconds(model_path, prefer_trees, runs=3):
+    """زمان import + لود مدل در یک پروسه تازه (شروع به کار پیپر تریدینگ)"""
+    import subprocess
+
+    code = (
+        "import sys, time; t0 = time.perf_counter(); sys.path.append(sys.argv[1]); "
+        "from core.features import load_model; "
+        f"model = load_model(sys.argv[2], prefer_trees={prefer_trees}); "
+        "print(type(model).__name__, time.perf_counter() - t0)"
+    )
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", code, ROOT_DIR, model_path],
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[-1]))
+    return out[0], min(times)
+
+
+def bench_inference(n_rows=100_000, batches=(1, 16, 256)):
+    """
+    ارزیاب NumPy درخت‌های صادر شده در برابر XGBClassifier.predict_proba: تأخیر تک ردیفی و
+    دسته‌های کوچک، و زمان لود در پروسه تازه.
+    """
+    from xgboost import XGBClassifier
+    from core.features import save_model, AI_FEATURE_COLS
+    from core.tree_model import export_trees, load_trees, trees_path
+
+    print(f"\n=== AI inference | {settings.AI_MODEL_PARAMS['n_estimators']} trees ===")
+    df = make_synthetic_ohlcv(50_000)
+    features = AI_PIPELINE.compute(df)
+    target = (df["close"].shift(-8) / df["close"] - 1 > 0.01).astype(int)
+    data = features.assign(target=target).dropna()
+    model = XGBClassifier(**settings.AI_MODEL_PARAMS).fit(data[AI_FEATURE_COLS], data["target"])
+
+    rng = np.random.default_rng(0)
+    rows = data[AI_FEATURE_COLS].to_numpy()[rng.integers(0, len(data), n_rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.pkl")
+        save_model(model, model_path)
+        t0 = time.perf_counter()
+        _, max_diff = export_trees(model, model_path, rows)
+        print(f"export           : {time.perf_counter() - t0:8.3f}s  (max |Δp| {max_diff:.2e} on {n_rows:,} rows)")
+        trees = load_trees(model_path)
+
+        for n in batches:
+            batch = rows[:n]
+            timings = {}
+            for label, predict in (("xgboost", model.predict_proba), ("numpy", trees.predict_proba)):
+                loops = max(20, 2_000 // n)
+                predict(batch)
+                t0 = time.perf_counter()
+                for _ in range(loops):
+                    predict(batch)
+                timings[label] = (time.perf_counter() - t0) / loops
+            print(f"batch {n:<5}      : xgboost {timings['xgboost'] * 1e6:9.1f}us | numpy {timings['numpy'] * 1e6:9.1f}us "
+                  f"({timings['xgboost'] / timings['numpy']:5.1f}x)")
+
+        for prefer_trees in (False, True):
+            kind, seconds = _cold_load_seconds(model_path, prefer_trees)
+            print(f"cold load        : {seconds:8.3f}s  ({kind}, {os.path.getsize(trees_path(model_path) if prefer_trees else model_path) / 1e3:.0f} KB)")
+
+
+# کتابخانه‌هایی که هر دستور فقط در صورت نیاز باید import کند
+HEAVY_MODULES = ("pandas", "numpy", "numba", "xgboost", "sklearn", "ccxt", "yaml")
+
+
+def _import_times(argv, runs=3):
+    """
+    python -X importtime -m trader <argv> در پروسه تازه. خروجی بهترین اجرا:
+    (زمان کل اجرا، جمع cumulative ماژول‌های سطح بالا، {ماژول سطح بالا: ثانیه}، پکیج‌های لود شده)
+    """
+    import subprocess
+
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-m", "trader", *argv],
+                                cwd=ROOT_DIR, capture_output=True, text=True).stderr
+        wall = time.perf_counter() - t0
+        top, packages = {}, set()
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            packages.add(name.strip().split(".")[0])
+            # ماژول‌های تو در تو با فاصله بیشتر تورفتگی دارند
+            if name.startswith("  "):
+                continue
+            top[name.strip()] = top.get(name.strip(), 0.0) + int(cumulative) / 1e6
+        if best is None or wall < best[0]:
+            best = (wall, sum(top.values()), top, packages)
+    return best
+
+
+def bench_startup(commands=("download", "build-features", "train", "backtest", "paper")):
+    """
+    هزینه شروع هر دستور CLI (python -m trader <command> --help): زمان کل، زمان import و
+    کتابخانه‌های سنگین لود شده.
+    """
+    print("\n=== CLI startup | python -X importtime -m trader <command> --help ===")
+    for command in (None, *commands):
+        argv = [command, "--help"] if command else ["--help"]
+        wall, imports, top, packages = _import_times(argv)
+        heavy = [name for name in HEAVY_MODULES if name in packages]
+        slowest = ", ".join(f"{name} {seconds * 1e3:.0f}ms" for name, seconds in
+                            sorted(top.items(), key=lambda item: -item[1])[:3])
+        print(f"{command or '(none)':<16}: {wall * 1e3:7.0f}ms wall | imports {imports * 1e3:6.0f}ms | "
+              f"heavy: {', '.join(heavy) or '-'} | top: {slowest}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trader performance benchmarks")
+    parser.add_argument("--suite", nargs="+", default=["engine", "supertrend"],
+                        choices=["engine", "supertrend", "store", "streaming", "live", "merged", "account", "metrics", "ledger", "features",
+                                 "indicators", "stages", "robustness", "intrabar",
+                                 "resample", "inference", "startup"])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[5, 50, 500],
+                        help="universe sizes for the live and merged suites")
+    parser.add_argument("--symbol-bars", type=int, default=20_000, help="bars per symbol for the merged suite")
+    parser.add_argument("--concurrency", type=int, default=10, help="request limit for the live suite")
+    parser.add_argument("--no-legacy", action="store_true", help="skip the slow df.iloc reference loop")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage (best is kept)")
+    parser.add_argument("--json", help="save stage results to this JSON file")
+    parser.add_argument("--baseline", help="compare stage results against this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two saved result files without running anything")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    tolerances = {"time_tolerance": args.time_tolerance, "memory_tolerance": args.memory_tolerance}
+    if args.compare:
+        baseline, current = (load_results(path) for path in args.compare)
+        sys.exit(1 if compare_results(baseline, current, **tolerances) else 0)
+
+    records = []
+
+    for n_bars in args.bars:
+        if "engine" in args.suite:
+            bench_engine(n_bars, legacy=not args.no_legacy)
+        if "supertrend" in args.suite:
+            bench_supertrend(n_bars)
+        if "store" in args.suite:
+            bench_store(n_bars)
+        if "streaming" in args.suite:
+            bench_streaming(n_bars)
+        if "metrics" in args.suite:
+            bench_metrics(n_bars)
+        if "features" in args.suite:
+            bench_features(n_bars)
+        if "indicators" in args.suite:
+            bench_indicators(n_bars)
+        if "intrabar" in args.suite:
+            bench_intrabar(n_bars)
+        if "resample" in args.suite:
+            bench_resample(n_bars)
+
+    if "merged" in args.suite:
+        for n_symbols in args.symbols:
+            bench_merged(n_symbols, args.symbol_bars)
+
+    if "account" in args.suite:
+        bench_account(2_000)
+
+    if "ledger" in args.suite:
+        bench_ledger(200_000)
+
+    if "inference" in args.suite:
+        bench_inference()
+
+    if "startup" in args.suite:
+        bench_startup()
+
+    if "robustness" in args.suite:
+        for n_paths in (10_000, 50_000):
+            bench_robustness(n_paths)
+
+    if "live" in args.suite:
+        for n_symbols in args.symbols:
+            bench_live(n_symbols, concurrency=args.concurrency)
+
+    if "stages" in args.suite:
+        # یک ارز در هر اندازه --bars و سپس هر اندازه --symbols با --symbol-bars کندل
+        for n_bars in args.bars:
+            records += bench_stages(1, n_bars, args.repeat)
+        for n_symbols in args.symbols:
+            records += bench_stages(n_symbols, args.symbol_bars, args.repeat)
+
+        if args.json:
+            save_results(args.json, records)
+        if args.baseline:
+            current = {"environment": _environment(), "results": records}
+            if compare_results(load_results(args.baseline), current, **tolerances):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
 import os
 import glob
+import sys
+import time
+import argparse
 import pandas as pd
 import numpy as np
 
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from data.store import load_ohlcv, list_datasets
+from data.feature_store import FeatureSet, ewm_warmup, update_features, load_features
 
 # ساخت مسیرهای دقیق
 RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
 FEATURE_DIR = os.path.join(PROJECT_ROOT, "data", "features")
 FUTURE_BARS = 5      # حدود 20 ساعت روی 4H
 ATR_PERIOD = 14
+FEATURE_COLUMNS = ["ema_50", "ema_200", "rsi", "atr", "trend_strength", "label"]
 
 
 def calculate_atr(df, period=14):
@@ -56,30 +64,61 @@ def build_label(df):
     return df
 
 
-def main():
-    os.makedirs(FEATURE_DIR, exist_ok=True)
-    all_assets = []
+def compute_features(df):
+    return build_label(build_features(df))[FEATURE_COLUMNS]
+
 
+# انبار پارتیشن‌بندی شده data/features/market/<SYMBOL>_<TF>/<YEAR>/
+MARKET_FEATURES = FeatureSet(
+    "market", FEATURE_COLUMNS, compute_features,
+    # EMA-200 طولانی‌ترین حافظه را دارد؛ پنجره‌های غلتان 14 کندل
+    warmup=ewm_warmup(span=200) + max(ATR_PERIOD, 14),
+    horizon=FUTURE_BARS,
+)
+
+
+def list_all_datasets():
+    """دیتاست‌های انبار ستونی و CSV هایی که هنوز تبدیل نشده‌اند"""
+    datasets = set(list_datasets())
     for path in glob.glob(os.path.join(RAW_DIR, "*.csv")):
-        asset = os.path.basename(path).split("_")[0]
-        print(f"Processing {asset}")
+        symbol, _, timeframe = os.path.splitext(os.path.basename(path))[0].partition("_")
+        datasets.add((symbol, timeframe))
+    return sorted(datasets)
 
-        df = pd.read_csv(path, index_col=0, parse_dates=True)
-        df = build_features(df)
-        df = build_label(df)
 
+def export_csv(datasets):
+    """خروجی تک فایلی قبلی (ai_dataset.csv) از روی انبار ویژگی‌ها"""
+    all_assets = []
+    for asset, timeframe in datasets:
+        df = load_ohlcv(asset, timeframe).join(load_features(asset, timeframe, MARKET_FEATURES.name))
         df["asset"] = asset
         df.dropna(inplace=True)
-
         all_assets.append(df)
 
     final_df = pd.concat(all_assets)
     final_path = os.path.join(FEATURE_DIR, "ai_dataset.csv")
     final_df.to_csv(final_path)
-
     print(f"\n✅ Feature dataset saved: {final_path}")
     print(f"Rows: {len(final_df)}")
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally update the partitioned feature store")
+    parser.add_argument("--full", action="store_true", help="rebuild every asset from scratch")
+    parser.add_argument("--export-csv", action="store_true", help="also write the single ai_dataset.csv file")
+    args = parser.parse_args(argv)
+
+    os.makedirs(FEATURE_DIR, exist_ok=True)
+    datasets = list_all_datasets()
+
+    for asset, timeframe in datasets:
+        t0 = time.perf_counter()
+        written = update_features(asset, timeframe, MARKET_FEATURES, full=args.full)
+        print(f"{asset} {timeframe}: {written} rows updated ({time.perf_counter() - t0:.2f}s)")
+
+    if args.export_csv:
+        export_csv(datasets)
+
+
 if __name__ == "__main__":
     main()
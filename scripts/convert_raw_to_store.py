@@ -0,0 +1,29 @@
+# scripts/convert_raw_to_store.py
+
+import os
+import sys
+import argparse
+
+# اضافه کردن ریشه پروژه به path
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from data.store import convert_csv_dir, STORE_DIR
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert data/raw CSV files into the columnar store")
+    parser.parse_args(argv)
+
+    print(f"Converting data/raw CSV files -> {STORE_DIR}")
+    converted = convert_csv_dir()
+
+    for symbol, timeframe, rows in converted:
+        print(f"   ✅ {symbol} | {timeframe}: {rows} rows")
+
+    if not converted:
+        print("No CSV files found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,16 @@
 import os
 import sys
 import yaml
-import pandas as pd
-from datetime import datetime
-from binance.client import Client
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # اضافه کردن ریشه پروژه به path
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(ROOT_DIR)
 
 from config import settings
+from data.klines import BinanceKlineSource, LocalKlineSource, sync_klines
+from data.resample import update_resampled
 
 
 DATA_DIR = os.path.join(ROOT_DIR, "data", "raw")
@@ -25,63 +26,70 @@ def load_assets():
     return config["assets"]
 
 
-def get_binance_client():
-    # برای داده تاریخی API Key لازم نیست
-    return Client()
+def get_kline_source(name, rate):
+    # یک منبع (و یک Client) مشترک بین همه دانلودها
+    if name == "local":
+        return LocalKlineSource()
+    return BinanceKlineSource(rate=rate)
 
 
-def download_klines(symbol, interval, start_date):
-    client = get_binance_client()
-
-    klines = client.get_historical_klines(
-        symbol=symbol,
-        interval=interval,
-        start_str=start_date
+def download_asset(source, asset, full=False, root=None, raw_dir=None, timeframe=None):
+    symbol = asset["symbol"]
+    timeframe = timeframe or asset["timeframe"]
+    added = sync_klines(
+        source, symbol, timeframe.lower(), asset["start_date"],
+        root=root, raw_dir=raw_dir, full=full
     )
+    return symbol, timeframe, added
 
-    df = pd.DataFrame(klines, columns=[
-        "open_time", "open", "high", "low", "close", "volume",
-        "close_time", "quote_asset_volume",
-        "number_of_trades", "taker_buy_base_volume",
-        "taker_buy_quote_volume", "ignore"
-    ])
-
-    df = df[[
-        "open_time", "open", "high", "low", "close", "volume"
-    ]]
-
-    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-    df.set_index("open_time", inplace=True)
-
-    df = df.astype(float)
-    df.columns = ["open", "high", "low", "close", "volume"]
-
-    return df
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental kline download into data/raw and data/store")
+    parser.add_argument("--full", action="store_true", help="re-download the full history from start_date")
+    parser.add_argument("--workers", type=int, default=4, help="parallel symbol/timeframe downloads")
+    parser.add_argument("--rate", type=float, default=10.0, help="max requests per second (shared)")
+    parser.add_argument("--source", choices=["binance", "local"], default="binance")
+    parser.add_argument("--timeframes", nargs="+", default=[],
+                        help="extra timeframes per asset (e.g. 1m for intrabar SL/TP resolution)")
+    parser.add_argument("--base-timeframe",
+                        help="download only this timeframe (e.g. 1m) and derive each asset's timeframe from it")
+    args = parser.parse_args(argv)
 
-def main():
     os.makedirs(DATA_DIR, exist_ok=True)
 
     assets = load_assets()
-
-    for asset in assets:
-        symbol = asset["symbol"]
-        timeframe = asset["timeframe"]
-        start_date = asset["start_date"]
-
-        print(f"Downloading {symbol} | {timeframe} | from {start_date}")
-
-        df = download_klines(
-            symbol=symbol,
-            interval=timeframe.lower(),
-            start_date=start_date
-        )
-
-        filename = f"{symbol}_{timeframe}.csv"
-        filepath = os.path.join(DATA_DIR, filename)
-
-        df.to_csv(filepath)
-        print(f"Saved: {filepath} ({len(df)} rows)\n")
+    source = get_kline_source(args.source, args.rate)
+
+    mode = "full" if args.full else "incremental"
+    # تایم فریم اصلی هر ارز به همراه تایم فریم‌های اضافه (مثلاً داده ریز برای backtest/intrabar)
+    own = [args.base_timeframe] if args.base_timeframe else [None]
+    jobs = [(asset, timeframe) for asset in assets for timeframe in dict.fromkeys([*own, *args.timeframes])]
+    print(f"Downloading {len(jobs)} datasets ({mode}, {args.workers} workers)")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(download_asset, source, asset, args.full, None, DATA_DIR, timeframe): (asset, timeframe)
+            for asset, timeframe in jobs
+        }
+        for future in as_completed(futures):
+            asset, timeframe = futures[future]
+            try:
+                symbol, timeframe, added = future.result()
+                print(f"Saved: {symbol} | {timeframe} | +{added} rows")
+            except Exception as e:
+                # بقیه دانلودها ادامه پیدا می‌کنند؛ اجرای بعدی از آخرین ردیف ذخیره شده ادامه می‌دهد
+                print(f"❌ Failed: {asset['symbol']} | {timeframe or asset['timeframe']}: {e!r}")
+
+    # کندل‌های تایم فریم هر ارز از داده پایه (کش data/derived، فقط کندل‌های جدید ساخته می‌شوند)
+    if args.base_timeframe:
+        for asset in assets:
+            if asset["timeframe"].lower() == args.base_timeframe:
+                continue
+            try:
+                added = update_resampled(asset["symbol"], asset["timeframe"].lower(), args.base_timeframe, full=args.full)
+                print(f"Derived: {asset['symbol']} | {asset['timeframe']} from {args.base_timeframe} | +{added} rows")
+            except Exception as e:
+                print(f"❌ Failed: {asset['symbol']} | {asset['timeframe']} from {args.base_timeframe}: {e!r}")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,8 @@
 ### scripts/run_backtest.py ###
 import sys
 import os
+import argparse
 from pathlib import Path
-import pandas as pd
-import joblib
 
 # اضافه کردن مسیر پروژه به sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,49 +10,69 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
 from config.assets import load_assets
 from core.strategy import DualSupertrendStrategy
+from core.indicators import configure_cache, cache_stats
 from core.risk_manager import RiskManager
 from core.portfolio import MultiAssetPortfolio
+from core.features import load_model
+from core import instrumentation
 from backtest.engine import BacktestEngine
-from backtest.metrics import calculate_metrics
+from backtest.intrabar import IntrabarResolver
+from backtest.metrics import calculate_metrics, symbol_breakdown
 from backtest.reporter import generate_report
+from data.resample import load_timeframe
 
 
-def main():
-    print("🚀 Starting Professional Backtest...\n")
-
-    # 1. Load Data
-    print("📥 Loading Data...")
-    assets_config = load_assets()
+def load_backtest_data(assets_config):
+    """لود داده‌های خام همه ارزها؛ خروجی: (data_dict, start_date, end_date)"""
     data_dict = {}
     all_dates = []
 
     for asset in assets_config:
         symbol = asset['symbol']
         timeframe = asset['timeframe']
-        file_path = Path(settings.DATA_DIR) / "raw" / f"{symbol}_{timeframe}.csv"
-
-        if file_path.exists():
-            df = pd.read_csv(file_path)
-            if 'open_time' in df.columns:
-                df['open_time'] = pd.to_datetime(df['open_time'])
-                df.set_index('open_time', inplace=True)
-
-                data_dict[symbol] = df
-                all_dates.extend(df.index.tolist())
-                print(f"   ✅ {symbol}: {len(df)} candles loaded.")
-            else:
-                print(f"   ⚠️ Date column missing in {symbol}")
-        else:
-            print(f"   ❌ File not found: {file_path}")
 
-    if not data_dict:
-        print("⛔ No data loaded. Exiting.")
-        return
+        # انبار ستونی (memory-map)، CSV خام، یا مشتق از تایم فریم پایه ریزتر (data/resample)
+        df = load_timeframe(symbol, timeframe)
+
+        if df is not None:
+            data_dict[symbol] = df
+            if len(df):
+                all_dates.extend([df.index[0], df.index[-1]])
+            print(f"   ✅ {symbol}: {len(df)} candles loaded.")
+        else:
+            print(f"   ❌ Data not found: {symbol} | {timeframe}")
 
     # محاسبه بازه زمانی
     start_date = min(all_dates) if all_dates else None
     end_date = max(all_dates) if all_dates else None
 
+    return data_dict, start_date, end_date
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest every asset in config/assets.yaml (options in config/settings.py)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time pipeline stages and save BACKTEST_PROFILE_FILE (default: INSTRUMENTATION_ENABLED)")
+    args = parser.parse_args(argv)
+
+    print("🚀 Starting Professional Backtest...\n")
+
+    configure_cache(
+        max_bytes=settings.INDICATOR_CACHE_MB * 1024 ** 2,
+        disk_dir=settings.INDICATOR_CACHE_DIR
+    )
+    instrumentation.configure_instrumentation(settings.INSTRUMENTATION_ENABLED or args.profile, reset=True)
+
+    # 1. Load Data
+    print("📥 Loading Data...")
+    assets_config = load_assets()
+    with instrumentation.timer("backtest.load_data"):
+        data_dict, start_date, end_date = load_backtest_data(assets_config)
+
+    if not data_dict:
+        print("⛔ No data loaded. Exiting.")
+        return
+
     # 2. Setup Components
     print("\n⚙️ Setting up Strategy & Risk Manager...")
 
@@ -62,7 +81,7 @@ def main():
     model_path = Path(settings.MODEL_DIR) / "market_condition_xgb.pkl"
     if model_path.exists():
         try:
-            ai_model = joblib.load(model_path)
+            ai_model = load_model(model_path)
             print(f"   🧠 AI Model loaded successfully.")
         except Exception as e:
             print(f"   ⚠️ AI Model load failed: {e}")
@@ -80,35 +99,85 @@ def main():
         assets_config=assets_config
     )
 
+    # حل ابهام SL/TP با داده تایم فریم پایین‌تر (در صورت فعال بودن)
+    intrabar = IntrabarResolver(settings.INTRABAR_TIMEFRAMES) if settings.INTRABAR_RESOLUTION else None
+
     # 3. Run Backtest
     print("\n▶️ Running Backtest Engine...")
-    engine = BacktestEngine(portfolio, strategy, risk_manager, ai_model=ai_model)
-    engine.run(data_dict)
+    engine = BacktestEngine(
+        portfolio, strategy, risk_manager, ai_model=ai_model,
+        chronological=settings.BACKTEST_CHRONOLOGICAL, intrabar=intrabar
+    )
+    with instrumentation.timer("backtest.engine"):
+        engine.run(data_dict)
 
     # 4. Calculate Metrics & Report
     print("\n📊 Calculating Performance Metrics...")
 
-    metrics = calculate_metrics(
-        portfolio.trades,
-        portfolio.equity_curve,
-        settings.INITIAL_CAPITAL,
-        start_date=start_date,
-        end_date=end_date
-    )
+    # شاخص‌ها از منحنی سرمایه کندلی (نقد + پوزیشن‌های باز با قیمت روز)
+    with instrumentation.timer("backtest.metrics"):
+        metrics = calculate_metrics(
+            portfolio.trades,
+            portfolio.equity,
+            settings.INITIAL_CAPITAL,
+            start_date=start_date,
+            end_date=end_date
+        )
 
     # نمایش در کنسول
     print(f"\n======== RESULTS ========")
     print(f"💰 Final Capital: ${metrics['Final Capital ($)']}")
     print(f"📈 Total Return:  {metrics['Total Return (%)']}%")
-    print(f"📉 Max Drawdown:  {metrics['Max Drawdown (%)']}%")
+    print(f"📉 Max Drawdown:  {metrics['Max Drawdown (%)']}% (longest: {metrics['Max Drawdown Duration']})")
     print(f"✅ Win Rate:      {metrics['Win Rate (%)']}%")
     print(f"🔢 Total Trades:  {metrics['Total Trades']}")
     print(f"=========================")
 
+    print(f"📐 Sharpe: {metrics['Sharpe Ratio']} | "
+          f"Sortino: {metrics['Sortino Ratio']} | Calmar: {metrics['Calmar Ratio']}")
+    print(f"💵 Profit Factor: {metrics['Profit Factor']} | Expectancy: ${metrics['Expectancy ($)']}")
+
+    print("\n📋 Per-symbol breakdown:")
+    print(symbol_breakdown(portfolio.trades).to_string())
+
+    stats = cache_stats()
+    print(f"🗄️ Indicator cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses")
+
+    if intrabar is not None:
+        print_intrabar(intrabar, data_dict)
+
     # ذخیره گزارش
     output_file = Path(settings.OUTPUT_DIR) / "backtest_report.txt"
     generate_report(metrics, portfolio.trades, output_path=str(output_file))
 
+    # خلاصه زمان‌بندی مراحل
+    if instrumentation.enabled():
+        print_profile(instrumentation.summary())
+        instrumentation.registry().write_json(
+            settings.BACKTEST_PROFILE_FILE, indicator_cache=stats, trades=len(portfolio.trades),
+            intrabar=intrabar.stats if intrabar is not None else None
+        )
+        print(f"⏱️ Stage profile saved to {settings.BACKTEST_PROFILE_FILE}")
+
+
+def print_intrabar(intrabar, data_dict):
+    s = intrabar.stats
+    sources = ", ".join(f"{symbol}: {intrabar.timeframe(symbol) or '-'}" for symbol in data_dict)
+    print(f"🔍 Intrabar SL/TP: {s['ambiguous']} ambiguous bars, {intrabar.resolved} resolved "
+          f"({s['tp_first']} TP first, {s['sl_first']} SL first), "
+          f"{s['same_bar'] + s['no_data']} kept as SL ({s['no_data']} without data) | {sources}")
+
+
+def print_profile(summary):
+    print("\n⏱️ Stage timings:")
+    for name, timer in summary["timers"].items():
+        if timer["count"]:
+            print(f"   {name:<22} {timer['total']:8.3f}s  x{timer['count']:<7} "
+                  f"p50 {timer['p50'] * 1e3:8.3f}ms  p99 {timer['p99'] * 1e3:8.3f}ms")
+    for name, value in summary["counters"].items():
+        print(f"   {name:<22} {value}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+### scripts/run_optimizer.py ###
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+
+# اضافه کردن مسیر پروژه به sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from config.assets import load_assets
+from core.indicators import configure_cache
+from backtest.optimizer import grid_search_space, random_search_space, run_optimization
+from scripts.run_backtest import load_backtest_data
+
+
+# نوع مقادیر --param برای هر پارامتر (نوع مقدار پیش‌فرض برای trend_timeframe=None کار نمی‌کند)
+PARAM_TYPES = {
+    "ema_period": int,
+    "st_period": int,
+    "st_multiplier": float,
+    "st_fast_period": int,
+    "st_fast_multiplier": float,
+    "atr_period": int,
+    "trend_timeframe": str,
+}
+# پارامترهایی که مقدار none (یعنی None) می‌پذیرند
+OPTIONAL_PARAMS = {"trend_timeframe"}
+
+
+def parse_param_overrides(items):
+    """
+    تبدیل ورودی‌هایی مثل st_period=7,10,14 به دیکشنری لیست مقادیر.
+    trend_timeframe=none,4h,1d: None یعنی همان تایم فریم داده.
+    """
+    grid = {}
+    for item in items or []:
+        key, _, values = item.partition("=")
+        if key not in PARAM_TYPES or not values:
+            raise SystemExit(f"Invalid --param: {item}")
+        parsed = []
+        for value in values.split(","):
+            if value.lower() == "none" and key in OPTIONAL_PARAMS:
+                parsed.append(None)
+                continue
+            try:
+                parsed.append(PARAM_TYPES[key](value))
+            except ValueError:
+                raise SystemExit(f"Invalid value for {key}: {value}") from None
+        grid[key] = parsed
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep over STRATEGY_PARAMS")
+    parser.add_argument("--mode", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=50, help="number of combinations in random mode")
+    parser.add_argument("--param", nargs="*",
+                        help="override grid values, e.g. st_period=7,10,14 trend_timeframe=none,4h")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--metric", default=settings.OPTIMIZER_METRIC)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print("🚀 Starting Parameter Sweep...\n")
+
+    configure_cache(
+        max_bytes=settings.INDICATOR_CACHE_MB * 1024 ** 2,
+        disk_dir=settings.INDICATOR_CACHE_DIR
+    )
+
+    # 1. Load Data
+    print("📥 Loading Data...")
+    assets_config = load_assets()
+    data_dict, _, _ = load_backtest_data(assets_config)
+    if not data_dict:
+        print("⛔ No data loaded. Exiting.")
+        return
+
+    # 2. Search Space
+    param_grid = dict(settings.PARAM_GRID)
+    param_grid.update(parse_param_overrides(args.param))
+
+    if args.mode == "grid":
+        combos = grid_search_space(param_grid, settings.STRATEGY_PARAMS)
+    else:
+        combos = random_search_space(param_grid, args.samples, settings.STRATEGY_PARAMS, seed=args.seed)
+    print(f"\n🔎 {len(combos)} combinations ({args.mode} search)")
+
+    # 3. Run
+    t0 = time.perf_counter()
+    results = run_optimization(
+        data_dict, assets_config, combos,
+        initial_capital=settings.INITIAL_CAPITAL,
+        risk_per_trade=settings.RISK_PER_TRADE,
+        metric=args.metric,
+        workers=args.workers,
+        chronological=settings.BACKTEST_CHRONOLOGICAL,
+    )
+    print(f"⏱️ Finished in {time.perf_counter() - t0:.1f}s")
+
+    # 4. Report
+    output_file = Path(settings.OUTPUT_DIR) / "optimization_results.csv"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(output_file, index=False)
+
+    print(f"\n======== TOP {args.top} by {args.metric} ========")
+    print(results.head(args.top).to_string(index=False))
+    print(f"\n✅ Full results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
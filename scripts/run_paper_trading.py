@@ -1,10 +1,10 @@
 ### فایل scripts/run_paper_trading.py ###
 import sys
 import os
-import time
-import ccxt
+import asyncio
+import inspect
+import argparse
 import pandas as pd
-import joblib
 import numpy as np
 from datetime import datetime
 
@@ -12,77 +12,303 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.paper_account import PaperAccount
-from core.strategy import DualSupertrendStrategy
 from core.risk_manager import RiskManager
-from core.indicators import calculate_rsi, calculate_adx, calculate_atr
+from core.streaming import StrategyStream
+from core.features import AI_PIPELINE, load_model
+from core import instrumentation
+from backtest.metrics import MetricsAccumulator
+from core.equity import annual_periods
 from config import settings, assets
 
 # --- تنظیمات ---
 TIMEFRAME = "1h"  # تایم فریم لایو
-LIMIT = 200  # تعداد کندل مورد نیاز برای محاسبات
+LIMIT = 200  # تعداد کندل مورد نیاز برای گرم کردن اندیکاتورها
+UPDATE_LIMIT = 5  # تعداد کندل دریافتی در هر سیکل بعد از گرم شدن
 CHECK_INTERVAL = 60  # هر چند ثانیه قیمت را چک کند (برای SL/TP)
+MAX_CONCURRENCY = 10  # حداکثر درخواست همزمان به صرافی
+FETCH_TIMEOUT = 10  # حداکثر زمان هر درخواست (ثانیه) تا یک نماد کند کل اسکن را معطل نکند
 
 
-def fetch_live_data(exchange, symbol, timeframe, limit):
+def create_exchange(fake=False):
+    """صرافی async (ccxt.async_support) یا صرافی محلی برای اجرای آفلاین"""
+    if fake:
+        from utils.fake_exchange import FakeExchange
+        return FakeExchange()
+
+    import ccxt.async_support as ccxt_async
+    return ccxt_async.binance({"enableRateLimit": True})  # یا ccxt_async.kucoin()
+
+
+async def call_exchange(exchange, limiter, method, *args, **kwargs):
+    """
+    فراخوانی یک متد صرافی با محدودیت همزمانی و timeout.
+    متدهای sync (مثلاً ccxt معمولی) در thread اجرا می‌شوند تا event loop مسدود نشود.
+    """
+    fn = getattr(exchange, method)
+    async with limiter:
+        if inspect.iscoroutinefunction(fn):
+            call = fn(*args, **kwargs)
+        else:
+            call = asyncio.to_thread(fn, *args, **kwargs)
+        return await asyncio.wait_for(call, timeout=FETCH_TIMEOUT)
+
+
+async def fetch_live_data(exchange, limiter, symbol, timeframe, limit):
     """دریافت آخرین کندل‌ها از صرافی"""
     try:
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        with instrumentation.timer("live.fetch_ohlcv"):
+            ohlcv = await call_exchange(exchange, limiter, "fetch_ohlcv", symbol, timeframe, limit=limit)
         df = pd.DataFrame(ohlcv, columns=['time', 'open', 'high', 'low', 'close', 'volume'])
         df['time'] = pd.to_datetime(df['time'], unit='ms')
         df.set_index('time', inplace=True)
         return df
     except Exception as e:
-        print(f"❌ Error fetching {symbol}: {e}")
+        instrumentation.count("live.fetch_errors")
+        print(f"❌ Error fetching {symbol}: {e!r}")
         return pd.DataFrame()
 
 
-def prepare_ai_features(df):
-    """آماده‌سازی داده برای هوش مصنوعی (مشابه فایل آموزش)"""
-    df = df.copy()
-    df["returns"] = df["close"].pct_change()
-    df["atr"] = calculate_atr(df)
-    df["rsi"] = calculate_rsi(df["close"])
-    df["adx"] = calculate_adx(df)
-    df["atr_pct"] = df["atr"] / df["close"]
-    df["return_std"] = df["returns"].rolling(20).std()
-    df["volume_z"] = (
-            (df["volume"] - df["volume"].rolling(20).mean()) /
-            df["volume"].rolling(20).std()
-    )
-
-    # آخرین سطر که تمام ایندکس‌ها را دارد
-    last_row = df.iloc[-1]
-
-    # ساخت آرایه فیچرها دقیقا با ترتیب آموزش
-    features = np.array([
-        last_row["atr_pct"],
-        last_row["return_std"],
-        last_row["rsi"],
-        last_row["adx"],
-        last_row["volume_z"]
-    ]).reshape(1, -1)
-
-    # هندل کردن مقادیر NaN
-    if np.isnan(features).any():
-        return None
+class LiveSymbolState:
+    """
+    وضعیت جریانی اندیکاتورهای یک نماد: بعد از گرم شدن با LIMIT کندل،
+    هر سیکل فقط کندل‌های بسته شده جدید (O(1) برای هر کندل) اضافه می‌شوند.
+    """
 
-    return features
+    def __init__(self, params):
+        self.strategy = StrategyStream(params, TIMEFRAME)
+        self.ai = AI_PIPELINE.stream()
+        self.last_time = None
 
+    def covers(self, df):
+        """آیا داده جدید بدون فاصله به آخرین کندل پردازش شده می‌چسبد؟"""
+        return self.last_time is not None and len(df) > 0 and df.index[0] <= self.last_time
 
-def run_live_bot():
+    def update(self, df):
+        # آخرین کندل هنوز بسته نشده و وارد محاسبات نمی‌شود
+        closed = df.iloc[:-1]
+        if self.last_time is not None:
+            closed = closed[closed.index > self.last_time]
+
+        columns = [closed[c].to_numpy(dtype=np.float64).tolist() for c in ("high", "low", "close", "volume")]
+        for time, high, low, close, volume in zip(closed.index.values, *columns):
+            self.strategy.update(high, low, close, time)
+            self.ai.update(high, low, close, volume)
+
+        if len(closed):
+            self.last_time = closed.index[-1]
+        return len(closed)
+
+
+async def update_symbol_state(exchange, limiter, states, symbol):
+    """دریافت کندل‌های جدید و به‌روزرسانی وضعیت نماد (در صورت فاصله، گرم کردن مجدد)"""
+    state = states.get(symbol)
+    df = await fetch_live_data(exchange, limiter, symbol, TIMEFRAME, LIMIT if state is None else UPDATE_LIMIT)
+    if df.empty:
+        return None
+
+    if state is None or not state.covers(df):
+        if state is not None:
+            df = await fetch_live_data(exchange, limiter, symbol, TIMEFRAME, LIMIT)
+            if df.empty:
+                return None
+        state = LiveSymbolState(settings.STRATEGY_PARAMS)
+        states[symbol] = state
+
+    with instrumentation.timer("live.strategy_update"):
+        state.update(df)
+    return state
+
+
+class PaperTrader:
+    """
+    اسکن همزمان همه نمادها روی یک event loop. هر نماد مستقل پردازش می‌شود،
+    پس SL/TP یک نماد به محض رسیدن قیمتش چک می‌شود و منتظر نمادهای کند نمی‌ماند.
+    تغییرات حساب فقط بین await ها (روی همان thread) انجام می‌شود.
+    """
+
+    def __init__(self, exchange, account, risk_manager, ai_model, symbols, concurrency=MAX_CONCURRENCY,
+                 metrics_file=None, metrics_refresh=settings.LIVE_METRICS_REFRESH):
+        self.exchange = exchange
+        self.account = account
+        self.risk_manager = risk_manager
+        self.ai_model = ai_model
+        self.symbols = symbols
+        self.limiter = asyncio.Semaphore(concurrency)
+
+        # وضعیت جریانی اندیکاتورها برای هر نماد
+        self.states = {}
+
+        # شاخص‌های عملکرد آنلاین (بدون نگهداری کل سری سرمایه)؛ سالانه‌سازی با فاصله اسکن‌ها
+        self.metrics = MetricsAccumulator(periods_per_year=annual_periods(CHECK_INTERVAL * 1e9))
+        self.last_prices = {}
+        self.trades_seen = len(account.history)
+
+        # فایل Prometheus (در صورت روشن بودن instrumentation) هر metrics_refresh ثانیه بازنویسی می‌شود
+        self.metrics_file = metrics_file
+        self.metrics_refresh = metrics_refresh
+        self.metrics_written = None
+
+    async def fetch_ticker(self, symbol):
+        try:
+            with instrumentation.timer("live.fetch_ticker"):
+                ticker = await call_exchange(self.exchange, self.limiter, "fetch_ticker", symbol)
+            self.last_prices[symbol] = ticker['last']
+            return ticker['last']
+        except Exception as e:
+            instrumentation.count("live.fetch_errors")
+            print(f"Network error on ticker {symbol}: {e!r}")
+            return None
+
+    async def process_symbol(self, symbol):
+        account = self.account
+
+        # الف) پوزیشن باز: فقط قیمت لحظه‌ای برای مدیریت حد سود و ضرر
+        if symbol in account.positions:
+            current_price = await self.fetch_ticker(symbol)
+            if current_price is not None:
+                account.check_sl_tp(symbol, current_price)
+            return  # اگر پوزیشن داریم، فعلا سیگنال جدید نمیگیریم (ساده سازی)
+
+        # ب) قیمت لحظه‌ای و کندل‌های جدید به صورت همزمان
+        current_price, state = await asyncio.gather(
+            self.fetch_ticker(symbol),
+            update_symbol_state(self.exchange, self.limiter, self.states, symbol),
+        )
+        if current_price is None or state is None:
+            return
+
+        signal = state.strategy.signal
+
+        if signal == 1:
+            instrumentation.count("live.signals")
+            print(f"💡 Technical Signal detected for {symbol}")
+
+            # ج) فیلتر هوش مصنوعی
+            ai_approval = True
+            if self.ai_model:
+                features = state.ai.features
+                if features is not None:
+                    with instrumentation.timer("live.inference"):
+                        prob = self.ai_model.predict_proba(features)[0][1]
+                    if prob < settings.AI_PROBA_THRESHOLD:  # آستانه اطمینان
+                        ai_approval = False
+                        instrumentation.count("live.ai_rejected")
+                        print(f"   ❌ AI Rejected (Prob: {prob:.2f})")
+                    else:
+                        instrumentation.count("live.ai_approved")
+                        print(f"   ✅ AI Approved (Prob: {prob:.2f})")
+                else:
+                    print("   ⚠️ Not enough data for AI features")
+                    ai_approval = False
+
+            # د) ورود به معامله
+            if ai_approval:
+                # محاسبه مدیریت ریسک
+                # بر اساس آخرین کندل بسته شده
+                last_close = state.strategy.close
+                last_atr = state.strategy.atr.value
+                stop_loss = self.risk_manager.stop_loss_price(last_close, last_atr)
+                take_profit = self.risk_manager.take_profit_price(last_close, last_atr)
+
+                entry_price = current_price
+                pos_size = self.risk_manager.calculate_position_size(entry_price, stop_loss)
+
+                if pos_size > 0:
+                    instrumentation.count("live.entries")
+                    account.open_position(symbol, entry_price, pos_size, stop_loss, take_profit)
+
+    async def scan(self):
+        """یک سیکل کامل روی همه نمادها؛ خطای یک نماد بقیه را متوقف نمی‌کند"""
+        with instrumentation.timer("live.scan"):
+            results = await asyncio.gather(
+                *(self.process_symbol(symbol) for symbol in self.symbols), return_exceptions=True
+            )
+        instrumentation.count("live.scans")
+        for symbol, result in zip(self.symbols, results):
+            if isinstance(result, Exception):
+                instrumentation.count("live.symbol_errors")
+                print(f"❌ Error processing {symbol}: {result!r}")
+
+        self.update_metrics()
+
+    def update_metrics(self):
+        """سرمایه mark-to-market بعد از هر اسکن و تریدهای بسته شده جدید"""
+        account = self.account
+        equity = account.capital + sum(
+            pos["size"] * self.last_prices.get(symbol, pos["entry_price"])
+            for symbol, pos in account.positions.items()
+        )
+        self.metrics.update(equity, datetime.now())
+        for trade in account.history[self.trades_seen:]:
+            self.metrics.add_trade(trade["pnl"], trade["symbol"])
+        self.trades_seen = len(account.history)
+
+        stats = self.metrics.result()
+        instrumentation.gauge("live.equity", equity)
+        instrumentation.gauge("live.open_positions", len(account.positions))
+        instrumentation.gauge("live.max_drawdown_pct", stats['Max Drawdown (%)'])
+        print(f"💼 Equity: ${equity:.2f} | Max DD: {stats['Max Drawdown (%)']:.2f}% | "
+              f"Trades: {stats['Total Trades']} | Win Rate: {stats['Win Rate (%)']:.1f}%")
+
+    async def run(self, interval=CHECK_INTERVAL, cycles=None):
+        """
+        اجرای سیکل‌ها روی مهلت‌های ثابت (t0 + k * interval) به جای sleep ثابت:
+        مدت اسکن از فاصله سیکل‌ها کم می‌شود و اگر اسکنی از مهلت بعدی عبور کند،
+        سیکل‌های عقب افتاده جبران نمی‌شوند و اسکن بعدی روی مهلت بعدی تنظیم می‌شود.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        cycle = 0
+        self.metrics.periods_per_year = annual_periods(interval * 1e9)
+
+        while cycles is None or cycle < cycles:
+            print(f"\n--- Scan: {datetime.now().strftime('%H:%M:%S')} ---")
+            started = loop.time()
+            await self.scan()
+            cycle += 1
+            self.export_metrics(loop.time())
+
+            now = loop.time()
+            deadline += interval
+            if now > deadline:
+                missed = int((now - deadline) // interval) + 1
+                deadline += missed * interval
+                print(f"⚠️ Scan took {now - started:.1f}s, skipped {missed} cycle(s)")
+
+            if cycles is not None and cycle >= cycles:
+                break
+
+            # صبر تا سیکل بعدی
+            print(f"Sleeping... (scan {now - started:.2f}s)", end="\r")
+            await asyncio.sleep(deadline - now)
+
+    def export_metrics(self, now=None, force=False):
+        """بازنویسی فایل Prometheus حداکثر هر metrics_refresh ثانیه"""
+        if not self.metrics_file or not instrumentation.enabled():
+            return
+        if not force and self.metrics_written is not None and now - self.metrics_written < self.metrics_refresh:
+            return
+        instrumentation.registry().write_prometheus(self.metrics_file)
+        self.metrics_written = now
+
+
+async def run_live_bot(fake=False, concurrency=MAX_CONCURRENCY, interval=CHECK_INTERVAL,
+                       cycles=None, state_file="paper_wallet.json", backend=settings.PAPER_STATE_BACKEND,
+                       metrics_file=settings.LIVE_METRICS_FILE, profile=False):
     print("🚀 Starting Paper Trading Bot...")
+    instrumentation.configure_instrumentation(settings.INSTRUMENTATION_ENABLED or profile)
 
     # 1. راه اندازی
-    exchange = ccxt.binance()  # یا ccxt.kucoin()
-    account = PaperAccount(initial_capital=1000)
-    strategy = DualSupertrendStrategy(settings.STRATEGY_PARAMS)
+    exchange = create_exchange(fake)
+    account = PaperAccount(initial_capital=1000, state_file=state_file, backend=backend)
     risk_manager = RiskManager(account.capital, risk_per_trade=0.01)
 
     # 2. لود کردن مدل هوش مصنوعی
     model_path = os.path.join("outputs", "model_checkpoints", "market_condition_xgb.pkl")
     if os.path.exists(model_path):
-        ai_model = joblib.load(model_path)
-        print("🧠 AI Model Loaded Successfully.")
+        # خروجی NumPy درخت‌ها (market_condition_xgb.trees.npz) در صورت وجود، بدون import xgboost
+        ai_model = load_model(model_path, prefer_trees=True)
+        print(f"🧠 AI Model Loaded Successfully ({type(ai_model).__name__}).")
     else:
         print("⚠️ AI Model not found! Running without AI.")
         ai_model = None
@@ -93,85 +319,45 @@ def run_live_bot():
     print(f"👀 Watching: {symbols}")
     print(f"💰 Current Capital: ${account.capital:.2f}")
 
-    # حلقه بی نهایت
-    while True:
-        print(f"\n--- Scan: {datetime.now().strftime('%H:%M:%S')} ---")
-
-        for symbol in symbols:
-            # الف) دریافت قیمت لحظه‌ای برای مدیریت پوزیشن‌های باز
-            try:
-                ticker = exchange.fetch_ticker(symbol)
-                current_price = ticker['last']
-
-                # چک کردن حد سود و ضرر برای پوزیشن‌های باز
-                if symbol in account.positions:
-                    account.check_sl_tp(symbol, current_price)
-                    continue  # اگر پوزیشن داریم، فعلا سیگنال جدید نمیگیریم (ساده سازی)
-            except Exception as e:
-                print(f"Network error on ticker {symbol}: {e}")
-                continue
-
-            # ب) تحلیل تکنیکال برای ورود جدید
-            df = fetch_live_data(exchange, symbol, TIMEFRAME, LIMIT)
-            if df.empty: continue
-
-            # محاسبه سیگنال استراتژی
-            # تابع generate_signal ما در core/strategy فقط آخرین کندل را برمیگرداند یا کل df؟
-            # با توجه به کد قبلی، ما باید متد generate_signal را کمی تغییر میدادیم یا اینجا دستی حساب کنیم
-            # اینجا برای اطمینان، اندیکاتورها را روی کل df میزنیم
-
-            # 1. محاسبه اندیکاتورهای استراتژی
-            df["ema200"] = df["close"].ewm(span=200, adjust=False).mean()
-            # Supertrend محاسباتش پیچیده است، فرض بر این است که توابع در indicators.py درستند
-            # اما چون supertrend روی کل دیتافریم کار میکند، اینجا مشکلی نیست
-
-            # نکته: ما از کلاس strategy استفاده میکنیم که قبلا اصلاح کردیم تا generate_signals (جمع) داشته باشد
-            # اما در فایل core/strategy.py شما متد generate_signal (مفرد) داشتید.
-            # برای سادگی اینجا منطق را پیاده میکنیم یا باید فایل strategy را آپدیت کنید.
-            # بیایید فرض کنیم فایل strategy.py را طبق دستورات قبلی آپدیت کردید.
-
-            # فراخوانی استراتژی روی داده‌های جدید
-            # ماژول strategy را ایمپورت کردیم. اگر متد generate_signals ندارد، دستی چک میکنیم:
-
-            signal = strategy.generate_signal(df)  # فرض بر این است که این متد 0 یا 1 برمیگرداند برای کندل آخر
-
-            if signal == 1:
-                print(f"💡 Technical Signal detected for {symbol}")
-
-                # ج) فیلتر هوش مصنوعی
-                ai_approval = True
-                if ai_model:
-                    features = prepare_ai_features(df)
-                    if features is not None:
-                        prob = ai_model.predict_proba(features)[0][1]
-                        if prob < 0.6:  # آستانه اطمینان
-                            ai_approval = False
-                            print(f"   ❌ AI Rejected (Prob: {prob:.2f})")
-                        else:
-                            print(f"   ✅ AI Approved (Prob: {prob:.2f})")
-                    else:
-                        print("   ⚠️ Not enough data for AI features")
-                        ai_approval = False
-
-                # د) ورود به معامله
-                if ai_approval:
-                    # محاسبه مدیریت ریسک
-                    stop_loss = risk_manager.calculate_stop_loss(df, -1)  # -1 یعنی آخرین کندل
-                    take_profit = risk_manager.calculate_take_profit(df, -1)
-
-                    entry_price = current_price
-                    pos_size = risk_manager.calculate_position_size(entry_price, stop_loss)
-
-                    if pos_size > 0:
-                        account.open_position(symbol, entry_price, pos_size, stop_loss, take_profit)
-
-        # صبر تا سیکل بعدی
-        print("Sleeping...", end="\r")
-        time.sleep(CHECK_INTERVAL)
+    trader = PaperTrader(exchange, account, risk_manager, ai_model, symbols, concurrency=concurrency,
+                         metrics_file=metrics_file)
+    try:
+        await trader.run(interval=interval, cycles=cycles)
+    finally:
+        trader.export_metrics(force=True)
+        await exchange.close()
+        account.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paper trading bot")
+    parser.add_argument("--fake", action="store_true", help="use the offline fake exchange")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--interval", type=float, default=CHECK_INTERVAL)
+    parser.add_argument("--cycles", type=int, default=None, help="stop after N scans (default: forever)")
+    parser.add_argument("--state-file", default="paper_wallet.json")
+    parser.add_argument("--backend", choices=["json", "journal", "sqlite"], default=settings.PAPER_STATE_BACKEND,
+                        help="account state storage")
+    parser.add_argument("--metrics-file", default=settings.LIVE_METRICS_FILE,
+                        help="Prometheus text file refreshed every LIVE_METRICS_REFRESH seconds")
+    parser.add_argument("--profile", action="store_true",
+                        help="collect timings/counters and write --metrics-file (default: INSTRUMENTATION_ENABLED)")
+    args = parser.parse_args(argv)
+
+    asyncio.run(run_live_bot(
+        fake=args.fake,
+        concurrency=args.concurrency,
+        interval=args.interval,
+        cycles=args.cycles,
+        state_file=args.state_file,
+        backend=args.backend,
+        metrics_file=args.metrics_file,
+        profile=args.profile,
+    ))
 
 
 if __name__ == "__main__":
     try:
-        run_live_bot()
+        main()
     except KeyboardInterrupt:
         print("\n👋 Bot stopped manually.")
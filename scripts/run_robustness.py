@@ -0,0 +1,100 @@
+### scripts/run_robustness.py ###
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+# اضافه کردن مسیر پروژه به sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from config.assets import load_assets
+from core.strategy import DualSupertrendStrategy
+from core.indicators import configure_cache
+from core.risk_manager import RiskManager
+from core.portfolio import MultiAssetPortfolio
+from core.features import load_model
+from backtest.engine import BacktestEngine
+from backtest.robustness import robustness_analysis, METHODS
+from scripts.run_backtest import load_backtest_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo / bootstrap robustness analysis of the backtest")
+    parser.add_argument("--paths", type=int, default=settings.MONTE_CARLO_PATHS)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--block-length", type=int, default=None, help="bootstrap block length in bars (default: n^(1/3))")
+    parser.add_argument("--skip-prob", type=float, default=settings.MONTE_CARLO_SKIP_PROB,
+                        help="probability of skipping each entry in the skip method")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-ai", action="store_true", help="run the backtest without the AI filter")
+    args = parser.parse_args(argv)
+
+    print("🚀 Starting Robustness Analysis...\n")
+
+    configure_cache(
+        max_bytes=settings.INDICATOR_CACHE_MB * 1024 ** 2,
+        disk_dir=settings.INDICATOR_CACHE_DIR
+    )
+
+    # 1. Backtest (مثل scripts/run_backtest.py)
+    print("📥 Loading Data...")
+    assets_config = load_assets()
+    data_dict, _, _ = load_backtest_data(assets_config)
+    if not data_dict:
+        print("⛔ No data loaded. Exiting.")
+        return
+
+    ai_model = None
+    model_path = Path(settings.MODEL_DIR) / "market_condition_xgb.pkl"
+    if not args.no_ai and model_path.exists():
+        try:
+            ai_model = load_model(model_path)
+        except Exception as e:
+            print(f"   ⚠️ AI Model load failed: {e}")
+
+    portfolio = MultiAssetPortfolio(initial_capital=settings.INITIAL_CAPITAL, assets_config=assets_config)
+    engine = BacktestEngine(
+        portfolio,
+        DualSupertrendStrategy(settings.STRATEGY_PARAMS),
+        RiskManager(initial_capital=settings.INITIAL_CAPITAL, risk_per_trade=settings.RISK_PER_TRADE),
+        ai_model=ai_model,
+        chronological=settings.BACKTEST_CHRONOLOGICAL,
+    )
+    engine.run(data_dict)
+    print(f"\n🔢 {len(portfolio.trades)} trades, {len(portfolio.equity)} equity bars")
+
+    # 2. Monte Carlo
+    print(f"\n🎲 {args.paths:,} paths per method: {', '.join(args.methods)}")
+    t0 = time.perf_counter()
+    results = robustness_analysis(
+        portfolio.trades, portfolio.equity, settings.INITIAL_CAPITAL,
+        n_paths=args.paths,
+        methods=args.methods,
+        block_length=args.block_length,
+        skip_prob=args.skip_prob,
+        confidence=args.confidence,
+        seed=args.seed,
+        max_bytes=settings.MONTE_CARLO_CHUNK_MB * 1024 ** 2,
+    )
+    print(f"⏱️ Finished in {time.perf_counter() - t0:.1f}s")
+
+    # 3. Report
+    for method, summary in results.items():
+        print(f"\n======== {method.upper()} ========")
+        print(summary.to_string(float_format=lambda v: f"{v:.2f}"))
+        print(f"Probability of loss: {summary.attrs['loss_probability'] * 100:.2f}% | "
+              f"ruin: {summary.attrs['ruin_probability'] * 100:.2f}%")
+
+    output_file = Path(settings.OUTPUT_DIR) / "robustness_results.csv"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    pd.concat(results, names=["method", "metric"]).to_csv(output_file)
+    print(f"\n✅ Distributions saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
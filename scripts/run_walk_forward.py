@@ -0,0 +1,83 @@
+### scripts/run_walk_forward.py ###
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+# اضافه کردن مسیر پروژه به sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from config.assets import load_assets
+from core.indicators import configure_cache
+from backtest.walk_forward import run_walk_forward, summarize_walk_forward
+from scripts.run_backtest import load_backtest_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward training and out-of-sample backtest of the AI filter")
+    parser.add_argument("--mode", choices=["rolling", "expanding"], default=settings.WALK_FORWARD_MODE)
+    parser.add_argument("--train-days", type=int, default=settings.WALK_FORWARD_TRAIN_DAYS)
+    parser.add_argument("--test-days", type=int, default=settings.WALK_FORWARD_TEST_DAYS)
+    parser.add_argument("--step-days", type=int, default=None, help="fold step (default: --test-days)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="minimum class-1 probability to accept an entry")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    print("🚀 Starting Walk-Forward Validation...\n")
+
+    configure_cache(
+        max_bytes=settings.INDICATOR_CACHE_MB * 1024 ** 2,
+        disk_dir=settings.INDICATOR_CACHE_DIR
+    )
+
+    # 1. Load Data
+    print("📥 Loading Data...")
+    assets_config = load_assets()
+    data_dict, _, _ = load_backtest_data(assets_config)
+    if not data_dict:
+        print("⛔ No data loaded. Exiting.")
+        return
+
+    # 2. Run Folds
+    print(f"\n🔁 {args.mode} windows: train {args.train_days}d, test {args.test_days}d")
+    t0 = time.perf_counter()
+    results = run_walk_forward(
+        data_dict, assets_config,
+        strategy_params=settings.STRATEGY_PARAMS,
+        model_params=settings.AI_MODEL_PARAMS,
+        train_period=pd.Timedelta(days=args.train_days),
+        test_period=pd.Timedelta(days=args.test_days),
+        step=pd.Timedelta(days=args.step_days) if args.step_days else None,
+        expanding=args.mode == "expanding",
+        initial_capital=settings.INITIAL_CAPITAL,
+        risk_per_trade=settings.RISK_PER_TRADE,
+        threshold=args.threshold,
+        workers=args.workers,
+        chronological=settings.BACKTEST_CHRONOLOGICAL,
+    )
+    print(f"⏱️ Finished in {time.perf_counter() - t0:.1f}s")
+
+    if results.empty:
+        print("⛔ Not enough data for a single fold.")
+        return
+
+    # 3. Report
+    output_file = Path(settings.OUTPUT_DIR) / "walk_forward_results.csv"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(output_file, index=False)
+
+    print("\n======== OUT-OF-SAMPLE FOLDS ========")
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    print("\n======== SUMMARY ========")
+    for key, value in summarize_walk_forward(results).items():
+        print(f"{key:<31}: {value:.3f}" if isinstance(value, float) else f"{key:<31}: {value}")
+    print(f"\n✅ Fold results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,64 +2,60 @@
 
 import os
 import sys
-import joblib
 import yaml
+import argparse
 import pandas as pd
 import numpy as np
 
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-from xgboost import XGBClassifier
-
 # اضافه کردن ریشه پروژه
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(ROOT_DIR)
 
-from core.indicators import (
-    calculate_atr,
-    calculate_rsi,
-    calculate_adx
-)
+from config import settings
+from data.resample import load_timeframe
+from data.feature_store import FeatureSet, ewm_warmup, update_features, load_features
+from core.indicators import configure_cache, cache_stats
+from core.features import AI_PIPELINE, AI_FEATURE_COLS, save_model, load_model
+from core.tree_model import export_trees, trees_path
 
 RAW_DATA_DIR = os.path.join(ROOT_DIR, "data", "raw")
 MODEL_DIR = os.path.join(ROOT_DIR, "outputs", "model_checkpoints")
 ASSETS_FILE = os.path.join(ROOT_DIR, "config", "assets.yaml")
 
+TARGET_HORIZON = 8  # تعداد کندل آینده برای برچسب
+FEATURE_COLUMNS = AI_FEATURE_COLS + ["target"]
+
 
 def load_assets():
     with open(ASSETS_FILE, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)["assets"]
 
 
-def build_features(df):
-    df = df.copy()
-
-    df["returns"] = df["close"].pct_change()
-    df["atr"] = calculate_atr(df)
-    df["rsi"] = calculate_rsi(df["close"])
-    df["adx"] = calculate_adx(df)
-
-    df["atr_pct"] = df["atr"] / df["close"]
-    df["return_std"] = df["returns"].rolling(20).std()
-    df["volume_z"] = (
-        (df["volume"] - df["volume"].rolling(20).mean()) /
-        df["volume"].rolling(20).std()
-    )
+def compute_features(df):
+    """ستون‌های ویژگی و برچسب برای همه کندل‌ها (ردیف‌های گرم شدن NaN)"""
+    # ویژگی‌ها از pipeline مشترک با بک‌تست و معاملات لایو (core/features.py)
+    df = AI_PIPELINE.compute(df).assign(close=df["close"])
 
     # برچسب: حرکت سالم در 8 کندل آینده
-    future_return = df["close"].shift(-8) / df["close"] - 1
+    future_return = df["close"].shift(-TARGET_HORIZON) / df["close"] - 1
     df["target"] = (future_return > 0.01).astype(int)
 
-    features = df[[
-        "atr_pct",
-        "return_std",
-        "rsi",
-        "adx",
-        "volume_z",
-        "target"
-    ]].dropna()
+    return df[FEATURE_COLUMNS]
 
-    return features
+
+def build_features(df):
+    return compute_features(df).dropna()
+
+
+# انبار پارتیشن‌بندی شده data/features/ai/<SYMBOL>_<TF>/<YEAR>/
+AI_FEATURES = FeatureSet(
+    "ai", FEATURE_COLUMNS, compute_features,
+    # ADX دو EWM زنجیره‌ای (Wilder) دارد؛ پنجره‌های غلتان 20 کندل
+    warmup=2 * ewm_warmup(alpha=1 / 14) + 20,
+    horizon=TARGET_HORIZON,
+    # تغییر schema ویژگی‌ها انبار را دوباره می‌سازد
+    version=AI_PIPELINE.version,
+)
 
 
 def load_all_data():
@@ -70,19 +66,16 @@ def load_all_data():
         symbol = asset["symbol"]
         timeframe = asset["timeframe"]
 
-        file_path = os.path.join(
-            RAW_DATA_DIR,
-            f"{symbol}_{timeframe}.csv"
-        )
+        df = load_timeframe(symbol, timeframe)
 
-        if not os.path.exists(file_path):
+        if df is None:
             print(f"❌ Missing data for {symbol}")
             continue
 
-        df = pd.read_csv(file_path, parse_dates=["open_time"])
-        df.set_index("open_time", inplace=True)
-
-        features = build_features(df)
+        # فقط کندل‌های جدید (و دُم گرم شدن) دوباره محاسبه می‌شوند
+        update_features(symbol, timeframe, AI_FEATURES, ohlcv=df)
+        features = load_features(symbol, timeframe, AI_FEATURES.name, dropna=True)
+        features["target"] = features["target"].astype(int)
         dfs.append(features)
 
         print(f"{symbol}: {len(features)} rows")
@@ -90,23 +83,31 @@ def load_all_data():
     return pd.concat(dfs)
 
 
+def time_split(dataset, test_size=0.2):
+    """
+    جدا کردن داده آزمون بر اساس زمان (آخرین test_size از بازه زمانی، روی همه ارزها)
+    به جای shuffle تا کندل‌های آینده وارد آموزش نشوند. ردیف‌های آموزشی که برچسبشان
+    (TARGET_HORIZON کندل بعد) به بازه آزمون می‌رسد حذف می‌شوند.
+    ارزیابی کامل با بازآموزی در طول زمان: scripts/run_walk_forward.py
+    """
+    times = dataset.index.sort_values()
+    cutoff = times[int(len(dataset) * (1 - test_size))]
+    bar = times.unique().to_series().diff().median()
+    train = dataset[dataset.index < cutoff - TARGET_HORIZON * bar]
+    test = dataset[dataset.index >= cutoff]
+    return train, test
+
+
 def train_model(dataset):
-    X = dataset.drop("target", axis=1)
-    y = dataset["target"]
+    # import سنگین فقط هنگام آموزش (--export-only و --help بدون آن‌ها)
+    from sklearn.metrics import classification_report
+    from xgboost import XGBClassifier
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, shuffle=True, random_state=42
-    )
+    train, test = time_split(dataset)
+    X_train, y_train = train.drop("target", axis=1), train["target"]
+    X_test, y_test = test.drop("target", axis=1), test["target"]
 
-    model = XGBClassifier(
-        n_estimators=200,
-        max_depth=5,
-        learning_rate=0.05,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        eval_metric="logloss",
-        random_state=42
-    )
+    model = XGBClassifier(**settings.AI_MODEL_PARAMS)
 
     model.fit(X_train, y_train)
 
@@ -118,18 +119,42 @@ def train_model(dataset):
     return model
 
 
-def main():
+def export_model(model, model_path, dataset):
+    """
+    خروجی درخت‌ها برای استنتاج سریع لایو (core/tree_model)، اعتبارسنجی شده روی همه ردیف‌های داده
+    """
+    _, max_diff = export_trees(model, model_path, dataset[AI_FEATURE_COLS].to_numpy())
+    print(f"🌲 Trees exported at: {trees_path(model_path)} (max |Δp| vs XGBoost: {max_diff:.2e})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the XGBoost market filter")
+    parser.add_argument("--export-only", action="store_true",
+                        help="only export the existing model's trees (no retraining)")
+    args = parser.parse_args(argv)
+
     os.makedirs(MODEL_DIR, exist_ok=True)
+    configure_cache(
+        max_bytes=settings.INDICATOR_CACHE_MB * 1024 ** 2,
+        disk_dir=settings.INDICATOR_CACHE_DIR
+    )
 
     dataset = load_all_data()
     print(f"\nTotal samples: {len(dataset)}")
 
+    model_path = os.path.join(MODEL_DIR, "market_condition_xgb.pkl")
+    if args.export_only:
+        export_model(load_model(model_path), model_path, dataset)
+        return
+
     model = train_model(dataset)
 
-    model_path = os.path.join(MODEL_DIR, "market_condition_xgb.pkl")
-    joblib.dump(model, model_path)
+    # schema ویژگی‌ها کنار مدل (market_condition_xgb.schema.json) ذخیره می‌شود
+    save_model(model, model_path)
 
     print(f"\n✅ Model saved at: {model_path}")
+    export_model(model, model_path, dataset)
+    print(f"Indicator cache: {cache_stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+### tests/conftest.py ###
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# اضافه کردن ریشه پروژه به sys.path (مثل اسکریپت‌ها)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from core.strategy import DualSupertrendStrategy
+from core.risk_manager import RiskManager
+from core.portfolio import MultiAssetPortfolio
+from core.features import AI_FEATURE_COLS
+from backtest.engine import BacktestEngine
+
+SYMBOL = "SYNTHUSDT"
+
+
+def _build_engine(assets_config=None, chronological=False):
+    assets_config = assets_config or [{"symbol": SYMBOL, "weight": 1.0}]
+    portfolio = MultiAssetPortfolio(settings.INITIAL_CAPITAL, assets_config)
+    strategy = DualSupertrendStrategy(settings.STRATEGY_PARAMS)
+    risk_manager = RiskManager(settings.INITIAL_CAPITAL, settings.RISK_PER_TRADE)
+    return BacktestEngine(portfolio, strategy, risk_manager, chronological=chronological)
+
+
+def _legacy_bar_loop(engine, symbol, df, start=200, ai_model=None):
+    """
+    حلقه مرجع سطر به سطر با df.iloc (پیاده‌سازی قبل از حلقه آرایه‌ای).
+    ai_model: تایید هر ورود با یک فراخوانی predict روی همان کندل (df باید ستون‌های AI را داشته باشد)
+    """
+    portfolio = engine.portfolio
+    risk_manager = engine.risk_manager
+
+    for i in range(start, len(df)):
+        current_row = df.iloc[i]
+
+        if symbol in portfolio.positions:
+            position = portfolio.positions[symbol]
+            if current_row['low'] <= position['stop_loss']:
+                portfolio.close_position(symbol, position['stop_loss'], current_row.name, reason="SL")
+            elif current_row['high'] >= position['take_profit']:
+                portfolio.close_position(symbol, position['take_profit'], current_row.name, reason="TP")
+
+        if current_row['signal'] == 1 and symbol not in portfolio.positions:
+            if ai_model is not None:
+                features = current_row[AI_FEATURE_COLS].to_numpy(dtype=np.float64).reshape(1, -1)
+                if ai_model.predict(features)[0] == 0:
+                    continue
+            stop_loss = risk_manager.calculate_stop_loss(df, i)
+            if stop_loss >= current_row['close']:
+                continue
+            position_size = risk_manager.calculate_position_size(current_row['close'], stop_loss)
+            if position_size > 0:
+                take_profit = risk_manager.calculate_take_profit(df, i)
+                portfolio.open_position(
+                    symbol, current_row['close'], position_size, stop_loss, take_profit, current_row.name
+                )
+
+
+def _merged_reference_loop(engine, frames, start=200):
+    """
+    حلقه مرجع brute-force حالت زمانی: روی اجتماع مرتب همه timestampها قدم می‌زند و
+    در هر لحظه اول خروج همه نمادها و بعد ورود همه نمادها را (به ترتیب frames) بررسی می‌کند.
+    خروجی: تعداد ورودهایی که سایزشان به خاطر کمبود سرمایه مشترک کوچک شد و
+    تعداد timestampهایی که در آن‌ها خروج و ورود هم‌زمان رخ داد.
+    """
+    portfolio = engine.portfolio
+    risk_manager = engine.risk_manager
+    rows = {
+        symbol: {t: i for i, t in enumerate(df.index[start:], start)}
+        for symbol, df in frames.items() if len(df) > start
+    }
+    times = sorted(set().union(*(r.keys() for r in rows.values())))
+    stats = {"capped": 0, "exit_entry_ties": 0}
+
+    for t in times:
+        exited = entered = False
+        for symbol, r in rows.items():
+            i = r.get(t)
+            if i is None or symbol not in portfolio.positions:
+                continue
+            bar = frames[symbol].iloc[i]
+            position = portfolio.positions[symbol]
+            if bar['low'] <= position.stop_loss:
+                portfolio.close_position(symbol, position.stop_loss, t, reason="SL")
+                exited = True
+            elif bar['high'] >= position.take_profit:
+                portfolio.close_position(symbol, position.take_profit, t, reason="TP")
+                exited = True
+
+        for symbol, r in rows.items():
+            i = r.get(t)
+            if i is None or symbol in portfolio.positions:
+                continue
+            bar = frames[symbol].iloc[i]
+            if bar['signal'] != 1:
+                continue
+            stop_loss = risk_manager.stop_loss_price(bar['close'], bar['atr'])
+            if stop_loss >= bar['close']:
+                continue
+            position_size = risk_manager.calculate_position_size(bar['close'], stop_loss)
+            if position_size > 0:
+                if position_size * bar['close'] > portfolio.capital:
+                    stats["capped"] += 1
+                take_profit = risk_manager.take_profit_price(bar['close'], bar['atr'])
+                portfolio.open_position(symbol, bar['close'], position_size, stop_loss, take_profit, t)
+                entered = True
+
+        stats["exit_entry_ties"] += exited and entered
+    return stats
+
+
+@pytest.fixture
+def build_engine():
+    """سازنده BacktestEngine با تنظیمات پیش‌فرض (assets_config=None: فقط SYMBOL)"""
+    return _build_engine
+
+
+@pytest.fixture
+def legacy_bar_loop():
+    return _legacy_bar_loop
+
+
+@pytest.fixture
+def merged_reference_loop():
+    return _merged_reference_loop
@@ -0,0 +1,168 @@
+### tests/test_account_store.py ###
+# ذخیره وضعیت PaperAccount: بازسازی از ژورنال، اسنپ‌شات فشرده و انتقال از فرمت‌های قبلی
+import json
+import random
+import sqlite3
+
+import pytest
+
+from core.account_store import JournalStateStore, SqliteStateStore, open_state_store
+from core.paper_account import PaperAccount
+
+BACKENDS = ["journal", "sqlite"]
+
+
+def _trade(account, rng, n_events=300):
+    for _ in range(n_events):
+        symbol = f"SYN{rng.randrange(8):02d}USDT"
+        if symbol in account.positions:
+            account.close_position(symbol, rng.uniform(90, 110), "TP")
+        else:
+            account.open_position(symbol, rng.uniform(90, 110), rng.uniform(0.01, 0.1), 80, 120)
+
+
+def _snapshots(store):
+    if isinstance(store, JournalStateStore):
+        return [json.loads(store.snapshot_path.read_text())]
+    return [json.loads(text) for (text,) in store.conn.execute("SELECT state FROM snapshots")]
+
+
+@pytest.fixture
+def quiet(capsys):
+    yield
+    capsys.readouterr()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_reload_rebuilds_history_from_journal(tmp_path, backend, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend=backend)
+    _trade(account, random.Random(0))
+    account.close()
+
+    reloaded = PaperAccount(1000, state_file, backend=backend)
+    assert reloaded._state() == account._state()
+    assert len(reloaded.history) > 100
+    # اسنپ‌شات فقط وضعیت فعلی و تعداد تریدها را دارد
+    for snapshot in _snapshots(reloaded.store):
+        assert "history" not in snapshot
+        assert snapshot["trades"] <= len(reloaded.history)
+    reloaded.close()
+
+
+def test_json_backend_reload(tmp_path, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend="json")
+    _trade(account, random.Random(7), 200)
+    account.close()
+
+    reloaded = PaperAccount(1000, state_file, backend="json")
+    assert reloaded._state() == account._state()
+    reloaded.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_migrated_history_is_archived_once(tmp_path, backend, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend="json")
+    _trade(account, random.Random(1), 100)
+    migrated = account._state()
+
+    account = PaperAccount(1000, state_file, backend=backend)
+    assert account._state() == migrated
+    _trade(account, random.Random(2), 250)
+    account.close()
+
+    reloaded = PaperAccount(1000, state_file, backend=backend)
+    assert reloaded._state() == account._state()
+    assert reloaded.history[:len(migrated["history"])] == migrated["history"]
+    assert reloaded.store.archived == _snapshots(reloaded.store)[0]["trades"]
+    reloaded.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_snapshot_drops_replayed_events(tmp_path, backend, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend=backend)
+    _trade(account, random.Random(3), 450)
+    store = account.store
+
+    # فقط رویدادهای بعد از آخرین اسنپ‌شات باقی می‌مانند
+    if isinstance(store, JournalStateStore):
+        events = store.journal_path.read_text().splitlines()
+        archived = store.history_path.read_text().splitlines()
+    else:
+        events = store.conn.execute("SELECT seq FROM events").fetchall()
+        archived = store.conn.execute("SELECT trade FROM history").fetchall()
+    assert len(events) == store.pending < store.snapshot_every
+    assert len(archived) == _snapshots(store)[0]["trades"]
+    account.close()
+
+    reloaded = PaperAccount(1000, state_file, backend=backend)
+    assert reloaded._state() == account._state()
+    assert reloaded.store.pending == len(events)
+    reloaded.close()
+
+
+def test_crash_between_history_and_journal_truncation(tmp_path, quiet):
+    store = JournalStateStore(tmp_path / "wallet.json", snapshot_every=1000)
+    account = PaperAccount(1000, store=store)
+    _trade(account, random.Random(4), 150)
+    journal = store.journal_path.read_text()
+    account.save_state()
+    archived = list(account.history)
+    _trade(account, random.Random(8), 40)
+    account.close()
+
+    # کرش بعد از اسنپ‌شات و پیش از خالی شدن ژورنال: رویدادهای قبلی هنوز در ژورنال هستند
+    store.journal_path.write_text(journal + store.journal_path.read_text())
+    # کرش بعد از نوشتن تاریخچه و پیش از اسنپ‌شات: تریدهای اضافه در انتهای فایل تاریخچه
+    with open(store.history_path, "a") as f:
+        f.write(json.dumps(archived[-1]) + "\n")
+
+    reloaded = PaperAccount(1000, store=JournalStateStore(tmp_path / "wallet.json"))
+    assert reloaded._state() == account._state()
+    assert len(store.history_path.read_text().splitlines()) == len(archived)
+    reloaded.close()
+
+
+def test_torn_journal_line_is_dropped(tmp_path, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend="journal")
+    _trade(account, random.Random(5), 120)
+    expected = account._state()
+    account.close()
+
+    with open(account.store.journal_path, "a") as f:
+        f.write('{"type": "close", "symbol": "SYN01')
+    reloaded = PaperAccount(1000, state_file, backend="journal")
+    assert reloaded._state() == expected
+    reloaded.close()
+
+
+def test_missing_journal_events_are_detected(tmp_path, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend="journal")
+    _trade(account, random.Random(6), 250)
+    account.close()
+
+    journal = account.store.journal_path
+    journal.write_text("".join(journal.read_text().splitlines(keepends=True)[1:]))
+    with pytest.raises(ValueError, match="missing events"):
+        open_state_store("journal", state_file).load()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_missing_history_is_detected(tmp_path, backend, quiet):
+    state_file = tmp_path / "wallet.json"
+    account = PaperAccount(1000, state_file, backend=backend)
+    _trade(account, random.Random(6), 250)
+    account.close()
+
+    if backend == "journal":
+        account.store.history_path.write_text("")
+    else:
+        with sqlite3.connect(account.store.path) as conn:
+            conn.execute("DELETE FROM history WHERE position = 0")
+    with pytest.raises(ValueError, match="history is incomplete"):
+        open_state_store(backend, state_file).load()
@@ -0,0 +1,31 @@
+### tests/test_cli.py ###
+# دستور سطح بالای `python -m trader --help` نباید کتابخانه سنگینی import کند
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "numba", "xgboost", "sklearn", "ccxt", "yaml")
+
+
+def _imported_packages(*argv):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "trader", *argv],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    }
+
+
+def test_top_level_help_is_lazy():
+    packages = _imported_packages("--help")
+    assert not [name for name in HEAVY_MODULES if name in packages]
+
+
+@pytest.mark.parametrize("command", ["download", "build-features", "train", "backtest", "paper"])
+def test_command_help_runs(command):
+    assert "trader" in _imported_packages(command, "--help")
@@ -0,0 +1,129 @@
+### tests/test_engine.py ###
+# حلقه آرایه‌ای BacktestEngine در برابر حلقه مرجع سطر به سطر (df.iloc)
+import numpy as np
+import pytest
+
+from config import settings
+from backtest.engine import AI_PROB_COL, BacktestEngine, sweep_ai_thresholds
+from core.strategy import DualSupertrendStrategy
+from utils.helpers import make_synthetic_ohlcv
+
+SYMBOL = "SYNTHUSDT"  # نماد پیش‌فرض build_engine در conftest
+
+
+class CountingModel:
+    """مدل خطی ساده روی ویژگی‌های AI که تعداد فراخوانی‌ها را می‌شمارد"""
+
+    def __init__(self):
+        self.calls = 0
+        self.weights = np.array([40.0, 30.0, 0.02, 0.03, 0.2])
+
+    def predict_proba(self, X):
+        self.calls += 1
+        z = np.nan_to_num(np.asarray(X, dtype=np.float64) @ self.weights - 2.0)
+        p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+@pytest.fixture(scope="module")
+def signals():
+    df = make_synthetic_ohlcv(20_000)
+    return DualSupertrendStrategy(settings.STRATEGY_PARAMS).generate_signals(df)
+
+
+def _trades(engine):
+    return [repr(t) for t in engine.portfolio.trades]
+
+
+def test_array_loop_matches_iloc_loop(build_engine, legacy_bar_loop, signals):
+    engine = build_engine()
+    engine._run_bar_loop(SYMBOL, signals)
+    legacy = build_engine()
+    legacy_bar_loop(legacy, SYMBOL, signals)
+
+    assert len(engine.portfolio.trades) > 0
+    assert _trades(engine) == _trades(legacy)
+
+
+def test_batched_ai_gating_matches_per_bar_predict(build_engine, legacy_bar_loop, signals):
+    featured = BacktestEngine._precalculate_ai_features(signals)
+    engine = build_engine()
+    engine.ai_model = CountingModel()
+    engine._simulate(SYMBOL, featured)
+    # یک فراخوانی مدل برای همه کندل‌های کاندید
+    assert engine.ai_model.calls == 1
+
+    legacy = build_engine()
+    legacy_bar_loop(legacy, SYMBOL, featured, ai_model=CountingModel())
+
+    unfiltered = build_engine()
+    unfiltered._run_bar_loop(SYMBOL, signals)
+    assert 0 < len(engine.portfolio.trades) < len(unfiltered.portfolio.trades)
+    assert _trades(engine) == _trades(legacy)
+
+
+def test_threshold_sweep_reuses_scores(build_engine, signals):
+    model = CountingModel()
+    engine = build_engine()
+    engine.ai_model = model
+    scored = {SYMBOL: engine._prepare_ai(signals)}
+    assert model.calls == 1
+
+    def make_engine(threshold):
+        engine = build_engine()
+        engine.ai_model, engine.ai_threshold = model, threshold
+        # سیگنال‌ها نباید دوباره ساخته شوند
+        engine.strategy.generate_signals = None
+        return engine
+
+    portfolios = sweep_ai_thresholds(scored, [0.3, 0.5, 0.7], make_engine)
+    assert model.calls == 1
+
+    for threshold, portfolio in portfolios.items():
+        fresh = build_engine()
+        fresh.ai_model, fresh.ai_threshold = CountingModel(), threshold
+        fresh.run_signals({SYMBOL: signals.drop(columns=[AI_PROB_COL], errors="ignore")})
+        assert [repr(t) for t in portfolio.trades] == _trades(fresh)
+    counts = [len(portfolios[t].trades) for t in (0.3, 0.5, 0.7)]
+    assert counts[0] >= counts[1] >= counts[2]
+
+
+@pytest.fixture(scope="module")
+def merged_frames():
+    """چهار نماد با زمان‌های هم‌پوشان: کاملاً هم‌زمان، نیم‌ساعتی، و شروع دیرتر"""
+    strategy = DualSupertrendStrategy(settings.STRATEGY_PARAMS)
+    raw = {
+        "AAAUSDT": make_synthetic_ohlcv(4000, seed=1),
+        "BBBUSDT": make_synthetic_ohlcv(4000, seed=2),
+        "CCCUSDT": make_synthetic_ohlcv(6000, seed=3, freq="30min"),
+        "DDDUSDT": make_synthetic_ohlcv(3000, seed=4, start="2020-02-01"),
+    }
+    return {symbol: strategy.generate_signals(df) for symbol, df in raw.items()}
+
+
+def test_merged_loop_matches_per_timestamp_reference(build_engine, merged_reference_loop, merged_frames):
+    assets = [{"symbol": s, "weight": 0.25} for s in merged_frames]
+    engine = build_engine(assets, chronological=True)
+    engine._run_merged_loop(merged_frames)
+    reference = build_engine(assets, chronological=True)
+    stats = merged_reference_loop(reference, merged_frames)
+
+    # سناریو باید واقعاً رقابت سرمایه و خروج/ورود هم‌زمان را پوشش دهد
+    assert stats["capped"] > 0
+    assert stats["exit_entry_ties"] > 0
+    assert len(engine.portfolio.trades) > 0
+    assert _trades(engine) == _trades(reference)
+    assert engine.portfolio.capital == reference.portfolio.capital
+
+
+def test_single_symbol_chronological_matches_sequential(build_engine, signals):
+    sequential = build_engine()
+    sequential.run_signals({SYMBOL: signals})
+    merged = build_engine(chronological=True)
+    merged.run_signals({SYMBOL: signals})
+
+    assert len(merged.portfolio.trades) > 0
+    assert _trades(merged) == _trades(sequential)
@@ -0,0 +1,118 @@
+### tests/test_equity.py ###
+# منحنی سرمایه کندلی (EquityTracker) در برابر ارزش‌گذاری مستقیم هر timestamp
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.equity import EquityCurve, EquityTracker
+from core.portfolio import MultiAssetPortfolio
+
+INITIAL = 1000.0
+
+
+def _prices(n, seed, freq="1h", start="2020-01-01"):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n, freq=freq, name="open_time")
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), index=index)
+
+
+def _random_trades(portfolio, prices, seed, close_until=None):
+    """ورود و خروج تصادفی روی کندل‌های هر نماد، به ترتیب زمانی روی همه نمادها (خروج تا close_until)"""
+    rng = np.random.default_rng(seed)
+    bars = sorted(
+        (t, symbol, price) for symbol, series in prices.items() for t, price in series.items()
+    )
+    for t, symbol, price in bars:
+        if rng.random() > 0.1:
+            continue
+        if symbol in portfolio.positions:
+            if close_until is None or t <= close_until:
+                portfolio.close_position(symbol, price, t)
+        else:
+            portfolio.open_position(symbol, price, rng.uniform(0.5, 2), 0, np.inf, t)
+
+
+def _reference_equity(portfolio, prices, timeline):
+    """نقد + size * آخرین close هر نماد در هر timestamp (پوزیشن بی‌قیمت به بهای تمام شده)"""
+    events = portfolio.equity_tracker.events
+    symbols = {i: s for s, i in portfolio.equity_tracker.symbol_ids.items()}
+    event_times = events["time"].view("datetime64[ns]")
+    values = []
+    for t in timeline:
+        done = event_times <= t
+        value = INITIAL + events["cash"][done].sum()
+        for symbol_id, symbol in symbols.items():
+            mask = done & (events["symbol"] == symbol_id)
+            size = events["size"][mask].sum()
+            if np.isclose(size, 0):
+                continue
+            if symbol in prices:
+                value += size * prices[symbol][:t].iloc[-1]
+            else:
+                # فقط آخرین ورود باز است (ورود تنها وقتی پوزیشن بسته است انجام می‌شود)
+                value -= events["cash"][mask][-1]
+        values.append(value)
+    return np.array(values)
+
+
+def test_tracker_matches_per_timestamp_valuation():
+    prices = {
+        "AAAUSDT": _prices(500, 1),
+        "BBBUSDT": _prices(700, 2, freq="30min"),
+        "CCCUSDT": _prices(300, 3, start="2020-01-05"),
+    }
+    portfolio = MultiAssetPortfolio(INITIAL, [{"symbol": s} for s in prices])
+    for symbol, series in prices.items():
+        portfolio.register_prices(symbol, series.index, series.to_numpy())
+    _random_trades(portfolio, prices, seed=0, close_until=pd.Timestamp("2020-01-12"))
+
+    curve = portfolio.equity
+    # پوزیشن باز در انتها: ارزش روز، نه فقط نقد
+    assert portfolio.positions
+    np.testing.assert_allclose(curve.values, _reference_equity(portfolio, prices, curve.times), rtol=1e-12)
+
+
+def test_unpriced_symbol_keeps_realized_pnl():
+    prices = {"AAAUSDT": _prices(400, 4)}
+    unpriced = {"ZZZUSDT": _prices(400, 5, start="2020-01-02")}
+    portfolio = MultiAssetPortfolio(INITIAL, [{"symbol": "AAAUSDT"}, {"symbol": "ZZZUSDT"}])
+    portfolio.register_prices("AAAUSDT", prices["AAAUSDT"].index, prices["AAAUSDT"].to_numpy())
+    _random_trades(portfolio, {**prices, **unpriced}, seed=1)
+
+    zzz = portfolio.trades.to_frame().query("symbol == 'ZZZUSDT'")
+    assert len(zzz) > 0 and zzz["pnl"].abs().sum() > 0
+
+    curve = portfolio.equity
+    np.testing.assert_allclose(curve.values, _reference_equity(portfolio, prices, curve.times), rtol=1e-12)
+    # بدون پوزیشن باز بی‌قیمت، انتهای منحنی همه سود/زیان‌های بسته شده را دارد
+    if "ZZZUSDT" in portfolio.positions:
+        portfolio.close_position("ZZZUSDT", portfolio.positions["ZZZUSDT"].entry_price, curve.times[-1])
+    open_value = sum(
+        p.position_size * prices[s].iloc[-1] for s, p in portfolio.positions.items()
+    )
+    assert portfolio.equity.values[-1] == pytest.approx(portfolio.capital + open_value)
+
+
+def test_partial_close_at_cost_basis():
+    tracker = EquityTracker(INITIAL)
+    times = pd.date_range("2020-01-01", periods=4, freq="h")
+    tracker.record("ZZZUSDT", times[0], 2.0, -200.0)
+    tracker.record("ZZZUSDT", times[1], -1.0, 130.0)
+    tracker.record("ZZZUSDT", times[2], 1.0, -90.0)
+    tracker.record("ZZZUSDT", times[3], -2.0, 160.0)
+
+    # بهای تمام شده: 200 -> 100 -> 190 -> 0
+    np.testing.assert_allclose(tracker.build().values, INITIAL + np.array([0.0, 30.0, 30.0, 0.0]))
+
+
+def test_equity_curve_helpers():
+    times = pd.date_range("2020-01-01", periods=5, freq="15min").values.astype("datetime64[ns]")
+    curve = EquityCurve(times, np.array([100.0, 110.0, 99.0, 99.0, 120.0]))
+
+    assert len(curve) == 5 and curve[-1] == 120.0
+    assert curve.periods_per_year() == pytest.approx(365 * 24 * 4)
+    np.testing.assert_allclose(curve.returns(), [0.1, -0.1, 0.0, 120 / 99 - 1])
+    series = curve.to_series()
+    assert series.index.name == "time" and series.name == "equity"
+    assert series.index[0] == pd.Timestamp("2020-01-01")
+    assert EquityCurve(times[:1], np.array([1.0])).periods_per_year() is None
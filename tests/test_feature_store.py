@@ -0,0 +1,25 @@
+### tests/test_feature_store.py ###
+# انبار ویژگی: به‌روزرسانی افزایشی دُم باید با ساخت کامل برابر باشد
+import numpy as np
+
+from data import feature_store
+from scripts.build_features import MARKET_FEATURES
+from utils.helpers import make_synthetic_ohlcv
+
+SYMBOL = "SYNTHUSDT"
+
+
+def test_incremental_update_matches_full_build(tmp_path):
+    df = make_synthetic_ohlcv(5_000)
+    name = MARKET_FEATURES.name
+    incremental_root, full_root = tmp_path / "incremental", tmp_path / "full"
+
+    feature_store.update_features(SYMBOL, "1h", MARKET_FEATURES, ohlcv=df.iloc[:-24], root=incremental_root)
+    written = feature_store.update_features(SYMBOL, "1h", MARKET_FEATURES, ohlcv=df, root=incremental_root)
+    assert written < len(df)
+    feature_store.update_features(SYMBOL, "1h", MARKET_FEATURES, ohlcv=df, root=full_root, full=True)
+
+    incremental = feature_store.load_features(SYMBOL, "1h", name, root=incremental_root)
+    full = feature_store.load_features(SYMBOL, "1h", name, root=full_root)
+    assert incremental.index.equals(full.index)
+    np.testing.assert_allclose(incremental.to_numpy(), full.to_numpy(), rtol=1e-9, atol=1e-9)
@@ -0,0 +1,100 @@
+### tests/test_indicator_cache.py ###
+# کش LRU اندیکاتورها: حذف بر اساس بایت، لایه دیسک، اثر انگشت داده و شمارنده‌ها
+import numpy as np
+import pytest
+
+from core import indicators
+from core.indicators import IndicatorCache
+from utils.helpers import make_synthetic_ohlcv
+
+ROW_BYTES = 100 * 8
+
+
+def _key(name):
+    return ("test", (("period", name),), "fingerprint")
+
+
+@pytest.fixture
+def global_cache():
+    """کش سراسری خالی با تنظیمات قبلی که بعد از تست برگردانده می‌شود"""
+    cache = indicators._CACHE
+    saved = (cache.max_bytes, cache.disk_dir, cache.enabled, cache.hits, cache.disk_hits, cache.misses, cache.evictions)
+    cache.clear()
+    cache.hits = cache.disk_hits = cache.misses = cache.evictions = 0
+    cache.enabled = True
+    yield cache
+    cache.clear()
+    (cache.max_bytes, cache.disk_dir, cache.enabled, cache.hits, cache.disk_hits,
+     cache.misses, cache.evictions) = saved
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = IndicatorCache(max_bytes=3 * ROW_BYTES)
+    for name in "abc":
+        cache.put(_key(name), np.zeros(100))
+    cache.get(_key("a"))  # a تازه‌ترین می‌شود
+    cache.put(_key("d"), np.zeros(100))
+
+    assert cache.get(_key("b")) is None
+    assert all(cache.get(_key(name)) is not None for name in "acd")
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3 and stats["bytes"] == 3 * ROW_BYTES
+
+
+def test_oversized_entry_is_not_kept():
+    cache = IndicatorCache(max_bytes=ROW_BYTES)
+    cache.put(_key("a"), np.zeros(50))
+    cache.put(_key("big"), np.zeros(200))
+    assert cache.get(_key("big")) is None
+    assert cache.get(_key("a")) is not None
+    assert cache.stats()["evictions"] == 0
+
+
+def test_disk_tier_round_trip(tmp_path):
+    values = np.random.default_rng(0).normal(size=100)
+    IndicatorCache(disk_dir=str(tmp_path)).put(_key("a"), values)
+
+    cache = IndicatorCache(disk_dir=str(tmp_path))
+    loaded = cache.get(_key("a"))
+    np.testing.assert_array_equal(loaded, values)
+    assert not loaded.flags.writeable
+    # بعد از لود از دیسک در حافظه هم نگه داشته می‌شود
+    cache.get(_key("a"))
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 1, 0)
+
+
+def test_memory_only_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = IndicatorCache()
+    cache.put(_key("a"), np.zeros(10))
+    assert cache.disk_dir is None
+    assert not any(tmp_path.iterdir())
+
+
+def test_fingerprint_invalidates_on_data_change(global_cache):
+    df = make_synthetic_ohlcv(2_000)
+    first = indicators.calculate_atr(df, 14)
+    second = indicators.calculate_atr(df, 14)
+    assert (global_cache.hits, global_cache.misses) == (1, 1)
+    np.testing.assert_array_equal(second.to_numpy(), first.to_numpy())
+    assert second.index.equals(df.index)
+
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc("close")] *= 1.05
+    result = indicators.calculate_atr(changed, 14)
+    assert global_cache.misses == 2
+    np.testing.assert_array_equal(result.to_numpy(), indicators.calculate_atr.uncached(changed, 14).to_numpy())
+
+    # پارامتر متفاوت کلید جدید است
+    indicators.calculate_atr(df, 21)
+    assert global_cache.misses == 3
+    assert global_cache.stats()["hit_rate"] == pytest.approx(1 / 4)
+
+
+def test_cached_result_is_a_copy(global_cache):
+    df = make_synthetic_ohlcv(500)
+    indicators.calculate_atr(df, 14)
+    cached = indicators.calculate_atr(df, 14)
+    cached.iloc[-1] = -1.0
+    assert indicators.calculate_atr(df, 14).iloc[-1] != -1.0
@@ -0,0 +1,51 @@
+### tests/test_indicators.py ###
+# هسته‌های NumPy/numba اندیکاتورها در برابر نسخه‌های مرجع (حلقه پایتونی و pandas)
+import numpy as np
+import pytest
+
+from core import indicators
+from utils.helpers import make_synthetic_ohlcv
+
+N_BARS = 20_000
+
+
+@pytest.fixture(scope="module")
+def df():
+    return make_synthetic_ohlcv(N_BARS)
+
+
+@pytest.fixture(scope="module")
+def bands(df):
+    close = df["close"].to_numpy()
+    hl2 = ((df["high"] + df["low"]) / 2).to_numpy()
+    atr_val = indicators.calculate_atr(df, 10).fillna(0).to_numpy()
+    return hl2 + 3.0 * atr_val, hl2 - 3.0 * atr_val, close
+
+
+def test_supertrend_numpy_matches_loop(bands):
+    np.testing.assert_array_equal(indicators._supertrend_numpy(*bands), indicators._supertrend_loop(*bands))
+
+
+def test_supertrend_kernel_matches_loop(bands):
+    if not indicators._load_kernels():
+        pytest.skip("numba not installed")
+    np.testing.assert_array_equal(indicators._supertrend_kernel(*bands), indicators._supertrend_loop(*bands))
+
+
+def test_supertrend_batch_matches_single(df):
+    grid = [(10, 3.0), (7, 1.5), (20, 2.5)]
+    trends = indicators.supertrend_batch(df, grid)
+    for row, (period, multiplier) in enumerate(grid):
+        np.testing.assert_array_equal(trends[row], indicators.supertrend(df, period, multiplier).to_numpy())
+
+
+@pytest.mark.parametrize("name", ["atr", "rsi", "adx"])
+def test_kernel_matches_pandas(df, name):
+    high, low, close = (df[c].to_numpy() for c in ("high", "low", "close"))
+    out = np.empty(N_BARS)
+    legacy, kernel = {
+        "atr": (lambda: indicators._atr_pandas(df, 14), lambda: indicators.atr_kernel(high, low, close, 14, out=out)),
+        "rsi": (lambda: indicators._rsi_pandas(df["close"], 14), lambda: indicators.rsi_kernel(close, 14, out=out)),
+        "adx": (lambda: indicators._adx_pandas(df, 14), lambda: indicators.adx_kernel(high, low, close, 14, out=out)),
+    }[name]
+    np.testing.assert_array_equal(np.asarray(kernel()), np.asarray(legacy()))
@@ -0,0 +1,104 @@
+### tests/test_instrumentation.py ###
+# هیستوگرام تأخیر، رجیستری خاموش و خروجی‌های JSON / Prometheus
+import json
+
+import numpy as np
+import pytest
+
+from core.instrumentation import Histogram, LATENCY_BUCKETS, Registry
+
+
+def test_quantiles_stay_within_true_bucket():
+    values = np.random.default_rng(0).lognormal(np.log(2e-3), 1.0, 20_000)
+    hist = Histogram()
+    for value in values.tolist():
+        hist.observe(value)
+
+    bounds = (0.0,) + LATENCY_BUCKETS + (values.max(),)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q)
+        i = np.searchsorted(bounds, exact)
+        assert bounds[i - 1] <= hist.quantile(q) <= bounds[i]
+
+    assert hist.count == len(values)
+    assert hist.sum == pytest.approx(values.sum())
+    assert (hist.min, hist.max) == (values.min(), values.max())
+
+
+def test_quantile_interpolation_and_clamping():
+    hist = Histogram(bounds=(1.0, 2.0, 4.0))
+    assert hist.quantile(0.5) is None
+    assert hist.summary() == {"count": 0, "total": 0.0}
+
+    for value in (1.5, 1.5, 3.0, 3.0):
+        hist.observe(value)
+    # نصف مشاهدات در (1, 2]: چندک 0.25 وسط آن سطل است
+    assert hist.quantile(0.25) == pytest.approx(1.5)
+    assert hist.quantile(0.75) == pytest.approx(3.0)
+    # درون‌یابی از کمینه/بیشینه واقعی بیرون نمی‌زند
+    assert hist.quantile(0.0) == 1.5
+    assert hist.quantile(1.0) == 3.0
+
+    hist.observe(10.0)  # سطل +Inf تا بیشینه درون‌یابی می‌شود
+    assert hist.quantile(1.0) == 10.0
+    assert hist.summary()["p50"] == pytest.approx(2.5)
+
+
+def test_disabled_registry_is_a_no_op():
+    registry = Registry(enabled=False)
+
+    def func(x):
+        return x + 1
+
+    assert registry.wrap("stage", func) is func
+    with registry.timer("stage"):
+        pass
+    registry.count("events")
+    registry.gauge("equity", 1.0)
+    assert registry.summary()["timers"] == {}
+    assert registry.counters == {} and registry.gauges == {}
+
+
+def test_prometheus_exposition():
+    registry = Registry(enabled=True, prefix="trader")
+    registry.count("live.scans", 3)
+    registry.gauge("live.equity", 1012.5)
+    timed = registry.wrap("engine.bar-loop", lambda: None)
+    for _ in range(4):
+        timed()
+    registry.histogram("engine.bar-loop").observe(20.0)
+
+    lines = registry.to_prometheus().splitlines()
+    assert "# TYPE trader_live_scans_total counter" in lines
+    assert "trader_live_scans_total 3" in lines
+    assert "trader_live_equity 1012.5" in lines
+    assert "# TYPE trader_engine_bar_loop_seconds histogram" in lines
+
+    buckets = [line for line in lines if line.startswith("trader_engine_bar_loop_seconds_bucket")]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)  # سطل‌های تجمعی
+    assert buckets[-2] == 'trader_engine_bar_loop_seconds_bucket{le="10.0"} 4'
+    assert buckets[-1] == 'trader_engine_bar_loop_seconds_bucket{le="+Inf"} 5'
+    assert "trader_engine_bar_loop_seconds_count 5" in lines
+    assert any(line.startswith("trader_engine_bar_loop_seconds_sum 20.0") for line in lines)
+
+
+def test_write_json_and_prometheus_files(tmp_path):
+    registry = Registry(enabled=True)
+    with registry.timer("backtest.metrics"):
+        pass
+    registry.count("engine.bars", 100)
+
+    json_path = tmp_path / "profile" / "backtest_profile.json"
+    registry.write_json(json_path, trades=7)
+    data = json.loads(json_path.read_text())
+    assert data["counters"] == {"engine.bars": 100}
+    assert data["timers"]["backtest.metrics"]["count"] == 1
+    assert set(data["timers"]["backtest.metrics"]) >= {"p50", "p95", "p99", "mean"}
+    assert data["trades"] == 7
+
+    prom_path = tmp_path / "live.prom"
+    registry.write_prometheus(prom_path)
+    assert prom_path.read_text() == registry.to_prometheus()
+    assert [p.name for p in tmp_path.iterdir() if p.is_file()] == ["live.prom"]
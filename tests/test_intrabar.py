@@ -0,0 +1,71 @@
+### tests/test_intrabar.py ###
+# حل ابهام SL/TP با داده ریز (IntrabarResolver) در برابر پیمایش مستقیم کندل‌های 1m
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.intrabar import IntrabarResolver
+from data import store
+from data.resample import resample_ohlcv
+from utils.helpers import make_synthetic_ohlcv
+
+SYMBOL = "SYNTHUSDT"  # نماد پیش‌فرض build_engine در conftest
+RULE = "1h"
+FINE_TF = "1m"
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    fine = make_synthetic_ohlcv(200_000, freq="1min")
+    # تبدیل توانی یکنوا (ترتیب OHLC حفظ می‌شود) برای نوسان ~0.1% در دقیقه
+    prices = ["open", "high", "low", "close"]
+    fine[prices] = 100.0 * (fine[prices] / 100.0) ** 0.1
+    # دم‌های 10% پایین و بالا در ~5% کندل‌های اصلی تا کندل‌های مبهم ساخته شوند
+    rng = np.random.default_rng(0)
+    per_bar = int(pd.Timedelta(RULE) / pd.Timedelta("1min"))
+    shocked = rng.choice(len(fine) // per_bar, size=len(fine) // per_bar // 20, replace=False) * per_bar
+    fine.iloc[shocked + rng.integers(0, per_bar, len(shocked)), 2] *= 0.9
+    fine.iloc[shocked + rng.integers(0, per_bar, len(shocked)), 1] *= 1.1
+
+    root = tmp_path_factory.mktemp("intrabar")
+    store.write_ohlcv(SYMBOL, FINE_TF, fine, root)
+    return fine, resample_ohlcv(fine, RULE, FINE_TF), root
+
+
+def _reference(fine, start, duration, stop_loss, take_profit):
+    for high, low in fine.loc[start:start + duration - pd.Timedelta(1, "ns"), ["high", "low"]].to_numpy():
+        if low <= stop_loss:
+            return "SL"
+        if high >= take_profit:
+            return "TP"
+    return "SL"
+
+
+def test_resolve_matches_fine_bars(data):
+    fine, coarse, root = data
+    resolver = IntrabarResolver([FINE_TF], root=root)
+    resolver.attach(SYMBOL, coarse.index)
+
+    rng = np.random.default_rng(1)
+    bars = rng.integers(0, len(coarse), 500)
+    levels = np.sort(rng.uniform(coarse["low"].to_numpy()[bars, None], coarse["high"].to_numpy()[bars, None],
+                                 (len(bars), 2)), axis=1)
+    duration = pd.Timedelta(RULE)
+    for bar, (stop_loss, take_profit) in zip(bars.tolist(), levels.tolist()):
+        expected = _reference(fine, coarse.index[bar], duration, stop_loss, take_profit)
+        assert resolver.resolve(SYMBOL, bar, stop_loss, take_profit) == expected
+    assert resolver.stats["tp_first"] > 0 and resolver.stats["sl_first"] > 0
+
+
+def test_missing_fine_data_keeps_sl_first_rule(data, build_engine):
+    _, coarse, root = data
+    signals = build_engine().strategy.generate_signals(coarse)
+
+    baseline = build_engine()
+    baseline._simulate(SYMBOL, signals)
+    fallback = build_engine()
+    fallback.intrabar = IntrabarResolver(["5m"], root=root)
+    fallback._simulate(SYMBOL, signals)
+
+    assert len(baseline.portfolio.trades) > 0
+    assert [repr(t) for t in fallback.portfolio.trades] == [repr(t) for t in baseline.portfolio.trades]
@@ -0,0 +1,112 @@
+### tests/test_klines.py ###
+# دانلود افزایشی کندل‌ها با منبع محلی (LocalKlineSource)، حالت full و محدودیت نرخ
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import store
+from data.klines import LocalKlineSource, RateLimiter, interval_ms, sync_klines, to_ms
+
+SYMBOL = "SYNTHUSDT"
+START = "2020-01-01"
+
+
+class RecordingSource(LocalKlineSource):
+    """LocalKlineSource که start_ms هر درخواست را ثبت می‌کند"""
+
+    def __init__(self, now, **kwargs):
+        super().__init__(origin=START, now=now, **kwargs)
+        self.starts = []
+
+    def fetch_klines(self, symbol, interval, start_ms, limit=1000):
+        self.starts.append(start_ms)
+        return super().fetch_klines(symbol, interval, start_ms, limit)
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    return tmp_path / "store", tmp_path / "raw"
+
+
+def _sync(source, dirs, start=START, **kwargs):
+    root, raw = dirs
+    return sync_klines(source, SYMBOL, "1h", start, root=root, raw_dir=raw, **kwargs)
+
+
+def _stored(dirs):
+    root, raw = dirs
+    return store.load_ohlcv(SYMBOL, "1h", root=root), store.read_csv_ohlcv(store.csv_path(SYMBOL, "1h", raw))
+
+
+def test_incremental_resume_fetches_only_new_bars(tmp_path, dirs):
+    # now وسط یک کندل: کندل در حال تشکیل ذخیره نمی‌شود
+    first = RecordingSource(now="2020-03-01 10:30")
+    added = _sync(first, dirs)
+    df, _ = _stored(dirs)
+    assert added == len(df)
+    assert df.index[-1] == pd.Timestamp("2020-03-01 09:00")
+
+    second = RecordingSource(now="2020-05-01 00:30")
+    added = _sync(second, dirs)
+    assert second.starts[0] == to_ms(df.index[-1]) + interval_ms("1h")
+    assert added == len(pd.date_range("2020-03-01 10:00", "2020-04-30 23:00", freq="h"))
+
+    df, csv = _stored(dirs)
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    # برابر دانلود یکجا تا همان زمان
+    fresh_dirs = (tmp_path / "fresh_store", tmp_path / "fresh_raw")
+    _sync(RecordingSource(now="2020-05-01 00:30"), fresh_dirs)
+    expected, _ = _stored(fresh_dirs)
+    assert df.index.equals(expected.index)
+    np.testing.assert_array_equal(df.to_numpy(), expected.to_numpy())
+    # read_csv پیش‌فرض تا آخرین بیت round-trip نمی‌کند
+    np.testing.assert_allclose(csv.to_numpy(), expected.to_numpy(), rtol=1e-15)
+
+
+def test_up_to_date_dataset_makes_no_changes(dirs):
+    _sync(RecordingSource(now="2020-02-01"), dirs)
+    again = RecordingSource(now="2020-02-01 00:30")
+    assert _sync(again, dirs) == 0
+    df, csv = _stored(dirs)
+    assert len(df) == len(csv) == len(df.index.unique())
+
+
+def test_small_flushes_match_single_flush(tmp_path, dirs):
+    _sync(RecordingSource(now="2020-04-01"), dirs, flush_rows=700)
+    single_dirs = (tmp_path / "single_store", tmp_path / "single_raw")
+    _sync(RecordingSource(now="2020-04-01"), single_dirs)
+    (df, csv), (expected, _) = _stored(dirs), _stored(single_dirs)
+    np.testing.assert_array_equal(df.to_numpy(), expected.to_numpy())
+    # read_csv پیش‌فرض تا آخرین بیت round-trip نمی‌کند
+    np.testing.assert_allclose(csv.to_numpy(), expected.to_numpy(), rtol=1e-15)
+
+
+def test_full_mode_replaces_existing_dataset(tmp_path, dirs):
+    _sync(RecordingSource(now="2020-04-01"), dirs, start="2020-03-01")
+    full = RecordingSource(now="2020-04-01")
+    added = _sync(full, dirs, full=True)
+    assert full.starts[0] == to_ms(START)
+
+    df, csv = _stored(dirs)
+    assert added == len(df) == len(csv)
+    assert df.index[0] == pd.Timestamp(START)
+    assert df.index.is_unique
+
+
+def test_rate_limiter_paces_requests():
+    limiter = RateLimiter(rate=50.0, burst=1)
+    t0 = time.perf_counter()
+    for _ in range(11):
+        limiter.acquire()
+    # 10 فاصله 20ms بعد از اولین توکن
+    assert time.perf_counter() - t0 >= 0.19
+
+
+def test_rate_limiter_allows_burst():
+    limiter = RateLimiter(rate=2.0, burst=5)
+    t0 = time.perf_counter()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.perf_counter() - t0 < 0.1
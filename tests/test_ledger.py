@@ -0,0 +1,30 @@
+### tests/test_ledger.py ###
+# دفتر معاملات ستونی (TradeLedger) در برابر لیست dict ها
+import numpy as np
+import pandas as pd
+
+from core.ledger import TradeLedger, TRADE_FIELDS
+
+N_TRADES = 5_000
+
+
+def test_ledger_matches_dict_list():
+    rng = np.random.default_rng(0)
+    symbols = [f"SYN{i:03d}USDT" for i in range(50)]
+    times = pd.date_range("2020-01-01", periods=N_TRADES + 1, freq="h")
+    rows = [
+        (symbols[i % 50], price, price * 1.01, size, pnl, pnl / 10, times[i], times[i + 1], "TP" if pnl > 0 else "SL")
+        for i, (price, size, pnl) in enumerate(zip(
+            rng.uniform(10, 1000, N_TRADES), rng.uniform(0.1, 2, N_TRADES), rng.normal(0, 10, N_TRADES)
+        ))
+    ]
+    ledger = TradeLedger()
+    for row in rows:
+        ledger.record(*row)
+    dicts = [dict(zip(TRADE_FIELDS, row)) for row in rows]
+
+    assert len(ledger) == N_TRADES
+    assert repr(ledger[-100:]) == repr(dicts[-100:])
+    # DataFrame ساخته شده از dict ها واحد زمان Timestamp ها را نگه می‌دارد
+    frame = ledger.to_frame()
+    assert frame.equals(pd.DataFrame(dicts).astype(frame.dtypes))
@@ -0,0 +1,67 @@
+### tests/test_metrics.py ###
+# شاخص‌های برداری و MetricsAccumulator آنلاین در برابر حلقه پایتونی مرجع
+import numpy as np
+import pandas as pd
+
+from config import settings
+from backtest import metrics
+from core.equity import EquityCurve
+
+N_POINTS = 50_000
+
+
+def _equity(seed=0):
+    rng = np.random.default_rng(seed)
+    values = settings.INITIAL_CAPITAL * np.exp(np.cumsum(rng.normal(0.0, 0.001, N_POINTS)))
+    times = np.arange(N_POINTS).astype("datetime64[h]").astype("datetime64[ns]")
+    return values, times
+
+
+def test_max_drawdown_matches_loop():
+    values, times = _equity()
+    peak, expected = values[0], 0
+    for value in values.tolist():
+        if value > peak:
+            peak = value
+        expected = max(expected, (peak - value) / peak)
+    assert metrics.max_drawdown(values) == expected
+
+
+def test_accumulator_matches_vectorized():
+    values, times = _equity()
+    accumulator = metrics.MetricsAccumulator()
+    for i in range(0, N_POINTS, 7_000):
+        accumulator.update_many(values[i:i + 7_000], times[i:i + 7_000])
+    assert abs(accumulator.result()["Max Drawdown (%)"] - metrics.max_drawdown(values) * 100) < 1e-9
+
+
+def test_accumulator_matches_calculate_metrics():
+    values, times = _equity(1)
+    # فاصله‌های نامنظم (کندل‌های جا افتاده): میانه و میانگین فاصله متفاوت‌اند
+    rng = np.random.default_rng(2)
+    times = times[0] + np.cumsum(rng.choice([1, 1, 1, 2, 5], N_POINTS)).astype("timedelta64[h]")
+    pnl = rng.normal(1.0, 10.0, 500)
+    trades = [{"pnl": p, "symbol": f"SYN{i % 3}USDT"} for i, p in enumerate(pnl)]
+
+    expected = metrics.calculate_metrics(
+        trades, EquityCurve(times, values), values[0],
+        start_date=pd.Timestamp(times[0]), end_date=pd.Timestamp(times[-1])
+    )
+
+    single = metrics.MetricsAccumulator()
+    for value, time in zip(values[:1000].tolist(), times[:1000]):
+        single.update(value, time)
+    single.update_many(values[1000:], times[1000:])
+    chunked = metrics.MetricsAccumulator()
+    for i in range(0, N_POINTS, 7_000):
+        chunked.update_many(values[i:i + 7_000], times[i:i + 7_000])
+
+    for accumulator in (single, chunked):
+        for trade in trades:
+            accumulator.add_trade(trade["pnl"], trade["symbol"])
+        result = accumulator.result()
+        for key in ("Final Capital ($)", "Total Return (%)", "Max Drawdown (%)", "Sharpe Ratio",
+                    "Sortino Ratio", "Calmar Ratio", "Win Rate (%)", "Profit Factor", "Expectancy ($)"):
+            assert round(result[key], 2) == expected[key], key
+        assert result["Total Trades"] == expected["Total Trades"]
+        assert str(result["Max Drawdown Duration"]).split('.')[0] == expected["Max Drawdown Duration"]
@@ -0,0 +1,54 @@
+### tests/test_optimizer.py ###
+# سیگنال‌های بهینه‌ساز از اندیکاتورهای از پیش محاسبه شده در برابر DualSupertrendStrategy
+import numpy as np
+import pytest
+
+from config import settings
+from backtest.optimizer import entry_signals, grid_search_space, precompute_indicators
+from core.strategy import DualSupertrendStrategy
+from utils.helpers import make_synthetic_ohlcv
+
+
+@pytest.fixture(scope="module")
+def data_dict():
+    return {f"SYN{i}USDT": make_synthetic_ohlcv(3_000, seed=i) for i in range(2)}
+
+
+@pytest.mark.parametrize("trend_timeframe", [None, "4h"])
+def test_entry_signals_match_strategy(data_dict, trend_timeframe):
+    combos = grid_search_space(
+        {"ema_period": [50, 200], "st_multiplier": [2.0, 3.0], "trend_timeframe": [trend_timeframe]},
+        settings.STRATEGY_PARAMS,
+    )
+    arrays, trend_rows = precompute_indicators(data_dict, combos)
+    for params in combos:
+        for symbol, df in data_dict.items():
+            expected = DualSupertrendStrategy(params).generate_signals(df)["signal"].to_numpy()
+            np.testing.assert_array_equal(entry_signals(arrays, trend_rows, symbol, params), expected)
+
+
+def test_mixed_timeframes_share_fast_trends(data_dict):
+    combos = grid_search_space({"trend_timeframe": [None, "4h", "1d"]}, settings.STRATEGY_PARAMS)
+    arrays, trend_rows = precompute_indicators(data_dict, combos)
+    assert {timeframe for timeframe, *_ in trend_rows} == {None, "4h", "1d"}
+    for params in combos:
+        for symbol, df in data_dict.items():
+            expected = DualSupertrendStrategy(params).generate_signals(df)["signal"].to_numpy()
+            np.testing.assert_array_equal(entry_signals(arrays, trend_rows, symbol, params), expected)
+
+
+def test_param_overrides_cast_per_parameter():
+    from scripts.run_optimizer import parse_param_overrides
+
+    grid = parse_param_overrides(["st_period=7,10", "st_multiplier=2,3.5", "trend_timeframe=none,4h,1d"])
+    assert grid == {"st_period": [7, 10], "st_multiplier": [2.0, 3.5], "trend_timeframe": [None, "4h", "1d"]}
+    assert all(isinstance(v, float) for v in grid["st_multiplier"])
+    assert parse_param_overrides(None) == {}
+
+    for item in ("unknown=1", "st_period=", "st_period=none", "st_period=7.5"):
+        with pytest.raises(SystemExit):
+            parse_param_overrides([item])
+
+    # مقادیر پیش‌فرض PARAM_GRID با همان کلیدها قابل بازنویسی هستند
+    combos = grid_search_space({**settings.PARAM_GRID, **grid}, settings.STRATEGY_PARAMS)
+    assert {c["trend_timeframe"] for c in combos} == {None, "4h", "1d"}
@@ -0,0 +1,74 @@
+### tests/test_paper_trading.py ###
+# اسکن همزمان PaperTrader روی صرافی محلی (FakeExchange): سقف همزمانی، timeout نماد کند و خطای شبکه
+import asyncio
+import time
+
+import pytest
+
+from core.paper_account import PaperAccount
+from core.risk_manager import RiskManager
+from utils.fake_exchange import FakeExchange
+from scripts import run_paper_trading
+from scripts.run_paper_trading import PaperTrader
+
+SYMBOLS = [f"SYN{i:02d}USDT" for i in range(20)]
+
+
+@pytest.fixture
+def make_trader(tmp_path, capsys):
+    accounts = []
+
+    def make(exchange, symbols=SYMBOLS, concurrency=5):
+        account = PaperAccount(1000, tmp_path / f"wallet_{len(accounts)}.json", backend="json")
+        accounts.append(account)
+        return PaperTrader(exchange, account, RiskManager(account.capital, 0.01), None, symbols,
+                           concurrency=concurrency)
+
+    yield make
+    for account in accounts:
+        account.close()
+    capsys.readouterr()
+
+
+@pytest.mark.parametrize("concurrency", [1, 5])
+def test_requests_respect_concurrency_limit(make_trader, concurrency):
+    exchange = FakeExchange(latency=0.01, jitter=0.0)
+    trader = make_trader(exchange, concurrency=concurrency)
+    asyncio.run(trader.scan())
+
+    assert exchange.stats()["max_in_flight"] == concurrency
+    # هر نماد: یک ticker و یک ohlcv
+    assert exchange.stats()["calls"] == 2 * len(SYMBOLS)
+    assert set(trader.states) == set(SYMBOLS)
+
+
+def test_slow_symbol_times_out_without_stalling_others(make_trader, monkeypatch):
+    monkeypatch.setattr(run_paper_trading, "FETCH_TIMEOUT", 0.2)
+    exchange = FakeExchange(latency=0.01, jitter=0.0, slow_symbols={SYMBOLS[0]: 5.0})
+    trader = make_trader(exchange, concurrency=5)
+
+    t0 = time.perf_counter()
+    asyncio.run(trader.scan())
+    elapsed = time.perf_counter() - t0
+
+    assert elapsed < 1.5
+    assert SYMBOLS[0] not in trader.states and SYMBOLS[0] not in trader.last_prices
+    assert set(trader.states) == set(SYMBOLS[1:])
+
+
+def test_network_failures_are_isolated_and_recovered(make_trader):
+    exchange = FakeExchange(latency=0.001, jitter=0.0, failure_rate=0.5, seed=1)
+    trader = make_trader(exchange)
+
+    async def scans():
+        await trader.scan()
+        warmed = set(trader.states)
+        # بعد از رفع خطا نمادهای باقی‌مانده در سیکل بعد گرم می‌شوند
+        exchange.failure_rate = 0.0
+        await trader.scan()
+        return warmed
+
+    warmed = asyncio.run(scans())
+    assert 0 < len(warmed) < len(SYMBOLS)
+    assert set(trader.states) == set(SYMBOLS)
+    assert all(state.last_time is not None for state in trader.states.values())
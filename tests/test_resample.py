@@ -0,0 +1,58 @@
+### tests/test_resample.py ###
+# تجمیع برداری تایم فریم‌ها، کش data/derived و هم‌ترازی بدون نگاه به آینده
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import resample, store
+from utils.helpers import make_synthetic_ohlcv
+
+SYMBOL = "SYNTHUSDT"
+TIMEFRAMES = ("15m", "1h", "4h", "1d")
+N_BARS = 20_000
+NEW_BARS = 1_440
+
+
+@pytest.fixture(scope="module")
+def base():
+    return make_synthetic_ohlcv(N_BARS + NEW_BARS, freq="1min")
+
+
+@pytest.mark.parametrize("timeframe", TIMEFRAMES)
+def test_resample_matches_pandas(base, timeframe):
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    expected = base.resample(pd.Timedelta(resample.timeframe_ns(timeframe), "ns")).agg(agg).dropna()
+    got = resample.resample_ohlcv(base, timeframe)
+    prices = ["open", "high", "low", "close"]
+    assert expected.index.equals(got.index)
+    assert expected[prices].equals(got[prices])
+    # جمع حجم در pandas ترتیب جمع متفاوتی دارد
+    np.testing.assert_allclose(got["volume"], expected["volume"], rtol=1e-12, atol=0)
+
+
+def test_incremental_cache_matches_full_resample(tmp_path, base):
+    root, derived = tmp_path / "store", tmp_path / "derived"
+    store.write_ohlcv(SYMBOL, "1m", base.iloc[:N_BARS], root)
+    for timeframe in TIMEFRAMES:
+        resample.update_resampled(SYMBOL, timeframe, "1m", root, derived)
+    assert sum(resample.update_resampled(SYMBOL, tf, "1m", root, derived) for tf in TIMEFRAMES) == 0
+
+    store.append_ohlcv(SYMBOL, "1m", base.iloc[N_BARS:], root)
+    for timeframe in TIMEFRAMES:
+        resample.update_resampled(SYMBOL, timeframe, "1m", root, derived)
+        loaded = resample.load_timeframe(SYMBOL, timeframe, root=root, derived_root=derived)
+        assert loaded.equals(resample.resample_ohlcv(base, timeframe, "1m"))
+
+
+def test_align_to_uses_only_closed_bars(base):
+    hourly, daily = resample.resample_ohlcv(base, "1h"), resample.resample_ohlcv(base, "1d")
+    positions = resample.align_to(daily.index.values, "1d", hourly.index.values, "1h")
+    daily_close = daily.index.values + np.timedelta64(1, "D")
+    hourly_close = hourly.index.values + np.timedelta64(1, "h")
+
+    used = positions >= 0
+    assert used.any() and not used.all()
+    assert (daily_close[positions[used]] <= hourly_close[used]).all()
+    # کندل روزانه بعدی هنوز بسته نشده است
+    following = positions + 1 < len(daily)
+    assert (daily_close[positions[following] + 1] > hourly_close[following]).all()
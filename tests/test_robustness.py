@@ -0,0 +1,37 @@
+### tests/test_robustness.py ###
+# Monte Carlo برداری تکه‌ای: شاخص‌های هر مسیر برابر توابع تکی metrics
+import numpy as np
+import pytest
+
+from config import settings
+from backtest import robustness
+from backtest.metrics import max_drawdown, sharpe_ratio
+
+PERIODS = 24 * 365
+MAX_BYTES = 32 * 1024 ** 2
+
+
+@pytest.fixture(scope="module")
+def pnl():
+    return np.random.default_rng(0).normal(2.0, 20.0, 1_000)
+
+
+def test_path_stats_match_metrics(pnl):
+    paths = next(robustness.trade_shuffle_paths(pnl, settings.INITIAL_CAPITAL, 200, np.random.default_rng(1), MAX_BYTES))
+    max_dd, final, sharpe = robustness.path_stats(paths, PERIODS)
+    for i, row in enumerate(paths):
+        assert abs(max_dd[i] - max_drawdown(row)) < 1e-12
+        assert final[i] == row[-1]
+        assert abs(sharpe[i] - sharpe_ratio(np.diff(row) / row[:-1], PERIODS)) < 1e-9
+
+
+def test_chunks_cover_all_paths_within_memory_limit(pnl):
+    capital = settings.INITIAL_CAPITAL
+    max_bytes = 256 * 1024
+    chunks = list(robustness.trade_shuffle_paths(pnl, capital, 500, np.random.default_rng(3), max_bytes))
+    assert len(chunks) > 1
+    assert sum(len(paths) for paths in chunks) == 500
+    for paths in chunks:
+        assert paths.nbytes * robustness.WORK_ARRAYS <= max_bytes
+        # جایگشت ترتیب تریدها سرمایه نهایی را تغییر نمی‌دهد
+        np.testing.assert_allclose(paths[:, -1], capital + pnl.sum(), rtol=1e-12)
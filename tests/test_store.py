@@ -0,0 +1,52 @@
+### tests/test_store.py ###
+# انبار ستونی: append در جا، بازیابی append قطع شده و CSV خام
+import numpy as np
+import pytest
+
+from data import store
+from utils.helpers import make_synthetic_ohlcv
+
+
+@pytest.fixture
+def df():
+    return make_synthetic_ohlcv(5_000)
+
+
+def _assert_same(loaded, df):
+    """انبار همیشه datetime64[ns] ذخیره می‌کند"""
+    np.testing.assert_array_equal(loaded.index.values, df.index.values.astype("datetime64[ns]"))
+    np.testing.assert_array_equal(loaded[store.OHLCV_COLUMNS].to_numpy(), df[store.OHLCV_COLUMNS].to_numpy())
+
+
+def test_append_in_chunks_matches_full_write(tmp_path, df):
+    store.write_ohlcv("X", "1h", df.iloc[:1_000], tmp_path)
+    # بازه‌های هم‌پوشان: ردیف‌های تکراری نادیده گرفته می‌شوند
+    for lo in range(500, len(df), 700):
+        store.append_ohlcv("X", "1h", df.iloc[lo:lo + 700], tmp_path)
+
+    _assert_same(store.load_ohlcv("X", "1h", root=tmp_path), df)
+    assert np.load(store.dataset_dir("X", "1h", tmp_path) / "close.npy").shape == (len(df),)
+    assert store.last_open_time("X", "1h", tmp_path) == df.index[-1]
+
+
+def test_interrupted_append_is_invisible_and_recovered(tmp_path, df):
+    store.write_ohlcv("X", "1h", df.iloc[:3_000], tmp_path)
+    # append قطع شده قبل از meta.json: داده و header جلوتر از meta
+    directory = store.dataset_dir("X", "1h", tmp_path)
+    assert store._append_npy(directory / "close.npy", 3_000, np.full(10, -1.0))
+    assert len(store.load_ohlcv("X", "1h", root=tmp_path)) == 3_000
+
+    store.append_ohlcv("X", "1h", df.iloc[3_000:], tmp_path)
+    _assert_same(store.load_ohlcv("X", "1h", root=tmp_path), df)
+
+
+def test_csv_append_in_place_drops_partial_line(tmp_path, df):
+    path = tmp_path / "X_1h.csv"
+    df.iloc[:100].to_csv(path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2020-01-05 04:00:00,1.0,2")  # خط ناقص append قطع شده
+
+    assert store.append_csv_ohlcv(path, df.iloc[50:200]) == 100
+    expected = tmp_path / "expected.csv"
+    df.iloc[:200].to_csv(expected)
+    assert path.read_bytes() == expected.read_bytes()
@@ -0,0 +1,154 @@
+### tests/test_streaming.py ###
+# برابری اندیکاتورهای جریانی (core/streaming) با نسخه‌های batch (core/indicators) روی داده ثابت
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import settings
+from core import indicators, streaming
+from core.features import AI_PIPELINE
+from core.strategy import DualSupertrendStrategy
+from utils.helpers import make_synthetic_ohlcv
+
+N_BARS = 3_000
+
+
+@pytest.fixture(scope="module")
+def df():
+    return make_synthetic_ohlcv(N_BARS, seed=7)
+
+
+def _run(stream, *columns):
+    return np.array([stream.update(*row) for row in zip(*(np.asarray(c).tolist() for c in columns))])
+
+
+def _series_with_gaps(seed=3):
+    """سری با NaN پراکنده و یک بازه ثابت (حالت‌های خاص جمع جاری)"""
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(0.0, 1.0, N_BARS) * 1e3
+    values[rng.random(N_BARS) < 0.05] = np.nan
+    values[500:600] = 5.0
+    return values
+
+
+def test_ema_matches_batch(df):
+    expected = indicators.ema(df["close"], 50).to_numpy()
+    np.testing.assert_array_equal(_run(streaming.StreamingEMA(50), df["close"]), expected)
+
+
+def test_atr_matches_batch(df):
+    expected = indicators.calculate_atr(df, 14).to_numpy()
+    np.testing.assert_array_equal(_run(streaming.StreamingATR(14), df["high"], df["low"], df["close"]), expected)
+
+
+def test_rsi_matches_batch(df):
+    expected = indicators.calculate_rsi(df["close"], 14).to_numpy()
+    np.testing.assert_array_equal(_run(streaming.StreamingRSI(14), df["close"]), expected)
+
+
+def test_adx_matches_batch(df):
+    expected = indicators.calculate_adx(df, 14).to_numpy()
+    np.testing.assert_array_equal(_run(streaming.StreamingADX(14), df["high"], df["low"], df["close"]), expected)
+
+
+@pytest.mark.parametrize("window", [1, 2, 20])
+def test_rolling_mean_matches_batch(window):
+    values = _series_with_gaps()
+    expected = indicators.rolling_mean_kernel(values, window)
+    np.testing.assert_array_equal(_run(streaming.StreamingRollingMean(window), values), expected)
+    np.testing.assert_array_equal(expected, pd.Series(values).rolling(window).mean().to_numpy())
+
+
+@pytest.mark.parametrize("window", [2, 3, 20])
+def test_rolling_std_matches_batch(window):
+    values = _series_with_gaps()
+    expected = pd.Series(values).rolling(window).std().to_numpy()
+    # روی بازه ثابت pandas باقیمانده عددی (نه صفر) برمی‌گرداند
+    np.testing.assert_allclose(_run(streaming.StreamingRollingStd(window), values), expected,
+                               rtol=1e-9, atol=1e-3)
+
+
+def test_supertrend_matches_batch(df):
+    expected = indicators.supertrend(df, 10, 3.0).to_numpy()
+    stream = _run(streaming.StreamingSupertrend(10, 3.0), df["high"], df["low"], df["close"])
+    np.testing.assert_array_equal(stream, expected)
+
+
+def test_strategy_stream_matches_signals(df):
+    params = settings.STRATEGY_PARAMS
+    signals = DualSupertrendStrategy(params).generate_signals(df)
+    stream = streaming.StrategyStream(params)
+    signal, atr = [], []
+    for high, low, close in zip(df["high"].tolist(), df["low"].tolist(), df["close"].tolist()):
+        signal.append(stream.update(high, low, close))
+        atr.append(stream.atr.value)
+    np.testing.assert_array_equal(signal, signals["signal"].to_numpy())
+    np.testing.assert_allclose(atr, signals["atr"].to_numpy(), rtol=1e-9)
+
+
+def test_feature_stream_matches_pipeline(df):
+    expected = AI_PIPELINE.compute(df).to_numpy()
+    stream = AI_PIPELINE.stream()
+    rows = np.full_like(expected, np.nan)
+    columns = [df[c].tolist() for c in ("high", "low", "close", "volume")]
+    for i, bar in enumerate(zip(*columns)):
+        features = stream.update(*bar)
+        if features is not None:
+            rows[i] = features[0]
+    valid = ~np.isnan(expected).any(axis=1)
+    np.testing.assert_allclose(rows[valid], expected[valid], rtol=1e-7)
+
+
+def test_pipeline_matches_indicators(df):
+    returns = df["close"].pct_change()
+    volume = df["volume"]
+    expected = np.column_stack([
+        indicators.calculate_atr(df).to_numpy() / df["close"].to_numpy(),
+        returns.rolling(20).std().to_numpy(),
+        indicators.calculate_rsi(df["close"]).to_numpy(),
+        indicators.calculate_adx(df).to_numpy(),
+        ((volume - volume.rolling(20).mean()) / volume.rolling(20).std()).to_numpy(),
+    ])
+    np.testing.assert_array_equal(AI_PIPELINE.compute(df).to_numpy(), expected)
+
+
+def test_pipeline_last_row_matches_batch(df):
+    batch = AI_PIPELINE.compute(df).to_numpy()
+    for end in (N_BARS // 4, N_BARS // 2, N_BARS):
+        np.testing.assert_array_equal(AI_PIPELINE.compute_last(df.iloc[:end])[0], batch[end - 1])
+
+
+@pytest.mark.parametrize("trend_timeframe", ["4h", "1d"])
+def test_strategy_stream_matches_higher_timeframe_signals(df, trend_timeframe):
+    params = dict(settings.STRATEGY_PARAMS, ema_period=20, trend_timeframe=trend_timeframe)
+    # شکاف داده: کندل‌های حذف شده شامل آخرین کندل 1h چند بازه بالاتر هستند
+    bars = df.drop(df.index[[100, 101, 500, 1_247]])
+    expected = DualSupertrendStrategy(params).generate_signals(bars)
+    assert expected["signal"].any()
+
+    stream = streaming.StrategyStream(params, "1h")
+    columns = [bars[c].tolist() for c in ("high", "low", "close")]
+    signal = [stream.update(high, low, close, time) for time, high, low, close in zip(bars.index.values, *columns)]
+    np.testing.assert_array_equal(signal, expected["signal"].to_numpy())
+
+
+def test_higher_timeframe_stream_needs_base_timeframe():
+    with pytest.raises(ValueError, match="timeframe"):
+        streaming.StrategyStream(dict(settings.STRATEGY_PARAMS, trend_timeframe="4h"))
+
+
+def test_higher_timeframe_stream_needs_bar_time(df):
+    stream = streaming.StrategyStream(dict(settings.STRATEGY_PARAMS, trend_timeframe="4h"), "1h")
+    with pytest.raises(ValueError, match="open time"):
+        stream.update(df["high"].iloc[0], df["low"].iloc[0], df["close"].iloc[0])
+
+
+@pytest.mark.parametrize("trend_timeframe", [None, "4h"])
+def test_seed_strategy_stream_from_history(df, trend_timeframe):
+    params = dict(settings.STRATEGY_PARAMS, ema_period=20, trend_timeframe=trend_timeframe)
+    expected = DualSupertrendStrategy(params).generate_signals(df)
+    stream = streaming.seed_from_history(streaming.StrategyStream(params, "1h"), df.iloc[:-1])
+    last = df.iloc[-1]
+    assert stream.update(last["high"], last["low"], last["close"], df.index[-1]) == expected["signal"].iloc[-1]
+    assert stream.signal == expected["signal"].iloc[-1]
+    np.testing.assert_array_equal(stream.ema_long.value, expected["ema_long"].iloc[-1])
@@ -0,0 +1,53 @@
+### tests/test_tree_model.py ###
+# ارزیاب NumPy درخت‌های صادر شده (core/tree_model) در برابر XGBClassifier.predict_proba
+import numpy as np
+import pytest
+
+from config import settings
+from core.features import AI_FEATURE_COLS, AI_PIPELINE, load_model, save_model
+from core.tree_model import TreeModel, export_trees, load_trees
+from utils.helpers import make_synthetic_ohlcv
+
+xgboost = pytest.importorskip("xgboost")
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    df = make_synthetic_ohlcv(10_000)
+    features = AI_PIPELINE.compute(df)
+    target = (df["close"].shift(-8) / df["close"] - 1 > 0.01).astype(int)
+    data = features.assign(target=target).dropna()
+    model = xgboost.XGBClassifier(**settings.AI_MODEL_PARAMS).fit(data[AI_FEATURE_COLS], data["target"])
+
+    rng = np.random.default_rng(0)
+    rows = data[AI_FEATURE_COLS].to_numpy()[rng.integers(0, len(data), 5_000)]
+    model_path = tmp_path_factory.mktemp("model") / "model.pkl"
+    save_model(model, model_path)
+    return model, model_path, rows
+
+
+def test_export_matches_xgboost(trained):
+    model, model_path, rows = trained
+    _, max_diff = export_trees(model, model_path, rows)
+    assert max_diff <= 1e-6
+
+    trees = load_trees(model_path)
+    np.testing.assert_allclose(trees.predict_proba(rows), model.predict_proba(rows), rtol=0, atol=1e-6)
+    threshold = settings.AI_PROBA_THRESHOLD
+    assert ((trees.predict_proba(rows)[:, 1] > threshold) == (model.predict_proba(rows)[:, 1] > threshold)).all()
+
+
+def test_missing_values_follow_default_branch(trained):
+    model, model_path, rows = trained
+    export_trees(model, model_path)
+    with_nan = rows.copy()
+    with_nan[np.random.default_rng(1).random(rows.shape) < 0.2] = np.nan
+    np.testing.assert_allclose(load_trees(model_path).predict_proba(with_nan)[:, 1],
+                               model.predict_proba(with_nan)[:, 1], rtol=0, atol=1e-6)
+
+
+def test_load_model_prefers_exported_trees(trained):
+    model, model_path, _ = trained
+    export_trees(model, model_path)
+    assert isinstance(load_model(model_path, prefer_trees=True), TreeModel)
+    assert not isinstance(load_model(model_path), TreeModel)
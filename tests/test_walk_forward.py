@@ -0,0 +1,92 @@
+### tests/test_walk_forward.py ###
+# پنجره‌های walk-forward: بدون هم‌پوشانی افق برچسب آموزش با آزمون و foldهای بدون داده آزمون
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import settings
+from backtest import walk_forward
+from backtest.walk_forward import TARGET_HORIZON, build_target, make_folds, prepare_assets, _fold_rows
+from core.strategy import DualSupertrendStrategy
+from utils.helpers import make_synthetic_ohlcv
+
+SYMBOL = "SYNTHUSDT"
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+def test_make_folds_are_contiguous(expanding):
+    start, end = pd.Timestamp("2020-01-01"), pd.Timestamp("2020-07-10")
+    folds = make_folds(start, end, "60D", "30D", expanding=expanding)
+
+    assert [f["fold"] for f in folds] == list(range(len(folds)))
+    for prev, fold in zip(folds, folds[1:]):
+        assert fold["test_start"] == prev["test_end"]
+    for fold in folds:
+        assert fold["train_end"] == fold["test_start"]
+        assert fold["train_start"] == (start if expanding else fold["test_start"] - pd.Timedelta("60D"))
+    # 9 روز باقی‌مانده کمتر از نصف پنجره آزمون است و fold ناقص ساخته نمی‌شود
+    assert folds[-1]["test_end"] == pd.Timestamp("2020-06-29")
+    assert make_folds(start, end + pd.Timedelta("6D"), "60D", "30D")[-1]["test_end"] == end + pd.Timedelta("6D")
+
+
+@pytest.mark.parametrize("step", [None, "7D"])
+def test_training_labels_stop_before_test_window(step):
+    index = make_synthetic_ohlcv(6_000).index
+    times = index.values.astype("datetime64[ns]").view(np.int64)
+    folds = make_folds(index[0], index[-1], "40D", "20D", step=step)
+    assert len(folds) > 3
+
+    for fold in folds:
+        train_lo, train_hi, test_lo, test_hi = _fold_rows(times, fold)
+        assert index[test_lo] >= fold["test_start"] > index[test_lo - 1]
+        assert index[test_hi - 1] < fold["test_end"]
+        # برچسب آخرین ردیف آموزش از close قبل از پنجره آزمون ساخته می‌شود
+        assert index[train_hi - 1 + TARGET_HORIZON] < fold["test_start"]
+        # و ردیف بعدی (اولین ردیف حذف شده) به پنجره آزمون می‌رسید
+        assert index[train_hi + TARGET_HORIZON] >= fold["test_start"]
+        assert index[train_lo] >= fold["train_start"]
+
+
+def test_training_labels_ignore_test_prices():
+    close = make_synthetic_ohlcv(3_000)["close"]
+    times = close.index.values.astype("datetime64[ns]").view(np.int64)
+    fold = make_folds(close.index[0], close.index[-1], "60D", "30D")[0]
+    train_lo, train_hi, test_lo, _ = _fold_rows(times, fold)
+
+    # تغییر قیمت‌های پنجره آزمون برچسب هیچ ردیف آموزشی را عوض نمی‌کند
+    shocked = close.to_numpy().copy()
+    shocked[test_lo:] *= 10
+    np.testing.assert_array_equal(
+        build_target(close)[train_lo:train_hi], build_target(shocked)[train_lo:train_hi]
+    )
+    assert not np.array_equal(build_target(close)[train_lo:test_lo], build_target(shocked)[train_lo:test_lo])
+
+
+def test_fold_without_test_rows_is_skipped(monkeypatch):
+    df = make_synthetic_ohlcv(3_000)
+    # وقفه 20 روزه در داده
+    df = pd.concat([df.iloc[:2_000], df.iloc[2_480:]])
+    arrays = prepare_assets({SYMBOL: df}, DualSupertrendStrategy(settings.STRATEGY_PARAMS))
+    monkeypatch.setattr(walk_forward, "_WORKER", {
+        "arrays": arrays,
+        "symbols": [SYMBOL],
+        "assets_config": [{"symbol": SYMBOL, "weight": 1.0}],
+        "settings": {
+            "strategy_params": settings.STRATEGY_PARAMS,
+            "model_params": {"n_estimators": 10, "max_depth": 3, "n_jobs": 1},
+            "initial_capital": settings.INITIAL_CAPITAL,
+            "risk_per_trade": settings.RISK_PER_TRADE,
+            "threshold": 0.5,
+            "chronological": False,
+        },
+    })
+
+    gap_start = df.index[1_999] + pd.Timedelta("2h")
+    fold = {
+        "fold": 0, "train_start": df.index[0], "train_end": gap_start,
+        "test_start": gap_start, "test_end": gap_start + pd.Timedelta("10D"),
+    }
+    row = walk_forward._run_fold(fold)
+    assert row["Train Rows"] > 0
+    assert row["Test Rows"] == 0
+    assert "Total Return (%)" not in row
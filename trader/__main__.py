@@ -0,0 +1,7 @@
+### trader/__main__.py ###
+# python -m trader <command> [options]
+import sys
+
+from trader.cli import main
+
+sys.exit(main())
@@ -0,0 +1,54 @@
+### trader/cli.py ###
+# نقطه ورود واحد همه اسکریپت‌ها: python -m trader <command> [options]
+# هر دستور فقط هنگام اجرا ماژول اسکریپت خودش را import می‌کند و باقی آرگومان‌ها را به main(argv)
+# آن می‌دهد؛ پس `trader --help` هیچ کتابخانه سنگینی (pandas، xgboost، sklearn، ccxt، numba)
+# را لود نمی‌کند و هر دستور فقط هزینه import وابستگی‌های خودش را می‌پردازد.
+import sys
+import argparse
+import importlib
+
+
+# دستور -> (ماژول اسکریپت، توضیح)
+COMMANDS = {
+    "download": ("scripts.download_data", "incremental kline download into data/raw and data/store"),
+    "convert": ("scripts.convert_raw_to_store", "convert data/raw CSV files into the columnar store"),
+    "build-features": ("scripts.build_features", "update the partitioned feature store"),
+    "train": ("scripts.train_ai_model", "train (or re-export) the XGBoost market filter"),
+    "backtest": ("scripts.run_backtest", "backtest every asset in config/assets.yaml"),
+    "optimize": ("scripts.run_optimizer", "strategy parameter search"),
+    "walk-forward": ("scripts.run_walk_forward", "walk-forward validation of the AI filter"),
+    "robustness": ("scripts.run_robustness", "Monte Carlo robustness of the backtest results"),
+    "paper": ("scripts.run_paper_trading", "paper trading bot"),
+    "benchmark": ("scripts.benchmark", "performance benchmarks"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="trader", description="Crypto backtesting and paper trading",
+        epilog="run `trader <command> --help` for the options of each command",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="<command>", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        # گزینه‌های هر دستور را خود اسکریپت تعریف و پردازش می‌کند
+        commands.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS:
+        # --help، دستور نامعتبر یا بدون دستور: پیام argparse و خروج
+        build_parser().parse_args(argv)
+        return 2
+
+    command, rest = argv[0], argv[1:]
+    module = importlib.import_module(COMMANDS[command][0])
+    # نام برنامه در --help و پیام‌های خطای argparse اسکریپت
+    sys.argv[0] = f"trader {command}"
+    try:
+        module.main(rest)
+    except KeyboardInterrupt:
+        print(f"\n👋 trader {command} stopped manually.")
+        return 130
+    return 0
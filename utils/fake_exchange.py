@@ -0,0 +1,92 @@
+### utils/fake_exchange.py ###
+# صرافی محلی (بدون شبکه) با همان متدهای async مورد استفاده از ccxt.async_support،
+# برای اجرای آفلاین ربات پیپر تریدینگ و تست بار روی تعداد زیادی نماد.
+# کندل‌ها مصنوعی و قطعی هستند و با گذشت زمان واقعی یکی یکی "باز" می‌شوند.
+import time
+import zlib
+import asyncio
+import random
+
+import numpy as np
+
+from utils.helpers import make_synthetic_ohlcv
+
+
+class FakeNetworkError(Exception):
+    """شبیه‌سازی خطای شبکه (معادل ccxt.NetworkError)"""
+
+
+class FakeExchange:
+    """
+    latency: تأخیر پایه هر درخواست (ثانیه) و jitter نوسان تصادفی آن.
+    slow_symbols: {symbol: تأخیر اضافه} برای شبیه‌سازی نماد کند.
+    bar_seconds: هر چند ثانیه زمان واقعی یک کندل جدید باز شود.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.02, failure_rate=0.0, slow_symbols=None,
+                 bar_seconds=60.0, history=1000, n_bars=5000, freq="1h", seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.slow_symbols = dict(slow_symbols or {})
+        self.bar_seconds = bar_seconds
+        self.history = history
+        self.n_bars = n_bars
+        self.freq = freq
+        self.seed = seed
+
+        self.rng = random.Random(seed)
+        self.started = time.monotonic()
+        self.markets = {}
+
+        # آمار برای تست بار
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _market(self, symbol):
+        """سری مصنوعی هر نماد یک بار و با seed ثابت (وابسته به نام نماد) ساخته می‌شود"""
+        if symbol not in self.markets:
+            df = make_synthetic_ohlcv(
+                self.n_bars, seed=zlib.crc32(symbol.encode()) ^ self.seed, freq=self.freq
+            )
+            times = (df.index.values.astype("datetime64[ms]").astype(np.int64)).tolist()
+            columns = [df[c].tolist() for c in ("open", "high", "low", "close", "volume")]
+            self.markets[symbol] = [[t, *values] for t, values in zip(times, zip(*columns))]
+        return self.markets[symbol]
+
+    def _cursor(self):
+        """ایندکس کندل جاری (باز)؛ با گذشت زمان جلو می‌رود"""
+        elapsed = int((time.monotonic() - self.started) / self.bar_seconds)
+        return min(self.history + elapsed, self.n_bars - 1)
+
+    async def _request(self, symbol):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self.latency + self.slow_symbols.get(symbol, 0.0)
+            if self.jitter:
+                delay += self.rng.uniform(0, self.jitter)
+            await asyncio.sleep(delay)
+            if self.failure_rate and self.rng.random() < self.failure_rate:
+                raise FakeNetworkError(f"simulated network error for {symbol}")
+        finally:
+            self.in_flight -= 1
+
+    async def fetch_ticker(self, symbol):
+        await self._request(symbol)
+        bar = self._market(symbol)[self._cursor()]
+        return {"symbol": symbol, "timestamp": bar[0], "last": bar[4]}
+
+    async def fetch_ohlcv(self, symbol, timeframe="1h", limit=500):
+        await self._request(symbol)
+        cursor = self._cursor()
+        # آخرین ردیف همان کندل در حال تشکیل است (مثل صرافی واقعی)
+        return [list(bar) for bar in self._market(symbol)[max(0, cursor + 1 - limit):cursor + 1]]
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"calls": self.calls, "max_in_flight": self.max_in_flight}
@@ -1,6 +1,42 @@
+import os
+import numpy as np
 import pandas as pd
 
 
 def load_data(path):
+    # پوشه دیتاست انبار ستونی (data/store/SYMBOL_TF) یا فایل CSV
+    if os.path.isdir(path):
+        from data.store import load_ohlcv
+        symbol, _, timeframe = os.path.basename(os.path.normpath(path)).partition("_")
+        return load_ohlcv(symbol, timeframe, root=os.path.dirname(os.path.normpath(path)))
+
     df = pd.read_csv(path, parse_dates=True, index_col=0)
     return df
+
+
+def make_synthetic_ohlcv(n_bars, seed=42, start="2020-01-01", freq="1h", start_price=100.0):
+    """
+    ساخت داده OHLCV مصنوعی و قطعی (برای بنچمارک و بررسی صحت)
+    قیمت به صورت گام تصادفی هندسی ساخته می‌شود.
+    """
+    rng = np.random.default_rng(seed)
+
+    log_returns = rng.normal(0.0, 0.01, n_bars)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+
+    spread = np.abs(rng.normal(0.0, 0.004, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(mean=10.0, sigma=0.5, size=n_bars)
+
+    index = pd.date_range(start=start, periods=n_bars, freq=freq, name="open_time")
+    return pd.DataFrame({
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    }, index=index)